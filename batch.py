@@ -0,0 +1,172 @@
+"""Non-interactive execution of statements read from a file or stdin."""
+
+import json
+from typing import Callable, Iterable, Iterator, NamedTuple, TextIO
+
+from calculator import (
+    ExecutionContext,
+    execute_expression,
+    execute_transaction_command,
+)
+from consts import GOODBYE_MESSAGE, TRANSACTION_COMMANDS
+from metrics import metrics
+from show import format_variables, is_show, parse_show, show
+
+# Number of output lines collected before they are written out
+OUTPUT_BUFFER_LINES = 4096
+UNCOMMITTED_ERROR = "Transaction not committed, rolled back"
+
+
+class StatementResult(NamedTuple):
+    line: int
+    statement: str
+    result: str | None = None
+    error: str | None = None
+
+
+def read_statements(stream: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """Lazily yield (line number, statement) for every non-blank line."""
+    for number, line in enumerate(stream, 1):
+        statement = line.strip()
+        if statement:
+            yield number, statement
+
+
+def run_statements(
+    statements: Iterable[tuple[int, str]],
+    context: ExecutionContext,
+    show_output: Callable[[Iterator[str]], None] | None = None,
+) -> Iterator[StatementResult]:
+    """Execute statements against one shared context, yielding their results.
+
+    Supports the shell commands that make sense in a script: ``show`` (with
+    the options of show.py), ``clear``, ``stats``, ``exit`` (which stops
+    reading) and the ``begin``, ``commit`` and ``abort`` of transaction
+    blocks. ``show_output`` is given the chunks of every show as they are
+    formatted, whose result is then None; without it the result holds the
+    whole output.
+    """
+    for line, statement in statements:
+        if statement == "exit":
+            return
+        result = None
+        try:
+            if is_show(statement):
+                chunks = show(context, parse_show(statement))
+                if show_output is None:
+                    result = "".join(chunks)
+                else:
+                    show_output(chunks)
+            elif statement == "clear":
+                context.clear()
+            elif statement == "stats":
+                result = metrics.format()
+            elif statement in TRANSACTION_COMMANDS:
+                execute_transaction_command(statement, context)
+            else:
+                result = execute_expression(statement, context)
+        except Exception as e:
+            yield StatementResult(line, statement, error=str(e))
+        else:
+            yield StatementResult(line, statement, result)
+
+
+def format_context(context: ExecutionContext) -> str:
+    """Format the variables as in the spec, e.g. (i=37,j=1,x=6,y=35)."""
+    return "".join(format_variables(context.variables.items(), context.backend.format))
+
+
+class BufferedWriter:
+    """Collect output lines and write them to the stream in large chunks."""
+
+    def __init__(self, stream: TextIO, size: int = OUTPUT_BUFFER_LINES):
+        self._stream = stream
+        self._size = size
+        self._lines: list[str] = []
+
+    def write_line(self, line: str):
+        self._lines.append(line + "\n")
+        if len(self._lines) >= self._size:
+            self.flush()
+
+    def write_chunks(self, chunks: Iterable[str]):
+        """Write the chunks as one line, without joining them."""
+        for chunk in chunks:
+            self._lines.append(chunk)
+            if len(self._lines) >= self._size:
+                self.flush()
+        self.write_line("")
+
+    def flush(self):
+        self._stream.writelines(self._lines)
+        self._lines.clear()
+        self._stream.flush()
+
+
+def run_script(
+    stream: Iterable[str],
+    output: TextIO,
+    errors: TextIO,
+    jsonl: TextIO | None = None,
+    context: ExecutionContext | None = None,
+    jobs: int = 1,
+) -> int:
+    """Run every statement in the stream and print the final context.
+
+    Errors are reported on ``errors`` with their line number. When ``jsonl``
+    is given, one JSON object per statement is written to it. With more than
+    one job, independent statements run in parallel, see parallel.py. A
+    transaction block left open at the end is rolled back and reported.
+    Returns the process exit code: 1 if any statement failed, 0 otherwise.
+    """
+    if context is None:
+        context = ExecutionContext({})
+    out = BufferedWriter(output)
+    # show output is streamed, unless the JSON results need it as a string
+    show_output = out.write_chunks if jsonl is None else None
+    if jobs == 1:
+        results = run_statements(read_statements(stream), context, show_output)
+    else:
+        # Imported here, parallel imports this module
+        from parallel import run_statements_parallel
+
+        results = run_statements_parallel(
+            read_statements(stream), context, jobs, show_output=show_output
+        )
+    err = BufferedWriter(errors)
+    if jsonl is None:
+        results_out = None
+    elif jsonl is output:
+        # Keep command output and per-line results in order on the same stream
+        results_out = out
+    else:
+        results_out = BufferedWriter(jsonl)
+    failed = False
+
+    try:
+        for result in results:
+            if result.error is not None:
+                failed = True
+                err.write_line(f"line {result.line}: Error: {result.error}")
+            elif result.result is not None and (
+                result.statement == "stats" or is_show(result.statement)
+            ):
+                out.write_line(result.result)
+            if results_out is not None:
+                results_out.write_line(
+                    json.dumps(result._asdict(), separators=(",", ":"))
+                )
+    except KeyboardInterrupt:
+        err.write_line(GOODBYE_MESSAGE)
+    finally:
+        if context.in_transaction:
+            context.abort()
+            failed = True
+            err.write_line(f"Error: {UNCOMMITTED_ERROR}")
+        if results_out is not None and results_out is not out:
+            results_out.flush()
+        err.flush()
+
+    out.write_line(format_context(context))
+    out.flush()
+    return 1 if failed else 0
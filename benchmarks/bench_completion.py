@@ -0,0 +1,68 @@
+"""Completion latency of the shell with growing numbers of variables.
+
+Times typing TEXT, completing the word before the cursor after every
+keystroke, with the WordCompleter the shell used to rebuild before every
+prompt and with completion.ShellCompleter, whose index the context keeps up
+to date.
+Also times adding a variable to the index.
+Run from the repository root with ``python -m benchmarks.bench_completion``.
+"""
+
+import argparse
+import timeit
+
+from prompt_toolkit.completion import CompleteEvent, WordCompleter
+from prompt_toolkit.document import Document
+
+from completion import NameIndex, ShellCompleter
+from consts import COMMANDS
+
+# Typed in the shell, one keystroke at a time
+TEXT = "total = v12"
+
+
+def per_call(run, number: int) -> float:
+    return min(timeit.repeat(run, number=number, repeat=3)) / number
+
+
+def keystrokes(completer, event: CompleteEvent):
+    for end in range(1, len(TEXT) + 1):
+        for _ in completer.get_completions(Document(TEXT[:end]), event):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    event = CompleteEvent()
+    print(
+        f"{'variables':>10} {'WordCompleter ms':>17} {'ShellCompleter ms':>18}"
+        f" {'add µs':>8}"
+    )
+    for size in args.sizes:
+        names = [f"v{n}" for n in range(size)]
+        words = WordCompleter(COMMANDS + names)
+        index = NameIndex(names)
+        shell = ShellCompleter(COMMANDS, index)
+
+        word_time = per_call(lambda: keystrokes(words, event), args.number)
+        shell_time = per_call(lambda: keystrokes(shell, event), args.number)
+
+        def add():
+            index.add("v_new")
+            index.discard("v_new")
+
+        add_time = per_call(add, 1000)
+        print(
+            f"{size:>10} {word_time * 1e3:>17.2f} {shell_time * 1e3:>18.3f}"
+            f" {add_time * 1e6:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
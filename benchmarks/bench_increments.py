@@ -0,0 +1,58 @@
+"""Cost of ++/-- against contexts of growing size.
+
+Interprets (ExpressionExecutor.execute_expression) and runs compiled
+(execute_compiled) a statement that post-increments the last variable
+created, in contexts of increasing numbers of variables. Increments write
+to their operand directly, so the time per statement should not depend on
+the size of the context (interpreted increments used to search the
+variables for one holding the incremented value).
+Run from the repository root with ``python -m benchmarks.bench_increments``.
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from calculator import ExecutionContext, ExpressionExecutor, compile_expression
+from models.expression import Expression
+
+
+def build_context(size: int) -> ExecutionContext:
+    return ExecutionContext({f"v{n}": Decimal(n) for n in range(size)})
+
+
+def measure(run, statements: int) -> float:
+    start = time.perf_counter()
+    for _ in range(statements):
+        run()
+    return (time.perf_counter() - start) / statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--statements", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'variables':>10} {'interpreted µs':>15} {'compiled µs':>12}")
+    for size in args.sizes:
+        last = f"v{size - 1}"
+        statement = f"x = {last}++ + --v0"
+        parsed = Expression.from_expression(statement)
+        compiled = compile_expression(statement)
+
+        executor = ExpressionExecutor(build_context(size))
+        interpreted = measure(
+            lambda: executor.execute_expression(parsed), args.statements
+        )
+        executor = ExpressionExecutor(build_context(size))
+        run_compiled = measure(
+            lambda: executor.execute_compiled(compiled), args.statements
+        )
+        print(f"{size:>10} {interpreted * 1e6:>15.2f} {run_compiled * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
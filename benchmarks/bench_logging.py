@@ -0,0 +1,106 @@
+"""Cost of logging on statement throughput.
+
+Runs the same script with debug logging off, with debug records queued to a
+file (the listener thread writes them) and with a plain FileHandler writing
+on the evaluating thread. With debug off the overhead is the level checks
+and disabled log calls made per statement, timed separately;
+``--max-overhead`` fails the run when it exceeds the given percentage of a
+statement.
+Run from the repository root with ``python -m benchmarks.bench_logging``.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+import settings
+from batch import read_statements, run_statements
+from calculator import ExecutionContext
+from settings import configure_logging, logger
+
+
+def build_script(statements: int) -> list[str]:
+    lines = ["x = 1", "y = 2"]
+    while len(lines) < statements:
+        lines.append(f"y = (x * 3 + y++) % 1000 / {len(lines) % 7 + 1}")
+    return lines
+
+
+def measure(lines: list[str]) -> float:
+    context = ExecutionContext({})
+    start = time.perf_counter()
+    for _ in run_statements(read_statements(lines), context):
+        pass
+    return (time.perf_counter() - start) / len(lines)
+
+
+def log_checks(lines: list[str]) -> float:
+    """Average number of debug calls and level checks per statement."""
+    calls = 0
+
+    def counting(method):
+        def count(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            return method(*args, **kwargs)
+
+        return count
+
+    logger.debug = counting(logger.debug)
+    logger.isEnabledFor = counting(logger.isEnabledFor)
+    try:
+        measure(lines)
+    finally:
+        del logger.debug, logger.isEnabledFor
+    return calls / len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=20_000)
+    parser.add_argument("--max-overhead", type=float, default=None, metavar="PCT")
+    args = parser.parse_args()
+
+    lines = build_script(args.statements)
+    path = os.path.join(tempfile.mkdtemp(), "calculator.log")
+
+    configure_logging("WARNING", path)
+    off = measure(lines)
+    calls = log_checks(lines)
+    call_cost = min(timeit.repeat(lambda: logger.debug("x %s", 1), number=100_000))
+    overhead = calls * call_cost / 100_000
+
+    configure_logging("DEBUG", path)
+    queued = measure(lines)
+    # Drains the queue before the handlers are swapped
+    configure_logging("WARNING", path)
+
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(settings.LOG_FORMAT))
+    logger.removeHandler(settings.log_handler)
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    direct = measure(lines)
+    logger.removeHandler(handler)
+    handler.close()
+    configure_logging()
+
+    print(f"{len(lines)} statements, µs per statement")
+    print(f"debug off           {off * 1e6:8.2f}")
+    print(f"debug, queued       {queued * 1e6:8.2f}")
+    print(f"debug, direct file  {direct * 1e6:8.2f}")
+    percent = 100 * overhead / off
+    print(
+        f"debug off overhead: {calls:.1f} checks x {call_cost / 100_000 * 1e9:.0f} ns"
+        f" = {overhead * 1e9:.0f} ns per statement ({percent:.1f}%)"
+    )
+    if args.max_overhead is not None and percent > args.max_overhead:
+        sys.exit(f"overhead {percent:.1f}% exceeds {args.max_overhead}%")
+
+
+if __name__ == "__main__":
+    main()
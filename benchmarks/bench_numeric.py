@@ -0,0 +1,61 @@
+"""Compare numeric backends on a loop of compiled statements.
+
+Run from the repository root with ``python -m benchmarks.bench_numeric``.
+"""
+
+import argparse
+import timeit
+
+from calculator import ExpressionExecutor, SlotExecutionContext, compile_expression
+from numeric import DecimalBackend, FloatBackend, FractionBackend
+
+STATEMENTS = [
+    "i++",
+    "total += price * qty - discount",
+    "average = total / i",
+    "ratio = (price + 0.25) / (qty % 7 + 1)",
+    "discount = --discount * 1.5",
+]
+
+BACKENDS = {
+    "decimal": DecimalBackend(),
+    "decimal-12": DecimalBackend(12),
+    "float": FloatBackend(),
+    "fraction": FractionBackend(),
+}
+
+
+def run(backend, iterations: int):
+    """Execute the statements ``iterations`` times in a fresh context."""
+    context = SlotExecutionContext(
+        {"i": 0, "total": 0, "price": "19.99", "qty": 3, "discount": "0.5"}, backend
+    )
+    executor = ExpressionExecutor(context)
+    compiled = [compile_expression(statement) for statement in STATEMENTS]
+    for _ in range(iterations):
+        for statement in compiled:
+            executor.execute_compiled(statement)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    statements = args.iterations * len(STATEMENTS)
+    timings = {}
+    for name, backend in BACKENDS.items():
+        best = min(
+            timeit.repeat(
+                lambda: run(backend, args.iterations), number=1, repeat=args.repeat
+            )
+        )
+        timings[name] = best / statements
+    baseline = timings["decimal"]
+    for name, seconds in timings.items():
+        print(f"{name:<12} {seconds * 1e6:8.2f} us/statement  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
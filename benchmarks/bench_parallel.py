@@ -0,0 +1,56 @@
+"""Compare serial and parallel execution of a wide script.
+
+The script has ``--width`` independent chains of ``--depth`` statements.
+Run from the repository root with ``python -m benchmarks.bench_parallel``.
+"""
+
+import argparse
+import os
+import time
+
+from batch import read_statements, run_statements
+from calculator import ExecutionContext
+from parallel import run_statements_parallel
+
+
+def build_script(width: int, depth: int) -> list[str]:
+    lines = [f"v{chain} = {chain}" for chain in range(width)]
+    for step in range(depth):
+        for chain in range(width):
+            lines.append(f"v{chain} = (v{chain} * 3 + {step}) % 1000 + v{chain}++ / 7")
+    return lines
+
+
+def measure(run, lines: list[str], **options) -> tuple[float, str]:
+    context = ExecutionContext({})
+    start = time.perf_counter()
+    for _ in run(read_statements(lines), context, **options):
+        pass
+    return time.perf_counter() - start, repr(context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--jobs", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    lines = build_script(args.width, args.depth)
+    jobs = args.jobs or sorted({2, 4, os.cpu_count() or 1} - {1})
+    serial, expected = measure(run_statements, lines)
+    print(f"{len(lines)} statements, {os.cpu_count()} CPUs")
+    print(f"serial          {serial:8.3f} s")
+    for count in jobs:
+        for pool in ("process", "thread"):
+            seconds, result = measure(
+                run_statements_parallel, lines, jobs=count, pool=pool
+            )
+            assert result == expected, "parallel result differs from serial"
+            print(
+                f"{pool:<7} jobs={count:<3} {seconds:8.3f} s  x{serial / seconds:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
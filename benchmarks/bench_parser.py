@@ -0,0 +1,58 @@
+"""Parse cost of the single-pass tree parser against the multi-pass path.
+
+For each workload the expression tokens are parsed both ways: multi-pass
+(check_balanced_parentheses, check_consecutive_operators, then to_postfix)
+and single-pass (parse_tree, then the postfix of the tree). Both give the
+same postfix; tokenizing is not timed.
+Run from the repository root with ``python -m benchmarks.bench_parser``.
+"""
+
+import argparse
+import timeit
+
+import parser
+from tokenizer import tokenize
+
+# Variables alternate: the validator rejects the same variable twice in a row
+TERMS = ["y * 2", "(3 - z)", "1.5", "7 / 4", "y++ % 3", "--z"]
+WORKLOADS = {
+    "short": "x = y * (z + 2) - 3 / w++ % 4",
+    "flat/100": " + ".join(TERMS[n % len(TERMS)] for n in range(100)),
+    "flat/1000": " + ".join(TERMS[n % len(TERMS)] for n in range(1000)),
+    "nested/100": "(" * 100 + "w" + "".join(f" * 2 + {v})" for v in "yz" * 50),
+}
+
+
+def multi_pass(tokens):
+    parser.check_balanced_parentheses(tokens)
+    parser.check_consecutive_operators(tokens)
+    return parser.to_postfix(tokens)
+
+
+def single_pass(tokens):
+    return parser.parse_tree(tokens).postfix()
+
+
+def per_call(run, tokens, number: int, repeat: int) -> float:
+    return (
+        min(timeit.repeat(lambda: run(tokens), number=number, repeat=repeat)) / number
+    )
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__)
+    argument_parser.add_argument("--number", type=int, default=200)
+    argument_parser.add_argument("--repeat", type=int, default=5)
+    args = argument_parser.parse_args()
+
+    print(f"{'workload':<12} {'tokens':>7} {'multi-pass µs':>14} {'tree µs':>9}")
+    for name, expression in WORKLOADS.items():
+        tokens = parser.split_assignment(tokenize(expression)).tokens
+        assert single_pass(tokens) == multi_pass(tokens)
+        multi = per_call(multi_pass, tokens, args.number, args.repeat)
+        single = per_call(single_pass, tokens, args.number, args.repeat)
+        print(f"{name:<12} {len(tokens):>7} {multi * 1e6:>14.1f} {single * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
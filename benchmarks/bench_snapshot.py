@@ -0,0 +1,67 @@
+"""Measure saving and restoring a large session with a binary snapshot.
+
+Compares a lazy load (plus a few reads) against reading every value and
+against replaying the statements that built the session.
+Run from the repository root with ``python -m benchmarks.bench_snapshot``.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+from batch import read_statements, run_statements
+from calculator import ExecutionContext
+
+
+def timed(action) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--variables", type=int, default=1_000_000)
+    parser.add_argument("--replay", type=int, default=20_000)
+    parser.add_argument("--reads", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    context = ExecutionContext(
+        {
+            f"var_{n}": Decimal(rng.randrange(10**9)).scaleb(-rng.randrange(6))
+            for n in range(args.variables)
+        }
+    )
+    path = os.path.join(tempfile.mkdtemp(), "session.snap")
+
+    seconds, _ = timed(lambda: context.save(path))
+    size = os.path.getsize(path)
+    print(f"{args.variables} variables, {size / 2**20:.1f} MiB")
+    print(f"save                {seconds:8.3f} s")
+
+    seconds, loaded = timed(lambda: ExecutionContext.load(path))
+    names = rng.sample(list(context.variables), min(args.reads, args.variables))
+    read_seconds, _ = timed(lambda: [loaded.get_variable(name) for name in names])
+    print(f"load                {seconds:8.3f} s")
+    print(f"{len(names)} random reads  {read_seconds:8.3f} s")
+
+    seconds, _ = timed(lambda: dict(ExecutionContext.load(path).variables.items()))
+    print(f"load and read all   {seconds:8.3f} s")
+
+    statements = [f"{name} = {value}" for name, value in context.variables.items()]
+    replay = statements[: args.replay]
+    seconds, _ = timed(
+        lambda: list(run_statements(read_statements(replay), ExecutionContext({})))
+    )
+    print(
+        f"replay              {seconds * len(statements) / len(replay):8.3f} s "
+        f"(extrapolated from {len(replay)} statements)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup cost of one-shot runs.
+
+Reports the import time of the entry modules (``python -X importtime``, so
+it excludes interpreter startup) and the wall time of
+``python ui.py -e STATEMENT`` next to a bare ``python -c pass``. One-shot and
+batch runs must not import pydantic or prompt_toolkit; the import time of
+``ui`` must stay within IMPORT_BUDGET_MS: the benchmark exits with 1 when
+it does not, and tests/test_startup.py checks it with CALCULATOR_TIMING_TESTS=1.
+Run from the repository root with ``python -m benchmarks.bench_startup``.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import time of the ui module; pydantic and prompt_toolkit alone take more
+IMPORT_BUDGET_MS = 100
+# Imported only by the interactive shell and the Expression model
+HEAVY_MODULES = ("pydantic", "prompt_toolkit")
+MODULES = ("calculator", "batch", "ui", "models.expression")
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of the module in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise ValueError(f"{module} was not imported")
+
+
+def imported_modules(module: str) -> set[str]:
+    """Top-level packages imported by importing the module."""
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print(' '.join(sys.modules))",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return {name.split(".")[0] for name in output.split()}
+
+
+def wall_time_ms(command: list[str], runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--statement", default="x = 1 + 2")
+    args = parser.parse_args()
+
+    print("import time, ms (median of --runs)")
+    for module in MODULES:
+        timing = statistics.median(import_time_ms(module) for _ in range(args.runs))
+        heavy = sorted(imported_modules(module).intersection(HEAVY_MODULES))
+        print(f"  {module:<20} {timing:8.1f}  {' '.join(heavy)}")
+
+    bare = wall_time_ms([sys.executable, "-c", "pass"], args.runs)
+    one_shot = wall_time_ms([sys.executable, "ui.py", "-e", args.statement], args.runs)
+    print("wall time, ms")
+    print(f"  python -c pass       {bare:8.1f}")
+    print(f"  ui.py -e             {one_shot:8.1f}")
+
+    ui = statistics.median(import_time_ms("ui") for _ in range(args.runs))
+    if ui > IMPORT_BUDGET_MS:
+        sys.exit(f"importing ui takes {ui:.1f} ms, over {IMPORT_BUDGET_MS} ms")
+
+
+if __name__ == "__main__":
+    main()
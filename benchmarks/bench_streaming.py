@@ -0,0 +1,94 @@
+"""Peak memory and time of streamed versus compiled execution.
+
+Long flat expressions are run both ways at growing lengths: compiled (token
+list, Expression, postfix list, program) and streamed
+(ExpressionExecutor.execute_stream, tokens consumed as they are scanned).
+Then deeply nested expressions are streamed at growing depths. Peak memory
+is measured with tracemalloc and excludes the expression string itself;
+the streamed peak should stay flat with length and grow with depth.
+Run from the repository root with ``python -m benchmarks.bench_streaming``.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+from calculator import ExecutionContext, ExpressionExecutor, compile_expression
+
+# Variables alternate: the validator rejects the same variable twice in a row
+TERMS = ["y * 2", "(3 - z)", "1.5", "7 / 4"]
+
+
+def flat(terms: int) -> str:
+    return "x = " + " + ".join(TERMS[n % len(TERMS)] for n in range(terms))
+
+
+def nested(depth: int) -> str:
+    return "x = " + "(" * depth + "y" + " + 1)" * depth
+
+
+def streamed(expression: str) -> str:
+    return ExpressionExecutor(new_context()).execute_stream(expression)
+
+
+def compiled(expression: str) -> str:
+    return ExpressionExecutor(new_context()).execute_compiled(
+        compile_expression(expression)
+    )
+
+
+def new_context() -> ExecutionContext:
+    return ExecutionContext({"y": 2, "z": 3})
+
+
+def measure(run: Callable[[str], str], expression: str) -> tuple[float, int]:
+    """Seconds and peak bytes allocated while running the expression."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        run(expression)
+        return time.perf_counter() - start, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--terms", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument(
+        "--compiled-up-to",
+        type=int,
+        default=100_000,
+        metavar="TERMS",
+        help="skip the compiled run of longer expressions",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'terms':>9} {'chars':>10}  {'streamed KiB':>12} {'s':>7}"
+        f"  {'compiled KiB':>12} {'s':>7}"
+    )
+    for terms in args.terms:
+        expression = flat(terms)
+        stream_time, stream_peak = measure(streamed, expression)
+        line = (
+            f"{terms:>9} {len(expression):>10}  {stream_peak / 1024:>12.1f}"
+            f" {stream_time:>7.2f}"
+        )
+        if terms <= args.compiled_up_to:
+            compile_time, compile_peak = measure(compiled, expression)
+            line += f"  {compile_peak / 1024:>12.1f} {compile_time:>7.2f}"
+        print(line)
+
+    print(f"\n{'depth':>9} {'streamed KiB':>12}")
+    for depth in args.depths:
+        _, peak = measure(streamed, nested(depth))
+        print(f"{depth:>9} {peak / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Compare tokenizer backends on multi-kilobyte expressions.
+
+Run from the repository root with ``python -m benchmarks.bench_tokenizer``.
+"""
+
+import argparse
+import timeit
+
+from tokenizer import TOKENIZER_BACKENDS
+
+TERM = "alpha_1++ * (60 * 60 * 24) + --beta - 3.75 / gamma % 2 + "
+
+
+def build_expression(size: int) -> str:
+    """Return an assignment of roughly ``size`` characters."""
+    return "total = " + TERM * max(size // len(TERM), 1) + "1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1024, 8192, 65536])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        expression = build_expression(size)
+        number = max(200_000 // len(expression), 1)
+        timings = {}
+        for name, backend in TOKENIZER_BACKENDS.items():
+            best = min(
+                timeit.repeat(
+                    lambda: backend(expression), number=number, repeat=args.repeat
+                )
+            )
+            timings[name] = best / number
+        baseline = timings["legacy"]
+        for name, seconds in timings.items():
+            print(
+                f"{len(expression):>8} chars  {name:<8} {seconds * 1e3:9.3f} ms"
+                f"  x{baseline / seconds:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
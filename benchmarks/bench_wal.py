@@ -0,0 +1,68 @@
+"""Statement throughput with the write-ahead log in each durability mode.
+
+With ``--transaction`` the script runs as one begin/commit block, so it is
+logged (and synced) once instead of after every statement.
+Run from the repository root with ``python -m benchmarks.bench_wal``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from batch import read_statements, run_statements
+from calculator import ExecutionContext
+from wal import DURABILITY, WriteAheadLog
+
+
+def build_script(statements: int, transaction: bool = False) -> list[str]:
+    lines = ["x = 1", "y = 2"]
+    while len(lines) < statements:
+        lines.append(f"y = (x * 3 + y++) % 1000 / {len(lines) % 7 + 1}")
+    if transaction:
+        return ["begin", *lines, "commit"]
+    return lines
+
+
+def measure(lines: list[str], durability: str | None, directory: str) -> float:
+    path = os.path.join(directory, f"{durability}.wal")
+    start = time.perf_counter()
+    if durability is None:
+        context = ExecutionContext({})
+        for _ in run_statements(read_statements(lines), context):
+            pass
+    else:
+        with WriteAheadLog(path, durability) as wal:
+            for _ in run_statements(read_statements(lines), wal.recover()):
+                pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--statements", type=int, default=20_000)
+    parser.add_argument(
+        "--transaction",
+        action="store_true",
+        help="run the statements in a single transaction block",
+    )
+    parser.add_argument(
+        "--directory",
+        default=None,
+        help="where to write the logs (default: a temp dir)",
+    )
+    args = parser.parse_args()
+
+    lines = build_script(args.statements, args.transaction)
+    directory = args.directory or tempfile.mkdtemp()
+    print(f"{len(lines)} statements")
+    for durability in (None, *reversed(DURABILITY)):
+        seconds = measure(lines, durability, directory)
+        print(
+            f"{durability or 'no log':<9} {seconds:8.3f} s "
+            f"{len(lines) / seconds:10,.0f} statements/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Load client for the calculator server.
+
+Opens ``--connections`` sessions, plus ``--idle`` sessions that only connect,
+and pipelines ``--statements`` statements on each, keeping at most
+``--window`` replies outstanding. Reports statements per second.
+
+Without ``--unix`` or ``--port`` a server is started on a temporary Unix
+socket. Run from the repository root with ``python -m benchmarks.load_client``.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def statements(session: int, count: int) -> list[bytes]:
+    lines = [f"x = {session}", "y = 1"]
+    while len(lines) < count:
+        lines.append("y = (x * 3 + y++) % 1000 / 7")
+    return [f"{line}\n".encode() for line in lines[:count]]
+
+
+async def connect(args: argparse.Namespace):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def run_session(args: argparse.Namespace, session: int) -> int:
+    """Pipeline the statements of one session, return the number of errors."""
+    reader, writer = await connect(args)
+    lines = statements(session, args.statements)
+    errors = 0
+    sent = 0
+    for received in range(len(lines)):
+        # Keep the pipeline full
+        end = min(received + args.window, len(lines))
+        if sent < end:
+            writer.write(b"".join(lines[sent:end]))
+            sent = end
+        reply = await reader.readline()
+        if not reply:
+            raise ConnectionError("Server closed the connection")
+        errors += reply.startswith(b"Error")
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def run_load(args: argparse.Namespace):
+    idle = [await connect(args) for _ in range(args.idle)]
+    start = time.perf_counter()
+    errors = await asyncio.gather(
+        *(run_session(args, session) for session in range(args.connections))
+    )
+    seconds = time.perf_counter() - start
+    for _, writer in idle:
+        writer.close()
+
+    total = args.connections * args.statements
+    print(
+        f"{args.connections} sessions ({args.idle} idle), {total} statements, "
+        f"window {args.window}"
+    )
+    print(f"{seconds:.3f} s, {total / seconds:,.0f} statements/s, {sum(errors)} errors")
+
+
+def start_server(path: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "server.py", "--unix", path], stdout=subprocess.PIPE
+    )
+    # The server prints its address once it is listening
+    server.stdout.readline()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--idle", type=int, default=0)
+    parser.add_argument("--statements", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=64)
+    args = parser.parse_args()
+
+    server = None
+    if args.unix is None and args.port is None:
+        args.unix = os.path.join(tempfile.mkdtemp(), "calculator.sock")
+        server = start_server(args.unix)
+    try:
+        asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
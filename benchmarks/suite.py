@@ -0,0 +1,251 @@
+"""Microbenchmarks of every stage of statement execution.
+
+Each synthetic workload (long flat sums, deeply nested parentheses, heavy
+``++``/``--`` use, large variable counts, big-digit Decimals) is run at a
+few sizes against each stage separately:
+
+* ``tokenize``: tokenizer.tokenize
+* ``expression``: Expression.from_expression (tokenizes and validates)
+* ``to_postfix``: Expression.to_postfix
+* ``optimize``: optimizer.optimize_postfix (constant folding)
+* ``execute_postfix``: ExpressionExecutor.execute_postfix (the interpreter)
+* ``context``: execute_expression against an ExecutionContext, with a warm
+  expression cache
+
+Results are the best time per call over ``--repeat`` runs. ``--output``
+writes them as JSON; ``--compare BASELINE`` compares them with a previous
+output and exits with 1 when a benchmark is slower by more than
+``--threshold``. Run from the repository root with
+``python -m benchmarks.suite``.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, NamedTuple
+
+from cache import ExpressionCache
+from calculator import (
+    STATEMENT_SAVEPOINT,
+    ExecutionContext,
+    ExpressionExecutor,
+    execute_expression,
+)
+from models.expression import Expression
+from optimizer import optimize_postfix
+from tokenizer import tokenize
+
+FORMAT_VERSION = 1
+
+
+class Workload(NamedTuple):
+    name: str
+    size: int
+    statement: str
+    variables: dict[str, str]
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}/{self.size}"
+
+
+def flat_sum(size: int) -> Workload:
+    terms = " + ".join(str(n) for n in range(1, size + 1))
+    return Workload("flat_sum", size, f"total = {terms}", {})
+
+
+def nested(size: int) -> Workload:
+    return Workload("nested", size, "x = " + "(" * size + "1" + " + 1)" * size, {})
+
+
+def increments(size: int) -> Workload:
+    operands = ["a++", "--b", "c--", "++d"]
+    terms = " + ".join(operands[n % len(operands)] for n in range(size))
+    variables = {name: "0" for name in "abcd"}
+    return Workload("increments", size, f"total = {terms}", variables)
+
+
+def many_variables(size: int) -> Workload:
+    # The statement reads 50 variables spread over the context
+    step = max(size // 50, 1)
+    terms = " + ".join(f"v{n}" for n in range(0, size, step))
+    variables = {f"v{n}": str(n) for n in range(size)}
+    return Workload("variables", size, f"total = {terms}", variables)
+
+
+def big_decimals(size: int) -> Workload:
+    number = "7" * size + "." + "3" * size
+    statement = f"x = {number} * a + {number} / b - {number}"
+    return Workload("big_decimals", size, statement, {"a": "1.5", "b": "3"})
+
+
+WORKLOADS: dict[str, tuple[Callable[[int], Workload], list[int], list[int]]] = {
+    # name: (builder, sizes, --quick sizes)
+    "flat_sum": (flat_sum, [10, 1000], [10]),
+    "nested": (nested, [10, 200], [10]),
+    "increments": (increments, [10, 200], [10]),
+    "variables": (many_variables, [100, 100_000], [100]),
+    "big_decimals": (big_decimals, [20, 1000], [20]),
+}
+
+
+def stages(workload: Workload) -> dict[str, Callable[[], object]]:
+    """The function to time for every stage of the workload."""
+    statement = workload.statement
+    parsed = Expression.from_expression(statement)
+    postfix = parsed.to_postfix()
+    executor = ExpressionExecutor(ExecutionContext(dict(workload.variables)))
+    context = ExecutionContext(dict(workload.variables))
+    cache = ExpressionCache(16)
+
+    def execute_postfix():
+        # Undo the ++/-- writes, so that every call starts from the same state
+        executor.context.savepoint(STATEMENT_SAVEPOINT)
+        try:
+            return executor.execute_postfix(postfix)
+        finally:
+            executor.context.rollback(STATEMENT_SAVEPOINT)
+
+    return {
+        "tokenize": lambda: tokenize(statement),
+        "expression": lambda: Expression.from_expression(statement),
+        "to_postfix": parsed.to_postfix,
+        "optimize": lambda: optimize_postfix(postfix),
+        "execute_postfix": execute_postfix,
+        "context": lambda: execute_expression(statement, context, cache),
+    }
+
+
+def measure(function: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """Best and median nanoseconds per call over ``repeat`` timed runs."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number * 1e9)
+    return {
+        "ns": min(timings),
+        "median_ns": statistics.median(timings),
+        "calls": number,
+    }
+
+
+def run(
+    quick: bool = False,
+    only: list[str] | None = None,
+    repeat: int = 5,
+    min_time: float = 0.02,
+) -> dict:
+    """Run the suite and return its results, keyed "workload/size/stage"."""
+    results = {}
+    for name, (build, sizes, quick_sizes) in WORKLOADS.items():
+        for size in quick_sizes if quick else sizes:
+            workload = build(size)
+            for stage, function in stages(workload).items():
+                key = f"{workload.key}/{stage}"
+                if only and not any(pattern in key for pattern in only):
+                    continue
+                results[key] = measure(function, repeat, min_time)
+    return {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+class Comparison(NamedTuple):
+    key: str
+    baseline_ns: float
+    current_ns: float
+    ratio: float
+    status: str
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[Comparison]:
+    """Compare the benchmarks present in both results.
+
+    A benchmark is a "regression" when it is slower than the baseline by
+    more than ``threshold`` (0.1 for 10%), an "improvement" when it is
+    faster by as much, and "ok" otherwise.
+    """
+    comparisons = []
+    for key, result in current["results"].items():
+        if key not in baseline["results"]:
+            continue
+        before = baseline["results"][key]["ns"]
+        ratio = result["ns"] / before
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        comparisons.append(Comparison(key, before, result["ns"], ratio, status))
+    return comparisons
+
+
+def print_results(results: dict):
+    for key, result in results["results"].items():
+        print(f"{key:<40} {result['ns'] / 1e3:12.2f} µs")
+
+
+def print_comparisons(comparisons: list[Comparison]):
+    for comparison in comparisons:
+        print(
+            f"{comparison.key:<40} {comparison.baseline_ns / 1e3:12.2f} µs"
+            f" {comparison.current_ns / 1e3:12.2f} µs  x{comparison.ratio:.2f}"
+            f"  {comparison.status}"
+        )
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument(
+        "--compare", metavar="BASELINE", help="JSON results to compare with"
+    )
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--quick", action="store_true", help="only the smallest sizes")
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        metavar="PATTERN",
+        help="benchmarks whose key contains PATTERN",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.quick, args.only, args.repeat)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare is None:
+        print_results(results)
+        return
+    with open(args.compare) as baseline_file:
+        baseline = json.load(baseline_file)
+    comparisons = compare(baseline, results, args.threshold)
+    print_comparisons(comparisons)
+    regressions = [c for c in comparisons if c.status == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, NamedTuple, TypeVar
+
+from consts import VARIABLE_VALID_CHARS
+
+T = TypeVar("T")
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Characters that belong to a number or a variable name; whitespace between two
+# of them separates tokens and must be kept.
+OPERAND_CHARS = VARIABLE_VALID_CHARS | {"."}
+NUMBER_CHARS = set("0123456789.")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+def _is_significant_whitespace(expression: str, start: int, end: int) -> bool:
+    """Check whether removing expression[start:end] would change its tokens."""
+    if start == 0 or end == len(expression):
+        return False
+    left, right = expression[start - 1], expression[end]
+
+    # "a b" or "1 2" would merge into a single operand
+    if left in OPERAND_CHARS and right in OPERAND_CHARS:
+        return True
+    if left in "+-":
+        # "+ +" would become an increment operator
+        if right == left:
+            return True
+        # "++ x" is not a pre-increment, "- 5" is not a negative number
+        doubled = start >= 2 and expression[start - 2] == left
+        if right in OPERAND_CHARS and (
+            doubled or (left == "-" and right in NUMBER_CHARS)
+        ):
+            return True
+    # "x ++" is not a post-increment
+    if (
+        left in OPERAND_CHARS
+        and right in "+-"
+        and expression[end + 1 : end + 2] == right
+    ):
+        return True
+    # "+ =" is not an assignment operator
+    return right == "=" and left in "+-*/%"
+
+
+def normalize_expression(expression: str) -> str:
+    """Remove whitespace that does not affect how the expression is tokenized.
+
+    Equivalent spellings such as ``x+1`` and ``x + 1`` normalize to the same
+    string, while whitespace the tokenizer depends on (``x ++`` vs ``x++``,
+    ``- 5`` vs ``-5``) is collapsed to a single space.
+    """
+    if not expression.isascii():
+        # The tokenizer accepts unicode letters and digits, keep those verbatim
+        return expression
+
+    def replace(match: re.Match) -> str:
+        if _is_significant_whitespace(expression, match.start(), match.end()):
+            return " "
+        return ""
+
+    return WHITESPACE_PATTERN.sub(replace, expression)
+
+
+class ExpressionCache(Generic[T]):
+    """Thread-safe LRU cache of compiled expressions keyed on normalized source.
+
+    A ``maxsize`` of 0 disables caching; every lookup compiles the expression.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError(f"Invalid cache size: {maxsize}")
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, expression: str, compile_expression: Callable[[str], T]) -> T:
+        """Return the cached entry for the expression, compiling it on a miss.
+
+        Compilation errors propagate and are not cached.
+        """
+        key = normalize_expression(expression)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            self._misses += 1
+
+        entry = compile_expression(key)
+        if self.maxsize == 0:
+            return entry
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def resize(self, maxsize: int):
+        """Change the capacity, evicting the least recently used entries."""
+        if maxsize < 0:
+            raise ValueError(f"Invalid cache size: {maxsize}")
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self._hits,
+                self._misses,
+                self._evictions,
+                self.maxsize,
+                len(self._entries),
+            )
+
+    def clear(self):
+        """Drop all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, expression: str) -> bool:
+        return normalize_expression(expression) in self._entries
@@ -1,56 +1,497 @@
-from models.expression import Expression
-from decimal import Decimal
+import logging
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 
+from cache import ExpressionCache
+from compiler import Program, compile_postfix
+from metrics import metrics
+from consts import (
+    FORMULA_OPERATOR,
+    MISSING,
+    NO_TRANSACTION_ERROR,
+    TRANSACTION_FAILED_ERROR,
+    VALID_UNARY_OPERATORS,
+)
 from models.token import Token, TokenType
-from settings import logger
+from numeric import DECIMAL, Number, NumericBackend, default_backend
+from optimizer import Optimized, optimize_postfix, rewritten
+from parser import Statement, parse, stream
+from reactive import Formula, FormulaGraph, formula_reads
+from settings import EXPRESSION_CACHE_SIZE, STREAM_THRESHOLD, logger
+from show import format_variables
+from snapshot import Snapshot, SnapshotVariables, write_snapshot
+from tokenizer import tokenize
+
+if TYPE_CHECKING:
+    # Only the Expression API needs pydantic, see parser.py
+    from models.expression import Expression
+
+    # Only the interactive shell needs prompt_toolkit
+    from completion import NameIndex
+
+# Savepoint taken by ExpressionExecutor before every statement
+STATEMENT_SAVEPOINT = "statement"
+# Savepoint taken by ExecutionContext.begin
+TRANSACTION_SAVEPOINT = "transaction"
 
 
 class ExecutionContext:
-    def __init__(self, variables: dict[str, Decimal]):
-        self.variables = variables.copy()
-        self._rollback_stack = []
+    """Variables of a session and the numeric backend they are computed with.
+
+    The backend defaults to the one configured in settings, Decimal unless
+    CALCULATOR_NUMERIC says otherwise.
+    """
+
+    def __init__(
+        self, variables: dict[str, Number], backend: NumericBackend | None = None
+    ):
+        self.backend = default_backend() if backend is None else backend
+        self.variables = self._convert(variables)
+        # (name, previous value) of every uncommitted write, oldest first
+        self._journal: list[tuple[str, Number | object]] = []
+        # Savepoint name -> journal length when it was taken
+        self._savepoints: dict[str, int] = {}
+        # Programs compiled for this context, see bind
+        self._programs: dict[CompiledExpression, Program | None] = {}
+        # Formulas of the context, see define_formula
+        self.formulas: FormulaGraph | None = None
+        # Log of committed writes, see wal.WriteAheadLog.recover
+        self.wal = None
+        # Open transaction, see begin
+        self.in_transaction = False
+        # Error of the statement that failed the open transaction
+        self.transaction_error: str | None = None
+        # Formulas when the transaction began, restored by abort
+        self._transaction_formulas: dict[str, Formula] = {}
+        # Variable names kept sorted for the shell, see completion.NameIndex;
+        # updated as statements create, roll back and clear variables
+        self.name_index: "NameIndex | None" = None
+
+    def bind_name_index(self, index: "NameIndex"):
+        """Keep the index up to date with the variable names, see name_index.
+
+        The current names are loaded with one sort, not inserted one by one.
+        """
+        index.load(self.variables)
+        self.name_index = index
+
+    def _convert(self, variables: dict[str, Any]) -> dict[str, Number]:
+        convert = self.backend.convert
+        return {name: convert(value) for name, value in variables.items()}
 
-    def get_variable(self, name: str) -> Decimal:
+    def get_variable(self, name: str) -> Number:
         if name not in self.variables:
             raise ValueError(f"Undefined variable: {name}")
         return self.variables[name]
 
-    def get_or_create_variable(self, name: str) -> Decimal:
+    def get_or_create_variable(self, name: str) -> Number:
         if name not in self.variables:
-            self.variables[name] = Decimal("nan")
+            self._journal.append((name, MISSING))
+            self.variables[name] = self.backend.nan
+            if self.name_index is not None:
+                self.name_index.add(name)
         return self.variables[name]
 
-    def set_variable(self, name: str, value: Decimal):
+    def set_variable(self, name: str, value: Number):
         if name not in self.variables:
             raise ValueError(f"Undefined variable: {name}")
-        # Save the current state for rollback
-        self._rollback_stack.append(self.variables.copy())
+        # Save the previous value for rollback
+        self._journal.append((name, self.variables[name]))
         self.variables[name] = value
 
-    def rollback(self):
-        if self._rollback_stack:
-            self.variables = self._rollback_stack.pop()
+    def savepoint(self, name: str):
+        """Mark the current state so that rollback(name) can return to it."""
+        self._savepoints[name] = len(self._journal)
+
+    def rollback(self, savepoint: str | None = None):
+        """Undo the most recent uncommitted write, or every write since savepoint."""
+        if metrics.enabled:
+            return metrics.timed("rollback", self._rollback, savepoint)
+        self._rollback(savepoint)
+
+    def _rollback(self, savepoint: str | None):
+        if savepoint is None:
+            mark = max(len(self._journal) - 1, 0)
+        elif savepoint in self._savepoints:
+            mark = self._savepoints[savepoint]
+        else:
+            raise ValueError(f"Unknown savepoint: {savepoint}")
+
+        while len(self._journal) > mark:
+            self._restore(*self._journal.pop())
+        for name, position in list(self._savepoints.items()):
+            if position > mark:
+                del self._savepoints[name]
+
+    def _restore(self, name: str, previous: Number | object):
+        if previous is MISSING:
+            del self.variables[name]
+            if self.name_index is not None:
+                self.name_index.discard(name)
+        else:
+            self.variables[name] = previous
 
     def commit(self):
-        self._rollback_stack.clear()
+        """Make the writes since the last commit permanent and end the transaction.
+
+        Raises ValueError if a statement failed the transaction, whose writes
+        were rolled back by then.
+        """
+        start = perf_counter_ns() if metrics.enabled else 0
+        error = self.transaction_error
+        if self.wal is not None and self._journal:
+            self.wal.log_commit(self, self._written())
+        self._journal.clear()
+        self._savepoints.clear()
+        self.in_transaction = False
+        self.transaction_error = None
+        self._transaction_formulas = {}
+        if start:
+            metrics.record("commit", perf_counter_ns() - start)
+        if error is not None:
+            raise ValueError(f"Transaction rolled back: {error}")
+
+    def commit_statement(self):
+        """Commit the statement just executed, unless it is part of a transaction."""
+        if not self.in_transaction:
+            self.commit()
+
+    def begin(self):
+        """Start a transaction.
+
+        The statements executed until commit() are committed together (one
+        write-ahead log record), and abort() undoes all of them. When one of
+        them fails, the whole transaction is rolled back and the following
+        statements are refused until commit() or abort() ends it.
+        """
+        if self.in_transaction:
+            raise ValueError("A transaction is already in progress")
+        self.savepoint(TRANSACTION_SAVEPOINT)
+        self.in_transaction = True
+        if self.formulas:
+            self._transaction_formulas = dict(self.formulas.formulas)
+
+    def abort(self, error: Exception | None = None):
+        """Undo every write of the transaction and end it.
+
+        With the error of a failed statement, the transaction is rolled back
+        but stays open, see begin.
+        """
+        if not self.in_transaction:
+            raise ValueError(NO_TRANSACTION_ERROR)
+        self.rollback(TRANSACTION_SAVEPOINT)
+        # Formulas detached by direct writes since begin
+        for name, formula in self._transaction_formulas.items():
+            if name not in self.formulas:
+                self.formulas.add(name, formula)
+        if error is None:
+            self.transaction_error = None
+            self.commit()
+        elif self.transaction_error is None:
+            self.transaction_error = str(error)
+
+    @contextmanager
+    def transaction(self) -> Iterator["ExecutionContext"]:
+        """Run the block in a transaction, committed unless it raises."""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.abort()
+            raise
+        self.commit()
+
+    def _written(self, start: int = 0) -> Iterator[str]:
+        """Names of the variables written since the journal position."""
+        return iter(dict.fromkeys(name for name, _ in self._journal[start:]))
+
+    def propagate(self, savepoint: str | None = None) -> int:
+        """Recompute the formulas whose inputs were written since the savepoint.
+
+        Without a savepoint, since the last commit. Returns the number of
+        formulas recomputed.
+        """
+        start = self._savepoints.get(savepoint, 0)
+        if not self.formulas or len(self._journal) <= start:
+            return 0
+        return self.formulas.update(self._written(start), self._recompute)
+
+    def _recompute(self, name: str, formula: Formula):
+        program = self.bind(formula.compiled)
+        if program is None:
+            value = ExpressionExecutor(self).execute_postfix(formula.compiled.postfix)
+        else:
+            value = program(self)
+        self.set_variable(name, value)
+
+    def clear(self):
+        """Remove every variable and formula."""
+        if self.in_transaction:
+            raise ValueError("Cannot clear variables in a transaction")
+        if self.wal is not None:
+            self.wal.log_clear()
+        self.variables.clear()
+        self.formulas = None
+        if self.name_index is not None:
+            self.name_index.clear()
+
+    def save(self, path: str):
+        """Write the variables to a binary snapshot, see snapshot.py."""
+        write_snapshot(path, self.variables.items(), self.backend)
+
+    @classmethod
+    def load(cls, path: str) -> "ExecutionContext":
+        """Restore a context written by save(), with the backend it was saved with.
+
+        The snapshot is memory-mapped and values are decoded as they are read.
+        """
+        snapshot = Snapshot(path)
+        context = cls({}, snapshot.backend())
+        context._attach(SnapshotVariables(snapshot))
+        return context
+
+    def _attach(self, variables: SnapshotVariables):
+        self.variables = variables
+
+    def bind(self, compiled: "CompiledExpression") -> Program | None:
+        """Return the program to run the compiled expression against this context.
+
+        Programs are compiled for the Decimal backend; other backends compile
+        their own, once per context.
+        """
+        if compiled.program is None or self.backend.native:
+            return compiled.program
+        return self._bound_program(compiled)
+
+    def _bound_program(self, compiled: "CompiledExpression") -> Program | None:
+        program = self._programs.get(compiled, MISSING)
+        if program is MISSING:
+            if len(self._programs) >= EXPRESSION_CACHE_SIZE:
+                self._programs.clear()
+            program = self._programs[compiled] = self._compile(compiled)
+        return program
+
+    def _optimized_postfix(self, compiled: "CompiledExpression") -> list[Token]:
+        if self.backend.native:
+            return compiled.optimized.postfix
+        return optimize_postfix(compiled.postfix, self.backend).postfix
+
+    def _compile(self, compiled: "CompiledExpression") -> Program | None:
+        return compile_postfix(self._optimized_postfix(compiled), backend=self.backend)
 
     def __repr__(self):
-        return (
-            "("
-            + ", ".join(f"{var}={value}" for var, value in self.variables.items())
-            + ")"
+        return "".join(
+            format_variables(self.variables.items(), self.backend.format, ", ")
+        )
+
+
+class SlotVariables(MutableMapping):
+    """Dict view over the variables of a SlotExecutionContext."""
+
+    def __init__(self, context: "SlotExecutionContext"):
+        self._context = context
+
+    def __getitem__(self, name: str) -> Number:
+        return self._context.values[self._context.defined[name]]
+
+    def __setitem__(self, name: str, value: Number):
+        slot = self._context.slot(name)
+        self._context.defined.setdefault(name, slot)
+        self._context.values[slot] = value
+
+    def __delitem__(self, name: str):
+        slot = self._context.defined.pop(name)
+        self._context.values[slot] = MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._context.defined)
+
+    def __len__(self) -> int:
+        return len(self._context.defined)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._context.defined
+
+    def clear(self):
+        # Slots stay allocated so programs bound to them remain valid
+        for slot in self._context.defined.values():
+            self._context.values[slot] = MISSING
+        self._context.defined.clear()
+
+    def copy(self) -> dict[str, Number]:
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class SlotExecutionContext(ExecutionContext):
+    """Execution context that keeps values in a list indexed by slot.
+
+    Every variable name is given a slot in ``symbols`` the first time it is
+    seen. Compiled expressions are bound to this context once, resolving
+    their variables to slots, so repeated statements read and write values
+    by index. ``variables`` is a dict view in definition order.
+    """
+
+    def __init__(
+        self, variables: dict[str, Number], backend: NumericBackend | None = None
+    ):
+        super().__init__({}, backend)
+        # Variable name -> slot, for every name seen so far
+        self.symbols: dict[str, int] = {}
+        # Slot -> variable name
+        self.names: list[str] = []
+        # Slot -> value, MISSING for variables that are not defined
+        self.values: list[Number | object] = []
+        # Variable name -> slot, for defined variables in definition order
+        self.defined: dict[str, int] = {}
+        self.variables = SlotVariables(self)
+        self.variables.update(self._convert(variables))
+
+    def slot(self, name: str) -> int:
+        """Return the slot of the variable, allocating one for new names."""
+        slot = self.symbols.get(name)
+        if slot is None:
+            slot = self.symbols[name] = len(self.values)
+            self.names.append(name)
+            self.values.append(MISSING)
+        return slot
+
+    def get_variable(self, name: str) -> Number:
+        slot = self.defined.get(name)
+        if slot is None:
+            raise ValueError(f"Undefined variable: {name}")
+        return self.values[slot]
+
+    def get_or_create_variable(self, name: str) -> Number:
+        slot = self.defined.get(name)
+        if slot is None:
+            slot = self.defined[name] = self.slot(name)
+            self._journal.append((slot, MISSING))
+            self.values[slot] = self.backend.nan
+            if self.name_index is not None:
+                self.name_index.add(name)
+        return self.values[slot]
+
+    def set_variable(self, name: str, value: Number):
+        slot = self.defined.get(name)
+        if slot is None:
+            raise ValueError(f"Undefined variable: {name}")
+        self.store(slot, value)
+
+    def store(self, slot: int, value: Number):
+        """Write to a defined variable by slot, recording it for rollback."""
+        self._journal.append((slot, self.values[slot]))
+        self.values[slot] = value
+
+    def _restore(self, slot: int, previous: Number | object):
+        self.values[slot] = previous
+        if previous is MISSING:
+            del self.defined[self.names[slot]]
+            if self.name_index is not None:
+                self.name_index.discard(self.names[slot])
+
+    def _written(self, start: int = 0) -> Iterator[str]:
+        return iter(
+            dict.fromkeys(self.names[slot] for slot, _ in self._journal[start:])
         )
 
+    def _attach(self, variables: SnapshotVariables):
+        # Values live in slots, so the snapshot is read eagerly
+        self.variables.update(variables)
+
+    def bind(self, compiled: "CompiledExpression") -> Program | None:
+        if compiled.program is None:
+            return None
+        return self._bound_program(compiled)
+
+    def _compile(self, compiled: "CompiledExpression") -> Program | None:
+        return compile_postfix(self._optimized_postfix(compiled), self, self.backend)
+
+
+class CompiledExpression:
+    """An expression converted to postfix and compiled to a closure program.
+
+    The program is compiled from the postfix after constant folding, see
+    optimizer.py and dump(). ``program`` is None for malformed postfix, which
+    is left to the interpreter.
+    """
+
+    __slots__ = ("variable_name", "assignment", "postfix", "optimized", "program")
+
+    def __init__(
+        self, variable_name: str | None, assignment: str | None, postfix: list[Token]
+    ):
+        self.variable_name = variable_name
+        self.assignment = assignment
+        self.postfix = postfix
+        self.optimized: Optimized = optimize_postfix(postfix)
+        self.program: Program | None = compile_postfix(self.optimized.postfix)
+
+    @classmethod
+    def from_statement(
+        cls, statement: "Statement | Expression", postfix: list[Token] | None = None
+    ) -> "CompiledExpression":
+        if postfix is None:
+            postfix = statement.to_postfix()
+        if statement.variable_name is None:
+            return cls(None, None, postfix)
+        return cls(statement.variable_name.value, statement.assignment.value, postfix)
+
+    from_expression = from_statement
+
+    def dump(self, backend: NumericBackend = DECIMAL) -> str:
+        """Show the postfix before and after optimization for the backend.
+
+        Every folded or simplified subtree is listed below as
+        ``original => replacement``.
+        """
+        if backend.native:
+            optimized = self.optimized
+        else:
+            optimized = optimize_postfix(self.postfix, backend)
+        lines = [
+            f"postfix:   {self._statement(self.postfix)}",
+            f"optimized: {self._statement(optimized.postfix)}",
+        ]
+        for before, after in rewritten(self.postfix, optimized.rewrites, backend):
+            lines.append(f"  {_join(before)} => {_join(after)}")
+        return "\n".join(lines)
+
+    def _statement(self, postfix: list[Token]) -> str:
+        if self.variable_name is None:
+            return _join(postfix)
+        return f"{self.variable_name} {self.assignment} {_join(postfix)}"
+
+    def __repr__(self):
+        return f"CompiledExpression({self._statement(self.postfix)})"
+
+
+def _join(postfix: list[Token]) -> str:
+    return " ".join(str(token.value) for token in postfix)
+
+
+def _log_result(program: Program) -> Program:
+    def run(context: ExecutionContext) -> Number:
+        value = program(context)
+        logger.debug("Result: %s", value)
+        return value
+
+    return run
+
 
 class ExpressionExecutor:
     def __init__(self, context: ExecutionContext):
         self.context = context
 
-    def apply_assignment(self, variable_name: str, value: Decimal, operator: str):
+    def apply_assignment(self, variable_name: str, value: Number, operator: str):
         current_value = self.context.get_or_create_variable(variable_name)
         if operator == "=":
             return value
-        elif current_value.is_nan():
+        elif self.context.backend.is_nan(current_value):
             raise ValueError(
                 f"Undefined variable: {variable_name} cannot be assigned with {operator}"
             )
@@ -61,7 +502,7 @@ class ExpressionExecutor:
         elif operator == "*=":
             return current_value * value
         elif operator == "%=":
-            return current_value % value
+            return self.context.backend.apply("%", current_value, value)
         elif operator == "/=":
             if value == 0:
                 raise ValueError("Division by zero")
@@ -69,89 +510,155 @@ class ExpressionExecutor:
         else:
             raise ValueError(f"Unsupported operator: {operator}")
 
-    def execute_expression(self, expression: Expression) -> str:
-        expression_postfix = expression.to_postfix()
-        value = self.execute_postfix(expression_postfix)
-        if expression.variable_name is not None:
-            logger.debug(
-                f"Variable assignment: {expression.variable_name.value} = {value}"
-            )
-            new_assigned = self.apply_assignment(
-                expression.variable_name.value, value, expression.assignment.value
-            )
-            self.context.set_variable(expression.variable_name.value, new_assigned)
-            logger.debug(
-                f"Variable {expression.variable_name} assigned to {new_assigned}"
-            )
+    def execute_expression(self, expression: "Expression") -> str:
+        """Interpret the expression's postfix form token by token."""
+        postfix = expression.to_postfix()
+        if expression.variable_name is None:
+            return self._execute_statement(None, None, self.execute_postfix, postfix)
+        return self._execute_statement(
+            expression.variable_name.value,
+            expression.assignment.value,
+            self.execute_postfix,
+            postfix,
+        )
 
-            value = "{:f}".format(new_assigned)
-        else:
-            value = "{:f}".format(value)
-        self.context.commit()
-        return value
+    def execute_stream(self, expression: str) -> str:
+        """Interpret the expression while it is being tokenized and parsed.
 
-    def execute_postfix(self, postfix: list[Token]) -> Decimal:
-        logger.debug("Postfix: " + " ".join(str(token.value) for token in postfix))
-        stack = []
+        Tokens and postfix tokens are consumed as they are produced, so memory
+        is proportional to the nesting depth of the expression, not to its
+        length. Nothing is cached or optimized.
+        """
+        statement = stream(expression)
+        variable_name = assignment = None
+        if statement.variable_name is not None:
+            variable_name = statement.variable_name.value
+            assignment = statement.assignment.value
+        return self._execute_statement(
+            variable_name, assignment, self.execute_postfix, statement.postfix()
+        )
 
+    def execute_compiled(self, compiled: CompiledExpression) -> str:
+        """Run a compiled expression, interpreting it if it has no program."""
+        program = self.context.bind(compiled)
+        if program is None:
+            return self._execute_statement(
+                compiled.variable_name,
+                compiled.assignment,
+                self.execute_postfix,
+                compiled.postfix,
+            )
+        if logger.isEnabledFor(logging.DEBUG):
+            # The records execute_postfix writes for interpreted expressions
+            logger.debug("Postfix: %s", _join(compiled.postfix))
+            program = _log_result(program)
+        return self._execute_statement(
+            compiled.variable_name, compiled.assignment, program, self.context
+        )
+
+    def _execute_statement(
+        self,
+        variable_name: str | None,
+        assignment: str | None,
+        evaluate: Callable[[Any], Number],
+        argument: Any,
+    ) -> str:
+        if self.context.transaction_error is not None:
+            raise ValueError(TRANSACTION_FAILED_ERROR)
+        self.context.savepoint(STATEMENT_SAVEPOINT)
         try:
-            i = 0
-            while i < len(postfix):
-                token = postfix[i]
-
-                if token.token_type == TokenType.number:
-                    stack.append(Decimal(token.value))
-                elif token.token_type == TokenType.variable:
-                    stack.append(self.context.get_variable(token.value))
-                elif token.value in {"++post", "--post"}:
-                    self._apply_post_operator(token, stack)
-                elif token.value in {"++pre", "--pre"}:
-                    self._apply_pre_operator(token, postfix, i, stack)
-                    i += 1  # Skip the next variable
-                elif token.value in {"+", "-", "*", "/", "%"}:
-                    self._apply_operator(token, stack)
+            with self.context.backend.arithmetic():
+                if metrics.enabled:
+                    value = metrics.timed("evaluate", evaluate, argument)
                 else:
-                    raise ValueError(f"Unknown token: {token}")
-
-                i += 1
-
-            if len(stack) != 1:
-                raise ValueError("Invalid expression")
-            logger.debug(f"Result: {stack[0]}")
-            return stack[0]
-
+                    value = evaluate(argument)
+                return self._store_result(variable_name, assignment, value)
         except Exception as e:
-            # Rollback state in case of error
-            self.context.rollback()
+            # Rollback every write of the failed statement, or of its transaction
+            if self.context.in_transaction:
+                self.context.abort(e)
+            else:
+                self.context.rollback(STATEMENT_SAVEPOINT)
             raise e
 
-    def _apply_post_operator(self, token: str, stack: list[Decimal]):
-        """Apply post-increment or post-decrement operators."""
-        if not stack:
-            raise ValueError(f"Invalid use of '{token}'")
+    def _store_result(
+        self, variable_name: str | None, assignment: str | None, value: Number
+    ) -> str:
+        if variable_name is not None:
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                logger.debug("Variable assignment: %s = %s", variable_name, value)
+            new_assigned = self.apply_assignment(variable_name, value, assignment)
+            self.context.set_variable(variable_name, new_assigned)
+            if debug:
+                logger.debug("Variable %s assigned to %s", variable_name, new_assigned)
+
+            value = self.context.backend.format(new_assigned)
+        else:
+            value = self.context.backend.format(value)
+        self.context.propagate(STATEMENT_SAVEPOINT)
+        self.context.commit_statement()
+        return value
 
-        value = stack.pop()
-        stack.append(value)  # Push the value as-is
+    def execute_postfix(self, postfix: Iterable[Token]) -> Number:
+        """Interpret postfix tokens, from a list or consumed from an iterator."""
+        if isinstance(postfix, list) and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Postfix: %s", " ".join(str(token.value) for token in postfix))
+        stack = []
+        pre_operator = None  # ++pre or --pre waiting for its variable
+        # Variable whose value is on top of the stack, target of a post-increment
+        loaded = None
+
+        for token in postfix:
+            target, loaded = loaded, None
+            if pre_operator is not None:
+                self._apply_pre_operator(pre_operator, token, stack)
+                pre_operator = None
+                loaded = token.value
+            elif token.token_type == TokenType.number:
+                stack.append(self.context.backend.number(token.value))
+            elif token.token_type == TokenType.variable:
+                stack.append(self.context.get_variable(token.value))
+                loaded = token.value
+            elif token.value in {"++post", "--post"}:
+                self._apply_post_operator(token, target, stack)
+            elif token.value in {"++pre", "--pre"}:
+                pre_operator = token
+            elif token.value in {"+", "-", "*", "/", "%"}:
+                self._apply_operator(token, stack)
+            else:
+                raise ValueError(f"Unknown token: {token}")
 
-        # Update the corresponding variable in context
-        self._update_variable(token, value)
+        if pre_operator is not None:
+            raise ValueError(f"{pre_operator} operator must be followed by a variable")
+        if len(stack) != 1:
+            raise ValueError("Invalid expression")
+        logger.debug("Result: %s", stack[0])
+        return stack[0]
 
-    def _apply_pre_operator(
-        self, token: Token, postfix: list[Token], i: int, stack: list[Decimal]
+    def _apply_post_operator(
+        self, token: Token, variable: str | None, stack: list[Number]
     ):
-        """Apply pre-increment or pre-decrement operators."""
-        var = postfix[i + 1]
+        """Apply a post-increment or post-decrement to the variable just loaded.
+
+        The value on the stack is left as it is, only the variable is updated.
+        """
+        if variable is None:
+            raise ValueError(f"Invalid use of '{token}'")
+        delta = 1 if token.value == "++post" else -1
+        self.context.set_variable(variable, stack[-1] + delta)
+
+    def _apply_pre_operator(self, token: Token, var: Token, stack: list[Number]):
+        """Apply a pre-increment or pre-decrement operator to the next token."""
         if var.token_type != TokenType.variable:
-            raise ValueError(f"Invalid use of '{postfix[i+1]}' after '{token}'")
-        if i + 1 >= len(postfix) or var.token_type != TokenType.variable:
-            raise ValueError(f"{token} operator must be followed by a variable")
+            raise ValueError(f"Invalid use of '{var}' after '{token}'")
 
         value = self.context.get_variable(var.value)
         new_value = value + 1 if token.value == "++pre" else value - 1
         self.context.set_variable(var.value, new_value)
         stack.append(new_value)
 
-    def _apply_operator(self, token: Token, stack: list[Decimal]):
+    def _apply_operator(self, token: Token, stack: list[Number]):
         """Apply arithmetic operators."""
         if len(stack) < 2:
             raise ValueError(f"Insufficient operands for '{token}'")
@@ -161,40 +668,113 @@ class ExpressionExecutor:
         result = self._apply_operator_logic(a, b, token)
         stack.append(result)
 
-    @staticmethod
-    def _apply_operator_logic(a: Decimal, b: Decimal, operator: Token) -> Decimal:
+    def _apply_operator_logic(self, a: Number, b: Number, operator: Token) -> Number:
         """Perform the actual arithmetic operation."""
-        operator = operator.value
-        if operator == "+":
-            return a + b
-        elif operator == "-":
-            return a - b
-        elif operator == "*":
-            return a * b
-        elif operator == "/":
-            if b == 0:
-                raise ValueError("Division by zero")
-            return a / b
-        elif operator == "%":
-            return a % b
-        else:
-            raise ValueError(f"Unsupported operator: {operator}")
+        return self.context.backend.apply(operator.value, a, b)
 
-    def _update_variable(self, token: Token, value: Decimal):
-        """Find the variable corresponding to the value and update it."""
-        for var, var_value in self.context.variables.items():
-            if var_value == value:
-                self.context.set_variable(
-                    var, var_value + (1 if token.value == "++post" else -1)
-                )
-                break
-        else:
-            raise ValueError(f"Undefined variable for value: {value}")
 
+expression_cache: ExpressionCache[CompiledExpression] = ExpressionCache(
+    EXPRESSION_CACHE_SIZE
+)
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """Parse and validate the expression and convert it to postfix."""
+    if not metrics.enabled:
+        return CompiledExpression.from_statement(parse(tokenize(expression)))
+    tokens = metrics.timed("tokenize", tokenize, expression)
+    statement = metrics.timed("validate", parse, tokens)
+    postfix = metrics.timed("postfix", statement.to_postfix)
+    return metrics.timed(
+        "compile", CompiledExpression.from_statement, statement, postfix
+    )
+
+
+def explain(expression: str, context: ExecutionContext | None = None) -> str:
+    """Dump the optimized program of the expression, see CompiledExpression.dump."""
+    compiled = expression_cache.get(expression, compile_expression)
+    return compiled.dump(DECIMAL if context is None else context.backend)
+
+
+def define_formula(
+    statement: str,
+    context: ExecutionContext,
+    cache: ExpressionCache[CompiledExpression] | None = None,
+) -> str:
+    """Assign ``name = expression`` and keep the variable bound to the expression.
+
+    The variable is recomputed whenever a statement writes to a variable it
+    depends on, see reactive.py. Returns the assigned value.
+    """
+    if cache is None:
+        cache = expression_cache
+    compiled = cache.get(statement, compile_expression)
+    if compiled.variable_name is None or compiled.assignment != "=":
+        raise ValueError("A formula must assign a variable, e.g. total := price * qty")
+    if any(token.value in VALID_UNARY_OPERATORS for token in compiled.postfix):
+        raise ValueError("A formula cannot use ++ or --")
+    if context.in_transaction:
+        raise ValueError("Formulas cannot be defined in a transaction")
 
-def execute_expression(expression: str, context: ExecutionContext) -> str:
-    """Execute the expression and return the result."""
+    if context.formulas is None:
+        context.formulas = FormulaGraph()
+    reads = formula_reads(compiled)
+    context.formulas.check_cycle(compiled.variable_name, reads)
+    wal = context.wal
+    if wal is not None:
+        wal.log_formula(compiled.variable_name, statement)
+    try:
+        result = ExpressionExecutor(context).execute_compiled(compiled)
+    finally:
+        if wal is not None:
+            # Not logged when the statement failed
+            wal.pending_formulas.clear()
+    context.formulas.add(compiled.variable_name, Formula(compiled, reads, statement))
+    return result
+
+
+def execute_transaction_command(command: str, context: ExecutionContext):
+    """Run ``begin``, ``commit`` or ``abort``, see ExecutionContext.begin."""
+    if command == "begin":
+        context.begin()
+    elif not context.in_transaction:
+        raise ValueError(NO_TRANSACTION_ERROR)
+    elif command == "commit":
+        context.commit()
+    else:
+        context.abort()
+
+
+def execute_expression(
+    expression: str,
+    context: ExecutionContext,
+    cache: ExpressionCache[CompiledExpression] | None = None,
+) -> str:
+    """Execute the expression and return the result.
+
+    Compiled expressions are looked up in ``cache``, or in the module-level
+    ``expression_cache`` when no cache is given. Expressions longer than
+    STREAM_THRESHOLD characters are not compiled but streamed, see
+    ExpressionExecutor.execute_stream.
+    """
+    if metrics.enabled:
+        return metrics.timed("statement", _execute, expression, context, cache)
+    return _execute(expression, context, cache)
+
+
+def _execute(
+    expression: str,
+    context: ExecutionContext,
+    cache: ExpressionCache[CompiledExpression] | None,
+) -> str:
+    if FORMULA_OPERATOR in expression:
+        return define_formula(
+            expression.replace(FORMULA_OPERATOR, "=", 1), context, cache
+        )
     # Initialize the calculator and execute the expression
     calc = ExpressionExecutor(context)
-    expression = Expression.from_expression(expression)
-    return calc.execute_expression(expression)
+    if len(expression) > STREAM_THRESHOLD:
+        return calc.execute_stream(expression)
+    if cache is None:
+        cache = expression_cache
+    return calc.execute_compiled(cache.get(expression, compile_expression))
@@ -0,0 +1,239 @@
+from functools import partial
+from typing import Callable, Protocol
+
+from consts import MISSING, VALID_ARITHMETIC_OPERATORS
+from models.token import Token, TokenType
+from numeric import DECIMAL, Number, NumericBackend
+
+
+class Context(Protocol):
+    def get_variable(self, name: str) -> Number: ...
+
+    def set_variable(self, name: str, value: Number): ...
+
+
+class SlotStorage(Protocol):
+    """Variable storage addressed by integer slots, see SlotExecutionContext."""
+
+    values: list
+
+    def slot(self, name: str) -> int: ...
+
+    def store(self, slot: int, value: Number): ...
+
+
+Program = Callable[[Context], Number]
+
+
+def _constant(value: Number) -> Program:
+    def run(context: Context) -> Number:
+        return value
+
+    return run
+
+
+def _load(name: str) -> Program:
+    def run(context: Context) -> Number:
+        return context.get_variable(name)
+
+    return run
+
+
+def _pre_increment(name: str, delta: int) -> Program:
+    def run(context: Context) -> Number:
+        value = context.get_variable(name) + delta
+        context.set_variable(name, value)
+        return value
+
+    return run
+
+
+def _post_increment(name: str, delta: int) -> Program:
+    def run(context: Context) -> Number:
+        value = context.get_variable(name)
+        context.set_variable(name, value + delta)
+        return value
+
+    return run
+
+
+def _slot_load(storage: SlotStorage, name: str) -> Program:
+    slot = storage.slot(name)
+    values = storage.values
+
+    def run(context: Context) -> Number:
+        value = values[slot]
+        if value is MISSING:
+            raise ValueError(f"Undefined variable: {name}")
+        return value
+
+    return run
+
+
+def _slot_pre_increment(storage: SlotStorage, name: str, delta: int) -> Program:
+    slot = storage.slot(name)
+    values = storage.values
+    store = storage.store
+
+    def run(context: Context) -> Number:
+        value = values[slot]
+        if value is MISSING:
+            raise ValueError(f"Undefined variable: {name}")
+        value = value + delta
+        store(slot, value)
+        return value
+
+    return run
+
+
+def _slot_post_increment(storage: SlotStorage, name: str, delta: int) -> Program:
+    slot = storage.slot(name)
+    values = storage.values
+    store = storage.store
+
+    def run(context: Context) -> Number:
+        value = values[slot]
+        if value is MISSING:
+            raise ValueError(f"Undefined variable: {name}")
+        store(slot, value + delta)
+        return value
+
+    return run
+
+
+def _add(left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        return left(context) + right(context)
+
+    return run
+
+
+def _subtract(left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        return left(context) - right(context)
+
+    return run
+
+
+def _multiply(left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        return left(context) * right(context)
+
+    return run
+
+
+def _divide(left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        a = left(context)
+        b = right(context)
+        if b == 0:
+            raise ValueError("Division by zero")
+        return a / b
+
+    return run
+
+
+def _modulo(left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        return left(context) % right(context)
+
+    return run
+
+
+def _backend_modulo(modulo: Callable, left: Program, right: Program) -> Program:
+    def run(context: Context) -> Number:
+        return modulo(left(context), right(context))
+
+    return run
+
+
+BINARY_OPERATORS: dict[str, Callable[[Program, Program], Program]] = {
+    "+": _add,
+    "-": _subtract,
+    "*": _multiply,
+    "/": _divide,
+    "%": _modulo,
+}
+INCREMENTS = {"++pre": 1, "--pre": -1, "++post": 1, "--post": -1}
+# Running a program takes one Python frame per level of its tree; deeper
+# expressions (e.g. long sums, which are left-deep) are interpreted instead
+MAX_PROGRAM_DEPTH = 400
+
+
+def compile_postfix(
+    postfix: list[Token],
+    storage: SlotStorage | None = None,
+    backend: NumericBackend = DECIMAL,
+) -> Program | None:
+    """Turn a postfix token list into a tree of closures.
+
+    Literals are parsed once and operators are bound to their operands, so
+    running the program only performs the arithmetic and variable access.
+    Post-increments write directly to the variable they follow.
+
+    Variables are looked up by name through the context the program runs
+    against, or, when ``storage`` is given, resolved to its slots once here;
+    the program is then bound to that storage. Literals and modulo come
+    from the numeric ``backend``.
+
+    Returns None when the postfix is malformed (e.g. missing operands); such
+    expressions are left to ``ExpressionExecutor.execute_postfix`` so that
+    they fail with the interpreter's error messages and side effects. So are
+    expressions whose tree is deeper than MAX_PROGRAM_DEPTH.
+    """
+    if storage is None:
+        load, pre_increment, post_increment = _load, _pre_increment, _post_increment
+    else:
+        load = partial(_slot_load, storage)
+        pre_increment = partial(_slot_pre_increment, storage)
+        post_increment = partial(_slot_post_increment, storage)
+    operators = BINARY_OPERATORS
+    if backend.modulo is not None:
+        operators = {**operators, "%": partial(_backend_modulo, backend.modulo)}
+
+    stack: list[Program] = []
+    # Depth of the tree of every program on the stack
+    depths: list[int] = []
+    # Variable whose plain value is on top of the stack, target of a post-increment
+    loaded: str | None = None
+    i = 0
+    while i < len(postfix):
+        token = postfix[i]
+        if token.token_type == TokenType.variable:
+            stack.append(load(token.value))
+            depths.append(1)
+            loaded = token.value
+            i += 1
+            continue
+
+        if token.token_type == TokenType.number:
+            stack.append(_constant(backend.number(token.value)))
+            depths.append(1)
+        elif token.value in {"++pre", "--pre"}:
+            i += 1
+            if i >= len(postfix) or postfix[i].token_type != TokenType.variable:
+                return None
+            stack.append(pre_increment(postfix[i].value, INCREMENTS[token.value]))
+            depths.append(1)
+        elif token.value in {"++post", "--post"}:
+            if loaded is None:
+                return None
+            stack[-1] = post_increment(loaded, INCREMENTS[token.value])
+        elif token.value in VALID_ARITHMETIC_OPERATORS:
+            if len(stack) < 2:
+                return None
+            depth = max(depths.pop(), depths.pop()) + 1
+            if depth > MAX_PROGRAM_DEPTH:
+                return None
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(operators[token.value](left, right))
+            depths.append(depth)
+        else:
+            return None
+        loaded = None
+        i += 1
+
+    if len(stack) != 1:
+        return None
+    return stack[0]
@@ -0,0 +1,91 @@
+"""Completion of commands and variable names in the interactive shell.
+
+WordCompleter scans every word on each keystroke. NameIndex keeps the
+variable names sorted instead: the context updates it as statements create
+variables, roll them back or clear them, and a prefix lookup costs a binary
+search plus the matches returned. Inserting a name moves the names after
+it, so many names at once are loaded with a single sort (load, update).
+Only the shell imports this module.
+"""
+
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Iterable, Iterator
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+# Completions offered at once, at most
+COMPLETION_LIMIT = 100
+
+
+class NameIndex:
+    """Sorted set of variable names with prefix lookups, see matches."""
+
+    __slots__ = ("_names",)
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: list[str] = []
+        self.load(names)
+
+    def load(self, names: Iterable[str]):
+        """Replace the names of the index."""
+        self._names = sorted(set(names))
+
+    def update(self, names: Iterable[str]):
+        """Add many names, with one sort rather than an insert per name."""
+        self.load(chain(self._names, names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        i = bisect_left(self._names, name)
+        return i < len(self._names) and self._names[i] == name
+
+    def add(self, name: str):
+        if name not in self:
+            insort(self._names, name)
+
+    def discard(self, name: str):
+        i = bisect_left(self._names, name)
+        if i < len(self._names) and self._names[i] == name:
+            del self._names[i]
+
+    def clear(self):
+        self._names.clear()
+
+    def matches(self, prefix: str, limit: int = COMPLETION_LIMIT) -> list[str]:
+        """The first ``limit`` names starting with the prefix, in sorted order."""
+        names = self._names
+        start = bisect_left(names, prefix)
+        found = []
+        for i in range(start, min(start + limit, len(names))):
+            if not names[i].startswith(prefix):
+                break
+            found.append(names[i])
+        return found
+
+
+class ShellCompleter(Completer):
+    """Complete the word before the cursor with commands, then variable names.
+
+    At most ``limit`` completions are returned, so typing stays fast with any
+    number of variables.
+    """
+
+    def __init__(
+        self, commands: list[str], names: NameIndex, limit: int = COMPLETION_LIMIT
+    ):
+        self.commands = commands
+        self.names = names
+        self.limit = limit
+
+    def get_completions(
+        self, document: Document, complete_event: CompleteEvent
+    ) -> Iterator[Completion]:
+        word = document.get_word_before_cursor()
+        commands = [command for command in self.commands if command.startswith(word)]
+        names = self.names.matches(word, self.limit)
+        for match in (commands + names)[: self.limit]:
+            yield Completion(match, start_position=-len(word))
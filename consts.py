@@ -6,12 +6,20 @@ VALID_EQUALITY_OPERATORS = {"=", "+=", "-=", "*=", "/=", "%="}
 VALID_ARITHMETIC_OPERATORS = {"+", "-", "*", "/", "%"}
 VALID_UNARY_OPERATORS = {"++post", "--post", "++pre", "--pre"}
 VALID_OPERATORS = VALID_EQUALITY_OPERATORS | VALID_ARITHMETIC_OPERATORS
+# Binds a variable to its expression, e.g. total := price * qty
+FORMULA_OPERATOR = ":="
 
 
 VARIABLE_VALID_CHARS = set(ascii_letters + digits + "_")
 SUPPORTED_CHARS = set(ascii_letters + digits + "+-*/%=() ")
 GOODBYE_MESSAGE = "Goodbye!"
-COMMANDS = ["exit", "show", "clear", "help"]
+COMMANDS = ["exit", "show", "clear", "stats", "help", "begin", "commit", "abort"]
+# Commands of transaction blocks, see ExecutionContext.begin
+TRANSACTION_COMMANDS = {"begin", "commit", "abort"}
+NO_TRANSACTION_ERROR = "No transaction in progress"
+TRANSACTION_FAILED_ERROR = (
+    "Transaction failed, statements are ignored until commit or abort"
+)
 
 PRECEDENCE: dict[str, tuple[int, str]] = {
     "++post": (3, None),  # Post-increment (applies tightly to operand)
@@ -26,3 +34,7 @@ PRECEDENCE: dict[str, tuple[int, str]] = {
 }
 
 NUMBER_PATTERN = r"^-?\d+(\.\d+)?$"
+
+# Value of an unassigned variable slot, and the journaled previous value of a
+# variable that did not exist before a write
+MISSING = object()
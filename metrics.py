@@ -0,0 +1,163 @@
+"""Timings and counts of the phases of statement execution.
+
+Phases: ``tokenize``, ``validate`` (building the Expression), ``postfix``,
+``compile`` (optimizing and compiling the postfix), ``evaluate``,
+``commit``, ``rollback`` and ``statement`` (the whole execute_expression
+call). Tokenizing through compiling only happen on expression cache misses.
+
+Metrics are off unless CALCULATOR_METRICS=1 or ``metrics.enable()``. The
+instrumented code checks ``metrics.enabled`` before taking any timestamp,
+so disabled metrics cost one attribute test per phase.
+"""
+
+from time import perf_counter_ns
+from typing import Callable, NamedTuple, TypeVar
+
+from settings import METRICS_ENABLED
+
+T = TypeVar("T")
+
+# Order of the phases in stats()
+PHASES = (
+    "tokenize",
+    "validate",
+    "postfix",
+    "compile",
+    "evaluate",
+    "commit",
+    "rollback",
+    "statement",
+)
+
+# Every power of two is split into 2**SUB_BITS buckets, which bounds the
+# error of a percentile to 1/2**SUB_BITS of its value
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+
+
+def bucket_of(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_value(bucket: int) -> int:
+    """Middle of the range of values that fall in the bucket."""
+    if bucket < 2 * SUB_BUCKETS:
+        return bucket
+    shift = bucket // SUB_BUCKETS - 1
+    mantissa = bucket % SUB_BUCKETS + SUB_BUCKETS
+    return (mantissa << shift) + (1 << shift) // 2
+
+
+class PhaseStats(NamedTuple):
+    count: int
+    errors: int
+    total_ns: int
+    p50_ns: int
+    p99_ns: int
+    max_ns: int
+
+
+class Histogram:
+    """Log-linear histogram of durations in nanoseconds."""
+
+    __slots__ = ("counts", "count", "errors", "total", "max")
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.errors = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int, failed: bool = False):
+        bucket = bucket_of(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.errors += failed
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> int:
+        """Approximate value below which ``q`` of the durations fall."""
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(bucket_value(bucket), self.max)
+        return self.max
+
+    def stats(self) -> PhaseStats:
+        return PhaseStats(
+            self.count,
+            self.errors,
+            self.total,
+            self.quantile(0.5),
+            self.quantile(0.99),
+            self.max,
+        )
+
+
+class Metrics:
+    """Histograms of the phases, see the module docstring."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: dict[str, Histogram] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.histograms.clear()
+
+    def record(self, phase: str, duration_ns: int, failed: bool = False):
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram()
+        histogram.record(duration_ns, failed)
+
+    def timed(self, phase: str, function: Callable[..., T], *args) -> T:
+        """Call the function and record its duration under ``phase``."""
+        start = perf_counter_ns()
+        try:
+            result = function(*args)
+        except BaseException:
+            self.record(phase, perf_counter_ns() - start, failed=True)
+            raise
+        self.record(phase, perf_counter_ns() - start)
+        return result
+
+    def stats(self) -> dict[str, PhaseStats]:
+        """Statistics of every phase recorded so far."""
+        order = {phase: position for position, phase in enumerate(PHASES)}
+        phases = sorted(self.histograms, key=lambda phase: order.get(phase, len(order)))
+        return {phase: self.histograms[phase].stats() for phase in phases}
+
+    def format(self) -> str:
+        """Table of the statistics, durations in microseconds."""
+        if not self.enabled and not self.histograms:
+            return "Metrics are disabled, set CALCULATOR_METRICS=1 to enable them"
+        lines = [
+            f"{'phase':<10} {'count':>9} {'errors':>7} {'p50 µs':>9} "
+            f"{'p99 µs':>9} {'max µs':>9} {'total ms':>10}"
+        ]
+        for phase, stats in self.stats().items():
+            lines.append(
+                f"{phase:<10} {stats.count:>9} {stats.errors:>7} "
+                f"{stats.p50_ns / 1e3:>9.1f} {stats.p99_ns / 1e3:>9.1f} "
+                f"{stats.max_ns / 1e3:>9.1f} {stats.total_ns / 1e6:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+metrics = Metrics(METRICS_ENABLED)
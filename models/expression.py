@@ -1,103 +1,60 @@
-from pydantic import BaseModel, field_validator
-
-from consts import (
-    INVALID_PARENTHESIS_ERROR,
-    PRECEDENCE,
-    VARIABLE_VALID_CHARS,
-    VALID_EQUALITY_OPERATORS,
+from typing import Iterable, Iterator
+
+from pydantic import (
+    BaseModel,
+    InstanceOf,
+    PrivateAttr,
+    field_validator,
+    model_validator,
 )
+
+import parser
+from consts import VARIABLE_VALID_CHARS, VALID_EQUALITY_OPERATORS
 from models.token import Token, TokenType
+from parser import Node, Statement
 from tokenizer import tokenize
 
 
 class Expression(BaseModel):
-    variable_name: Token | None
-    assignment: Token | None  # e.g., '=', '+='
-    tokens: list[Token]
-
-    @staticmethod
-    def _handle_operator(token, stack, postfix):
-        """Handles operator tokens based on precedence and associativity."""
-        token_prec, _ = PRECEDENCE.get(
-            token.value, (0, "left")
-        )  # Get precedence for the operator
+    """A validated statement, see parser.py for the checks and postfix conversion.
 
-        # Special handling for pre-increment and pre-decrement operators
-        if token.value in {"++pre", "--pre", "++post", "--post"}:
-            postfix.append(token)
-            return
-        # Handle standard operators (e.g., +, -, *, /)
-        while stack:
-            top = stack[-1]
+    Executing statements goes through parser.py directly; this model is for
+    callers that want pydantic validation.
+    """
 
-            # Ignore postfix operators on the stack (processed separately)
-            if top.value in {"++post", "--post"}:
-                break
+    # Tokens are only instance-checked, they are validated by the tokenizer
+    variable_name: InstanceOf[Token] | None
+    assignment: InstanceOf[Token] | None  # e.g., '=', '+='
+    tokens: list[InstanceOf[Token]]
+    _tree: Node | None = PrivateAttr(default=None)
 
-            # Check precedence and associativity for stack's top operator
-            top_prec, top_assoc = PRECEDENCE.get(
-                top.value, (0, "left")
-            )  # Use get() to avoid KeyError
-
-            # Pop from the stack if:
-            # - Top operator has higher precedence
-            # - Top operator has equal precedence and is left-associative
-            if top_prec > token_prec or (
-                top_prec == token_prec and top_assoc == "left"
-            ):
-                postfix.append(stack.pop())
-            else:
-                break
-
-        # Push the current operator onto the stack
-        stack.append(token)
-
-    @staticmethod
-    def _handle_parentheses(token, stack, postfix):
-        """Handle parentheses - push '(' to stack and pop until '(' for ')'."""
-        if token.value == "(":
-            stack.append(token)
-        elif token.value == ")":
-            while stack and stack[-1].value != "(":
-                postfix.append(stack.pop())
-            if not stack or stack[-1].value != "(":
-                raise ValueError(INVALID_PARENTHESIS_ERROR)
-            stack.pop()
+    @property
+    def tree(self) -> Node | None:
+        """The expression tree, see parser.parse_tree."""
+        return self._tree
 
     def to_postfix(self) -> list[Token]:
-        stack = []
-        postfix = []
-
-        for token in self.tokens:
-            if token.token_type in {TokenType.number, TokenType.variable}:
-                # Append the variable to the postfix expression first
-                postfix.append(token)
-            elif token.token_type == TokenType.parentheses:
-                self._handle_parentheses(token, stack, postfix)
-            elif token.token_type == TokenType.operator:
-                self._handle_operator(token, stack, postfix)
-
-        # Pop any remaining operators in the stack
-        while stack:
-            postfix.append(stack.pop())
+        if self._tree is not None:
+            return self._tree.postfix()
+        return parser.to_postfix(self.tokens)
 
-        return postfix
+    @staticmethod
+    def iter_postfix(tokens: Iterable[Token]) -> Iterator[Token]:
+        """Generator version of to_postfix, see parser.iter_postfix."""
+        return parser.iter_postfix(tokens)
 
     @classmethod
     def from_expression(cls, expression: str) -> "Expression":
-        tokens = tokenize(expression)
-        if (
-            len(tokens) >= 3
-            and tokens[0].token_type == TokenType.variable
-            and tokens[1].token_type == TokenType.operator
-            and tokens[1].value in VALID_EQUALITY_OPERATORS
-        ):
-            result = cls(
-                variable_name=tokens[0], assignment=tokens[1], tokens=tokens[2:]
-            )
-        else:
-            result = cls(variable_name=None, assignment=None, tokens=tokens)
-        return result
+        return cls.from_tokens(tokenize(expression))
+
+    @classmethod
+    def from_tokens(cls, tokens: list[Token]) -> "Expression":
+        return cls(**parser.split_assignment(tokens)._asdict())
+
+    @staticmethod
+    def stream(expression: str | Iterable[Token]) -> Statement:
+        """Tokenize and validate the expression lazily, see parser.stream."""
+        return parser.stream(expression)
 
     @field_validator("variable_name")
     def validate_variable_name(cls, name: Token):
@@ -116,61 +73,8 @@ class Expression(BaseModel):
             raise ValueError(f"Unsupported operator: {op}")
         return op
 
-    @field_validator("tokens")
-    def is_balanced_parentheses(cls, tokens: list[Token]):
-        stack = []
-        for token in tokens:
-            if token.value == "(":
-                stack.append(token)
-            elif token.value == ")":
-                if not stack:
-                    raise ValueError(INVALID_PARENTHESIS_ERROR)
-                stack.pop()
-        if stack:
-            raise ValueError(INVALID_PARENTHESIS_ERROR)
-        return tokens
-
-    @field_validator("tokens")
-    def validate_consecutive_operators(cls, tokens: list[Token]):
-        """Validate that there are no invalid consecutive operators."""
-        prev_token = None
-        cls._validate_increment_decrement_combinations(tokens)
-        for i, token in enumerate(tokens):
-            if token.token_type == TokenType.operator:
-                if prev_token and prev_token.token_type == TokenType.operator:
-                    cls._validate_same_operators(prev_token, token)
-            prev_token = token
-        return tokens
-
-    @staticmethod
-    def _validate_same_operators(prev_token: Token, token: Token):
-        """Validate that there are no consecutive same operators like '++ ++' or '-- --'."""
-        if prev_token.value == token.value:
-            raise ValueError(
-                f"Invalid consecutive operators: {prev_token.value} and {token.value}"
-            )
-
-    @staticmethod
-    def _validate_increment_decrement_combinations(tokens: list[Token]):
-        """Validate valid and invalid combinations of pre and post unary operators."""
-        last_variable = None  # To track the last seen variable
-
-        for token in tokens:
-            if token.token_type == TokenType.variable:
-                # If we have seen the same variable previously, it's invalid
-                if last_variable == token.value:
-                    raise ValueError(
-                        f"Multiple unary operators applied to the same variable: {token.value}"
-                    )
-                last_variable = token.value  # Update the last seen variable
-
-            elif token.token_type == TokenType.operator and token.value in {
-                "++pre",
-                "--pre",
-                "++post",
-                "--post",
-            }:
-                # No action needed for unary operators themselves; we just need to track variables
-                continue
-
-        # No further action needed; we just ensure that each variable is only used once in the token list
+    @model_validator(mode="after")
+    def parse_tokens(self) -> "Expression":
+        """Validate the parentheses and operators and build the tree."""
+        self._tree = parser.parse_tree(self.tokens)
+        return self
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, model_validator
+from typing import NamedTuple
 import re
 from consts import (
     VALID_UNARY_OPERATORS,
@@ -9,6 +9,11 @@ from consts import (
 )
 import enum
 
+NUMBER_REGEX = re.compile(NUMBER_PATTERN)
+ALL_OPERATORS = (
+    VALID_UNARY_OPERATORS | VALID_ARITHMETIC_OPERATORS | VALID_EQUALITY_OPERATORS
+)
+
 
 class TokenType(enum.Enum):
     number = "number"
@@ -17,14 +22,35 @@ class TokenType(enum.Enum):
     parentheses = "parentheses"
 
 
-class Token(BaseModel):
+class Token(NamedTuple):
+    """An immutable (value, token_type) pair.
+
+    Construction does not validate the value; use Token.validated (strict
+    mode) for tokens that do not come from the tokenizer. Operator and
+    parenthesis tokens are shared instances, see Token.operator and
+    Token.parenthesis.
+    """
+
     value: str
     token_type: TokenType
 
-    @model_validator(mode="after")
-    def validate_values(self):
-        if self.token_type == TokenType.number and not re.match(
-            NUMBER_PATTERN, self.value
+    @classmethod
+    def validated(cls, value: str, token_type: TokenType) -> "Token":
+        return cls(value, token_type).validate()
+
+    @staticmethod
+    def operator(value: str) -> "Token":
+        if value not in OPERATOR_TOKENS:
+            raise ValueError(f"Invalid operator: {value}")
+        return OPERATOR_TOKENS[value]
+
+    @staticmethod
+    def parenthesis(value: str) -> "Token":
+        return PARENTHESIS_TOKENS[value]
+
+    def validate(self) -> "Token":
+        if self.token_type == TokenType.number and not NUMBER_REGEX.match(
+            self.value
         ):
             raise ValueError(f"Invalid number: {self.value}")
         if (
@@ -33,12 +59,15 @@ class Token(BaseModel):
             and self.value[0].isalpha()
         ):
             raise ValueError(f"Invalid variable name: {self.value}")
-        if (
-            self.token_type == TokenType.operator
-            and self.value
-            not in VALID_UNARY_OPERATORS
-            | VALID_ARITHMETIC_OPERATORS
-            | VALID_EQUALITY_OPERATORS
-        ):
+        if self.token_type == TokenType.operator and self.value not in ALL_OPERATORS:
             raise ValueError(f"Invalid operator: {self.value}")
         return self
+
+    def __str__(self):
+        return f"value={self.value!r} token_type={self.token_type!r}"
+
+
+OPERATOR_TOKENS = {
+    value: Token(value, TokenType.operator) for value in sorted(ALL_OPERATORS)
+}
+PARENTHESIS_TOKENS = {value: Token(value, TokenType.parentheses) for value in "()"}
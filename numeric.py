@@ -0,0 +1,206 @@
+"""Numeric backends: the number type an ExecutionContext computes with.
+
+A backend parses literals, supplies the placeholder for newly created
+variables, implements modulo and formats results. ``+``, ``-``, ``*`` and
+``/`` use the number type's own operators. Modulo truncates towards zero
+(the sign follows the dividend) in every backend, as Decimal does.
+"""
+
+import decimal
+import math
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager, nullcontext
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Callable
+
+from settings import DECIMAL_PRECISION, DECIMAL_ROUNDING, NUMERIC_BACKEND
+
+Number = Decimal | float | Fraction
+
+NO_CONTEXT = nullcontext()
+
+
+class NumericBackend(ABC):
+    name: str
+    # Programs compiled for the default Decimal backend can run unchanged
+    native = False
+    # Replaces the "%" operator when the type's own modulo has other semantics
+    modulo: Callable[[Any, Any], Any] | None = None
+    # Identities the optimizer may remove, they return x unchanged
+    identities: frozenset[str] = frozenset()
+    # Results are rounded, so identities only hold for results of arithmetic
+    rounds = False
+
+    @abstractmethod
+    def number(self, text: str) -> Number:
+        """Parse the text of a number token."""
+
+    def literal(self, value: Number) -> str:
+        """Text of a number token that parses back to exactly this value."""
+        return str(value)
+
+    def is_unit(self, value: Number, unit: int) -> bool:
+        """Whether the literal value is the identity element 0 or 1."""
+        return value == unit
+
+    @abstractmethod
+    def convert(self, value: Any) -> Number:
+        """Convert a value given from outside (e.g. an initial variable)."""
+
+    @property
+    def nan(self) -> Number:
+        """Placeholder value of a variable created by an assignment."""
+        return float("nan")
+
+    @staticmethod
+    def is_nan(value: Number) -> bool:
+        return value != value
+
+    def format(self, value: Number) -> str:
+        return str(value)
+
+    def apply(self, operator: str, a: Number, b: Number) -> Number:
+        """Apply a binary arithmetic operator."""
+        if operator == "+":
+            return a + b
+        elif operator == "-":
+            return a - b
+        elif operator == "*":
+            return a * b
+        elif operator == "/":
+            if b == 0:
+                raise ValueError("Division by zero")
+            return a / b
+        elif operator == "%":
+            return a % b if self.modulo is None else self.modulo(a, b)
+        else:
+            raise ValueError(f"Unsupported operator: {operator}")
+
+    def arithmetic(self) -> AbstractContextManager:
+        """Context manager statements are executed in."""
+        return NO_CONTEXT
+
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+class DecimalBackend(NumericBackend):
+    """Decimal numbers, optionally with their own precision and rounding.
+
+    Without a precision or rounding the current decimal context is used.
+    """
+
+    name = "decimal"
+    # x + 0 and x - 0 can change the sign of zero and the exponent
+    identities = frozenset({"x*1", "1*x", "x/1"})
+    rounds = True
+
+    def __init__(self, precision: int | None = None, rounding: str | None = None):
+        self.precision = precision
+        self.rounding = rounding
+        if precision is None and rounding is None:
+            self.context = None
+        else:
+            self.context = decimal.Context(prec=precision, rounding=rounding)
+        # Constants are folded in the backend's context
+        self.native = self.context is None
+
+    def number(self, text: str) -> Decimal:
+        return Decimal(text)
+
+    def is_unit(self, value: Decimal, unit: int) -> bool:
+        # 1.0 is not an identity, it changes the exponent of the result
+        return value == unit and value.as_tuple().exponent == 0
+
+    def convert(self, value: Any) -> Decimal:
+        if isinstance(value, Decimal):
+            return value
+        if isinstance(value, Fraction):
+            return Decimal(value.numerator) / value.denominator
+        return Decimal(str(value))
+
+    @property
+    def nan(self) -> Decimal:
+        return Decimal("nan")
+
+    def format(self, value: Decimal) -> str:
+        return "{:f}".format(value)
+
+    def arithmetic(self) -> AbstractContextManager:
+        if self.context is None:
+            return NO_CONTEXT
+        return decimal.localcontext(self.context)
+
+    def __repr__(self):
+        return f"DecimalBackend(precision={self.precision}, rounding={self.rounding})"
+
+
+def _float_modulo(a: float, b: float) -> float:
+    if b == 0:
+        raise ValueError("Division by zero")
+    return math.fmod(a, b)
+
+
+class FloatBackend(NumericBackend):
+    """Binary floating point numbers, fast but inexact."""
+
+    name = "float"
+    modulo = staticmethod(_float_modulo)
+    # -0.0 + 0 is 0.0
+    identities = frozenset({"x-0", "x*1", "1*x", "x/1"})
+
+    def number(self, text: str) -> float:
+        return float(text)
+
+    def convert(self, value: Any) -> float:
+        return float(value)
+
+    def format(self, value: float) -> str:
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+
+
+def _fraction_modulo(a: Fraction, b: Fraction) -> Fraction:
+    if b == 0:
+        raise ValueError("Division by zero")
+    return a - b * int(a / b)
+
+
+class FractionBackend(NumericBackend):
+    """Exact rational numbers, results are printed as e.g. 5/2."""
+
+    name = "fraction"
+    modulo = staticmethod(_fraction_modulo)
+    identities = frozenset({"x+0", "0+x", "x-0", "x*1", "1*x", "x/1"})
+
+    def number(self, text: str) -> Fraction:
+        return Fraction(text)
+
+    def convert(self, value: Any) -> Fraction:
+        return Fraction(value)
+
+
+NUMERIC_BACKENDS: dict[str, type[NumericBackend]] = {
+    "decimal": DecimalBackend,
+    "float": FloatBackend,
+    "fraction": FractionBackend,
+}
+
+
+def numeric_backend(name: str, **options) -> NumericBackend:
+    """Create a backend by name, options are passed to its constructor."""
+    if name not in NUMERIC_BACKENDS:
+        raise ValueError(f"Unknown numeric backend: {name}")
+    return NUMERIC_BACKENDS[name](**options)
+
+
+def default_backend() -> NumericBackend:
+    """Backend of contexts created without one, see settings."""
+    if NUMERIC_BACKEND == "decimal":
+        return DecimalBackend(DECIMAL_PRECISION, DECIMAL_ROUNDING)
+    return numeric_backend(NUMERIC_BACKEND)
+
+
+# Backend compiled expressions are built for, see ExecutionContext.bind
+DECIMAL = DecimalBackend()
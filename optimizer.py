@@ -0,0 +1,200 @@
+"""Constant folding and identity removal over postfix token lists.
+
+The optimizer rebuilds the expression tree from its postfix form and:
+
+* folds operators whose operands are all literals into one literal, e.g.
+  ``y 60 60 * *`` becomes ``y 3600 *``;
+* removes identities such as ``x * 1`` where the numeric backend guarantees
+  they return ``x`` unchanged.
+
+Folding uses the backend's own arithmetic, so a folded literal is exactly
+the value the operator would have produced at run time. Operators that
+raise while folding (e.g. a literal division by zero) are left in place to
+fail when the expression runs. Variables, ``++`` and ``--`` are never
+removed, so their side effects and errors are kept. Operands are not
+reassociated: ``y * 60 * 60`` is ``(y * 60) * 60`` and has no constant
+subtree.
+"""
+
+from typing import Iterator, NamedTuple
+
+from consts import VALID_ARITHMETIC_OPERATORS
+from models.token import Token, TokenType
+from numeric import DECIMAL, Number, NumericBackend
+
+CONSTANT = "constant"
+VARIABLE = "variable"
+INCREMENT = "increment"
+OPERATION = "operation"
+
+
+class Fragment(NamedTuple):
+    """A subtree of the expression.
+
+    Its tokens are contiguous in the postfix and, once optimized, at the end
+    of the optimized postfix built so far, so a fragment only records where
+    they start instead of holding copies.
+    """
+
+    source: int  # index of its first token in the original postfix
+    start: int  # index of its first token in the optimized postfix
+    rewrites: int  # number of rewrites recorded before its own
+    kind: str
+    value: Number | None = None  # value of a constant
+
+
+class Rewrite(NamedTuple):
+    """A folded or simplified subtree, ``postfix[source:end]`` of the original.
+
+    Only offsets are recorded, the tokens are sliced by rewritten when they
+    are shown.
+    """
+
+    source: int
+    end: int
+    literal: Token | None = None  # the folded literal
+    operand: int = 0  # for an identity, the kept postfix[operand:operand_end]
+    operand_end: int = 0
+
+
+class Optimized(NamedTuple):
+    postfix: list[Token]
+    # Every folded or simplified subtree
+    rewrites: list[Rewrite]
+
+
+def optimize_postfix(
+    postfix: list[Token], backend: NumericBackend = DECIMAL
+) -> Optimized:
+    """Fold constants and remove identities in the postfix token list.
+
+    Malformed postfix is returned unchanged, it is left to the interpreter.
+    """
+    stack: list[Fragment] = []
+    tokens: list[Token] = []
+    rewrites: list[Rewrite] = []
+    i = 0
+    while i < len(postfix):
+        token = postfix[i]
+        if token.token_type == TokenType.number:
+            try:
+                value = backend.number(token.value)
+            except Exception:
+                return Optimized(postfix, [])
+            stack.append(Fragment(i, len(tokens), len(rewrites), CONSTANT, value))
+            tokens.append(token)
+        elif token.token_type == TokenType.variable:
+            stack.append(Fragment(i, len(tokens), len(rewrites), VARIABLE))
+            tokens.append(token)
+        elif token.value in {"++pre", "--pre"}:
+            if i + 1 >= len(postfix) or postfix[i + 1].token_type != TokenType.variable:
+                return Optimized(postfix, [])
+            stack.append(Fragment(i, len(tokens), len(rewrites), INCREMENT))
+            tokens += postfix[i : i + 2]
+            i += 1
+        elif token.value in {"++post", "--post"}:
+            # Only a plain variable can be incremented, as in compile_postfix
+            if i == 0 or postfix[i - 1].token_type != TokenType.variable:
+                return Optimized(postfix, [])
+            stack[-1] = stack[-1]._replace(kind=INCREMENT)
+            tokens.append(token)
+        elif token.value in VALID_ARITHMETIC_OPERATORS:
+            if len(stack) < 2:
+                return Optimized(postfix, [])
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(
+                _optimize_operation(
+                    postfix, i + 1, left, right, tokens, rewrites, backend
+                )
+            )
+        else:
+            return Optimized(postfix, [])
+        i += 1
+
+    if len(stack) != 1:
+        return Optimized(postfix, [])
+    return Optimized(tokens, rewrites)
+
+
+def _optimize_operation(
+    postfix: list[Token],
+    end: int,
+    left: Fragment,
+    right: Fragment,
+    tokens: list[Token],
+    rewrites: list[Rewrite],
+    backend: NumericBackend,
+) -> Fragment:
+    """Optimize the operation ending at ``postfix[end - 1]``.
+
+    Updates the optimized ``tokens`` and ``rewrites`` in place; neither the
+    source postfix nor the optimized tokens are copied.
+    """
+    token = postfix[end - 1]
+    if left.kind == CONSTANT and right.kind == CONSTANT:
+        try:
+            with backend.arithmetic():
+                value = backend.apply(token.value, left.value, right.value)
+        except Exception:
+            # Keep the operator so that it raises when the expression runs
+            pass
+        else:
+            literal = Token(backend.literal(value), TokenType.number)
+            # Rewrites inside the operands are replaced by this one
+            del tokens[left.start :], rewrites[left.rewrites :]
+            tokens.append(literal)
+            rewrites.append(Rewrite(left.source, end, literal))
+            return Fragment(left.source, left.start, left.rewrites, CONSTANT, value)
+
+    operand = _identity_operand(token.value, left, right, backend)
+    if operand is not None:
+        if operand is left:
+            del tokens[right.start :]
+            kept = (left.source, right.source)
+        else:
+            del tokens[left.start : right.start]
+            kept = (right.source, end - 1)
+        rewrites.append(Rewrite(left.source, end, None, *kept))
+        return Fragment(
+            left.source, left.start, left.rewrites, operand.kind, operand.value
+        )
+    tokens.append(token)
+    return Fragment(left.source, left.start, left.rewrites, OPERATION)
+
+
+def _identity_operand(
+    operator: str, left: Fragment, right: Fragment, backend: NumericBackend
+) -> Fragment | None:
+    """Return the operand the operation leaves unchanged, if it is an identity."""
+    unit = 0 if operator in "+-" else 1
+    if right.kind == CONSTANT:
+        operand, constant, identity = left, right, f"x{operator}{unit}"
+    elif left.kind == CONSTANT:
+        operand, constant, identity = right, left, f"{unit}{operator}x"
+    else:
+        return None
+
+    if identity not in backend.identities or not backend.is_unit(constant.value, unit):
+        return None
+    if backend.rounds and operand.kind != OPERATION:
+        # Variables and literals may hold more digits than the precision
+        return None
+    return operand
+
+
+def rewritten(
+    postfix: list[Token], rewrites: list[Rewrite], backend: NumericBackend = DECIMAL
+) -> Iterator[tuple[list[Token], list[Token]]]:
+    """Yield (original, replacement) tokens of the rewrites of the postfix.
+
+    The operand kept by an identity is shown optimized, as in the optimized
+    postfix.
+    """
+    for rewrite in rewrites:
+        if rewrite.literal is not None:
+            replacement = [rewrite.literal]
+        else:
+            operand = postfix[rewrite.operand : rewrite.operand_end]
+            replacement = optimize_postfix(operand, backend).postfix
+        yield postfix[rewrite.source : rewrite.end], replacement
@@ -0,0 +1,246 @@
+"""Run the independent statements of a script in parallel.
+
+Every statement is tokenized to find the variables it reads and writes
+(assignment targets and ``++``/``--`` operands). Statements that write a
+variable depend on every other statement using it, so statements connected
+through written variables form one branch that runs in script order. Branches
+share no written variables; they are spread over a process or thread pool,
+each worker running its branches against a private context that holds only
+the variables they use. Per statement results and the merged variables are
+exactly what serial execution produces, including the order in which new
+variables appear.
+
+Commands (``show``, ``clear``, ``stats``, ``exit``, ``begin``, ``commit``,
+``abort``) and formulas act as barriers: the statements before them are
+finished first, and the statements of transaction blocks run serially. Contexts with
+formulas run serially, since any write may recompute other variables, and so
+do contexts with a write-ahead log, which records writes as they are
+committed.
+"""
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from batch import StatementResult, run_statements
+from calculator import ExecutionContext, execute_expression
+from consts import FORMULA_OPERATOR, TRANSACTION_COMMANDS, VALID_EQUALITY_OPERATORS
+from models.token import TokenType
+from numeric import Number, NumericBackend
+from show import is_show
+from tokenizer import tokenize
+
+# Statements analysed and run as one group, at most
+PARALLEL_WINDOW = 100_000
+# Groups smaller than this run serially, a pool would only add overhead
+MIN_PARALLEL_STATEMENTS = 256
+COMMANDS = {"show", "clear", "stats", "exit"} | TRANSACTION_COMMANDS
+
+POOLS: dict[str, type[Executor]] = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+
+class Access(NamedTuple):
+    reads: frozenset[str]
+    writes: frozenset[str]
+
+
+NO_ACCESS = Access(frozenset(), frozenset())
+
+
+def statement_access(statement: str) -> Access:
+    """Variables the statement reads and writes.
+
+    Statements that do not tokenize access nothing, they fail the same way
+    wherever they run.
+    """
+    try:
+        tokens = tokenize(statement)
+    except Exception:
+        return NO_ACCESS
+
+    reads = set()
+    writes = set()
+    for i, token in enumerate(tokens):
+        if token.token_type == TokenType.variable:
+            reads.add(token.value)
+        elif token.value in {"++pre", "--pre"}:
+            if i + 1 < len(tokens) and tokens[i + 1].token_type == TokenType.variable:
+                writes.add(tokens[i + 1].value)
+        elif token.value in {"++post", "--post"}:
+            if i > 0 and tokens[i - 1].token_type == TokenType.variable:
+                writes.add(tokens[i - 1].value)
+    if (
+        len(tokens) > 1
+        and tokens[0].token_type == TokenType.variable
+        and tokens[1].value in VALID_EQUALITY_OPERATORS
+    ):
+        writes.add(tokens[0].value)
+    return Access(frozenset(reads), frozenset(writes))
+
+
+class Task(NamedTuple):
+    variables: dict[str, Number]
+    # (position in the group, line, statement), in script order
+    statements: list[tuple[int, int, str]]
+    backend: NumericBackend
+
+
+class TaskResult(NamedTuple):
+    results: list[tuple[int, StatementResult]]
+    variables: dict[str, Number]
+    # (position, name) of every variable created by the task
+    created: list[tuple[int, str]]
+
+
+def run_task(task: Task) -> TaskResult:
+    """Run the statements of one or more branches in a private context."""
+    context = ExecutionContext(task.variables, task.backend)
+    results = []
+    created = []
+    for position, line, statement in task.statements:
+        size = len(context.variables)
+        try:
+            result = StatementResult(
+                line, statement, execute_expression(statement, context)
+            )
+        except Exception as e:
+            result = StatementResult(line, statement, error=str(e))
+        results.append((position, result))
+        if len(context.variables) > size:
+            # Only the assignment target can be created
+            created.append((position, next(reversed(context.variables))))
+    return TaskResult(results, context.variables, created)
+
+
+def branches(accesses: list[Access]) -> list[list[int]]:
+    """Group statement positions connected through written variables."""
+    written = set().union(*(access.writes for access in accesses))
+    parent = list(range(len(accesses)))
+
+    def find(position: int) -> int:
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    # Last statement that used each written variable
+    users: dict[str, int] = {}
+    for position, access in enumerate(accesses):
+        for name in (access.reads & written) | access.writes:
+            other = users.get(name)
+            if other is not None:
+                parent[find(position)] = find(other)
+            users[name] = position
+
+    groups: dict[int, list[int]] = {}
+    for position in range(len(accesses)):
+        groups.setdefault(find(position), []).append(position)
+    return list(groups.values())
+
+
+def plan_tasks(
+    group: list[tuple[int, str]], context: ExecutionContext, jobs: int
+) -> list[Task]:
+    """Split the statements into at most ``jobs`` balanced tasks."""
+    accesses = [statement_access(statement) for _, statement in group]
+    loads: list[list[int]] = [[] for _ in range(jobs)]
+    for branch in sorted(branches(accesses), key=len, reverse=True):
+        min(loads, key=len).extend(branch)
+
+    tasks = []
+    for positions in loads:
+        if not positions:
+            continue
+        positions.sort()
+        names = set().union(
+            *(accesses[p].reads | accesses[p].writes for p in positions)
+        )
+        variables = {
+            name: context.variables[name] for name in names if name in context.variables
+        }
+        statements = [(p, group[p][0], group[p][1]) for p in positions]
+        tasks.append(Task(variables, statements, context.backend))
+    return tasks
+
+
+def run_group(
+    group: list[tuple[int, str]],
+    context: ExecutionContext,
+    pool: Executor | None,
+    jobs: int,
+) -> Iterator[StatementResult]:
+    """Run a group of statements without commands and merge the results."""
+    if (
+        pool is None
+        or len(group) < MIN_PARALLEL_STATEMENTS
+        or context.formulas
+        or context.wal is not None
+    ):
+        yield from run_statements(group, context)
+        return
+
+    tasks = plan_tasks(group, context, jobs)
+    if len(tasks) == 1:
+        yield from run_statements(group, context)
+        return
+
+    results: list[StatementResult | None] = [None] * len(group)
+    created: list[tuple[int, str]] = []
+    new_values: dict[str, Number] = {}
+    for task_result in pool.map(run_task, tasks):
+        for position, result in task_result.results:
+            results[position] = result
+        created.extend(task_result.created)
+        for name, value in task_result.variables.items():
+            if name in context.variables:
+                context.variables[name] = value
+            else:
+                new_values[name] = value
+    # New variables appear in the order serial execution would create them
+    for _, name in sorted(created):
+        context.variables[name] = new_values[name]
+    if context.name_index is not None:
+        context.name_index.update(new_values)
+    yield from results
+
+
+def run_statements_parallel(
+    statements: Iterable[tuple[int, str]],
+    context: ExecutionContext,
+    jobs: int | None = None,
+    pool: str = "process",
+    show_output: Callable[[Iterator[str]], None] | None = None,
+) -> Iterator[StatementResult]:
+    """Execute statements like batch.run_statements, on ``jobs`` workers."""
+    if pool not in POOLS:
+        raise ValueError(f"Unknown pool: {pool}")
+    jobs = jobs or os.cpu_count() or 1
+    executor = POOLS[pool](max_workers=jobs) if jobs > 1 else None
+    try:
+        group: list[tuple[int, str]] = []
+        for line, statement in statements:
+            if (
+                statement in COMMANDS
+                or is_show(statement)
+                or FORMULA_OPERATOR in statement
+                or context.in_transaction
+            ):
+                yield from run_group(group, context, executor, jobs)
+                group = []
+                results = run_statements([(line, statement)], context, show_output)
+                result = next(results, None)
+                if result is None:
+                    return
+                yield result
+            else:
+                group.append((line, statement))
+                if len(group) >= PARALLEL_WINDOW:
+                    yield from run_group(group, context, executor, jobs)
+                    group = []
+        yield from run_group(group, context, executor, jobs)
+    finally:
+        if executor is not None:
+            executor.shutdown()
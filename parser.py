@@ -0,0 +1,444 @@
+"""Validation of statement tokens and their conversion to postfix.
+
+Plain functions, so that executing statements does not import pydantic:
+models.expression.Expression runs the same checks as its validators and
+converts to postfix with the same code. parse validates and builds the tree
+of the expression in one pass (parse_tree); the check_* functions and
+to_postfix are the multi-pass checks and shunting-yard conversion it
+replaces, still used for streamed statements and malformed tokens.
+"""
+
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Iterable, Iterator, NamedTuple
+
+from consts import INVALID_PARENTHESIS_ERROR, PRECEDENCE, VALID_EQUALITY_OPERATORS
+from models.token import Token, TokenType
+from tokenizer import iter_tokens
+
+UNARY_OPERATORS = {"++pre", "--pre", "++post", "--post"}
+
+
+class Statement(NamedTuple):
+    """The assigned variable, the assignment operator and the expression tokens.
+
+    ``tokens`` is a list, or an iterator that validates the tokens as they are
+    consumed for statements built by stream(). ``tree`` is set by parse.
+    """
+
+    variable_name: Token | None
+    assignment: Token | None
+    tokens: list[Token] | Iterator[Token]
+    tree: "Node | None" = None
+
+    def postfix(self) -> Iterator[Token]:
+        return iter_postfix(self.tokens)
+
+    def to_postfix(self) -> list[Token]:
+        if self.tree is not None:
+            return self.tree.postfix()
+        return to_postfix(self.tokens)
+
+
+def split_assignment(tokens: list[Token]) -> Statement:
+    """Split ``name op expression`` statements, without validating the tokens."""
+    if (
+        len(tokens) >= 3
+        and tokens[0].token_type == TokenType.variable
+        and tokens[1].token_type == TokenType.operator
+        and tokens[1].value in VALID_EQUALITY_OPERATORS
+    ):
+        return Statement(tokens[0], tokens[1], tokens[2:])
+    return Statement(None, None, tokens)
+
+
+def parse(tokens: list[Token]) -> Statement:
+    """Split the assignment, validate the expression tokens and build their tree.
+
+    Same checks and messages as the check_* functions, run in this order:
+    check_balanced_parentheses then check_consecutive_operators.
+    """
+    statement = split_assignment(tokens)
+    return statement._replace(tree=parse_tree(statement.tokens))
+
+
+def stream(expression: str | Iterable[Token]) -> Statement:
+    """Tokenize and validate the expression lazily.
+
+    Runs the same checks with the same messages as parse, raised when the
+    offending token is reached. Of several errors, the first one in the
+    expression is reported.
+    """
+    if isinstance(expression, str):
+        expression = iter_tokens(expression)
+    tokens = iter(expression)
+    head = []
+    for token in tokens:
+        head.append(token)
+        if len(head) == 3:
+            break
+    statement = split_assignment(head)
+    return statement._replace(tokens=iter_validated(chain(statement.tokens, tokens)))
+
+
+def iter_validated(tokens: Iterable[Token]) -> Iterator[Token]:
+    """Generator version of the checks of parse."""
+    depth = 0
+    last_variable = None
+    previous = None
+    for token in tokens:
+        if token.token_type == TokenType.variable:
+            if last_variable == token.value:
+                raise ValueError(
+                    f"Multiple unary operators applied to the same variable: {token.value}"
+                )
+            last_variable = token.value
+        elif token.token_type == TokenType.operator:
+            if previous and previous.token_type == TokenType.operator:
+                check_same_operators(previous, token)
+        elif token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            if not depth:
+                raise ValueError(INVALID_PARENTHESIS_ERROR)
+            depth -= 1
+        yield token
+        previous = token
+    if depth:
+        raise ValueError(INVALID_PARENTHESIS_ERROR)
+
+
+def check_balanced_parentheses(tokens: list[Token]):
+    stack = []
+    for token in tokens:
+        if token.value == "(":
+            stack.append(token)
+        elif token.value == ")":
+            if not stack:
+                raise ValueError(INVALID_PARENTHESIS_ERROR)
+            stack.pop()
+    if stack:
+        raise ValueError(INVALID_PARENTHESIS_ERROR)
+
+
+def check_consecutive_operators(tokens: list[Token]):
+    """Validate that there are no invalid consecutive operators."""
+    prev_token = None
+    check_increment_decrement_combinations(tokens)
+    for token in tokens:
+        if token.token_type == TokenType.operator:
+            if prev_token and prev_token.token_type == TokenType.operator:
+                check_same_operators(prev_token, token)
+        prev_token = token
+
+
+def check_same_operators(prev_token: Token, token: Token):
+    """Validate that there are no consecutive same operators like '++ ++' or '-- --'."""
+    if prev_token.value == token.value:
+        raise ValueError(
+            f"Invalid consecutive operators: {prev_token.value} and {token.value}"
+        )
+
+
+def check_increment_decrement_combinations(tokens: list[Token]):
+    """Validate valid and invalid combinations of pre and post unary operators."""
+    last_variable = None  # To track the last seen variable
+
+    for token in tokens:
+        if token.token_type == TokenType.variable:
+            # If we have seen the same variable previously, it's invalid
+            if last_variable == token.value:
+                raise ValueError(
+                    f"Multiple unary operators applied to the same variable: {token.value}"
+                )
+            last_variable = token.value  # Update the last seen variable
+
+
+def handle_operator(token: Token, stack: list[Token], postfix: list[Token]):
+    """Handles operator tokens based on precedence and associativity."""
+    token_prec, _ = PRECEDENCE.get(
+        token.value, (0, "left")
+    )  # Get precedence for the operator
+
+    # Special handling for pre-increment and pre-decrement operators
+    if token.value in UNARY_OPERATORS:
+        postfix.append(token)
+        return
+    # Handle standard operators (e.g., +, -, *, /)
+    while stack:
+        top = stack[-1]
+
+        # Ignore postfix operators on the stack (processed separately)
+        if top.value in {"++post", "--post"}:
+            break
+
+        # Check precedence and associativity for stack's top operator
+        top_prec, top_assoc = PRECEDENCE.get(
+            top.value, (0, "left")
+        )  # Use get() to avoid KeyError
+
+        # Pop from the stack if:
+        # - Top operator has higher precedence
+        # - Top operator has equal precedence and is left-associative
+        if top_prec > token_prec or (top_prec == token_prec and top_assoc == "left"):
+            postfix.append(stack.pop())
+        else:
+            break
+
+    # Push the current operator onto the stack
+    stack.append(token)
+
+
+def handle_parentheses(token: Token, stack: list[Token], postfix: list[Token]):
+    """Handle parentheses - push '(' to stack and pop until '(' for ')'."""
+    if token.value == "(":
+        stack.append(token)
+    elif token.value == ")":
+        while stack and stack[-1].value != "(":
+            postfix.append(stack.pop())
+        if not stack or stack[-1].value != "(":
+            raise ValueError(INVALID_PARENTHESIS_ERROR)
+        stack.pop()
+
+
+def to_postfix(tokens: list[Token]) -> list[Token]:
+    """Convert validated infix tokens to postfix (shunting-yard)."""
+    stack = []
+    postfix = []
+
+    for token in tokens:
+        if token.token_type in {TokenType.number, TokenType.variable}:
+            # Append the variable to the postfix expression first
+            postfix.append(token)
+        elif token.token_type == TokenType.parentheses:
+            handle_parentheses(token, stack, postfix)
+        elif token.token_type == TokenType.operator:
+            handle_operator(token, stack, postfix)
+
+    # Pop any remaining operators in the stack
+    while stack:
+        postfix.append(stack.pop())
+
+    return postfix
+
+
+def iter_postfix(tokens: Iterable[Token]) -> Iterator[Token]:
+    """Generator version of to_postfix.
+
+    Only the operator stack is kept, so memory is proportional to the nesting
+    depth of the expression rather than to its length.
+    """
+    stack = []
+    output = []
+
+    for token in tokens:
+        if token.token_type in {TokenType.number, TokenType.variable}:
+            yield token
+            continue
+        elif token.token_type == TokenType.parentheses:
+            handle_parentheses(token, stack, output)
+        elif token.token_type == TokenType.operator:
+            handle_operator(token, stack, output)
+        yield from output
+        output.clear()
+
+    while stack:
+        yield stack.pop()
+
+
+# Binding power of the binary operators, from PRECEDENCE
+BINARY_POWER = {
+    operator: precedence
+    for operator, (precedence, associativity) in PRECEDENCE.items()
+    if associativity == "left"
+}
+NUMBER = TokenType.number
+VARIABLE = TokenType.variable
+OPERATOR = TokenType.operator
+
+
+class Node(ABC):
+    """A node of the tree built by parse_tree.
+
+    Nodes keep their tokens, so the tree gives back the postfix of its
+    expression exactly as to_postfix produces it.
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def reversed_postfix(self) -> tuple:
+        """The children and tokens of the node in reverse postfix order."""
+
+    def postfix(self) -> list[Token]:
+        """Tokens of the subtree in postfix order, without recursion."""
+        output = []
+        pending = [self]
+        while pending:
+            item = pending.pop()
+            # Checking for Token skips the slower ABC instance check
+            if isinstance(item, Token):
+                output.append(item)
+            else:
+                pending += item.reversed_postfix()
+        return output
+
+    def __repr__(self):
+        return f"{type(self).__name__}({' '.join(t.value for t in self.postfix())})"
+
+
+class Operand(Node):
+    """A number or a variable."""
+
+    __slots__ = ("token",)
+
+    def __init__(self, token: Token):
+        self.token = token
+
+    def reversed_postfix(self) -> tuple:
+        return (self.token,)
+
+
+class PreIncrement(Node):
+    """``++x`` or ``--x``."""
+
+    __slots__ = ("operator", "variable")
+
+    def __init__(self, operator: Token, variable: Token):
+        self.operator = operator
+        self.variable = variable
+
+    def reversed_postfix(self) -> tuple:
+        return (self.variable, self.operator)
+
+
+class PostIncrement(Node):
+    """``x++`` or ``x--``, of a variable or of a pre-incremented variable."""
+
+    __slots__ = ("operand", "operator")
+
+    def __init__(self, operand: Operand | PreIncrement, operator: Token):
+        self.operand = operand
+        self.operator = operator
+
+    def reversed_postfix(self) -> tuple:
+        return (self.operator, self.operand)
+
+
+class BinaryOperation(Node):
+    __slots__ = ("operator", "left", "right")
+
+    def __init__(self, operator: Token, left: Node, right: Node):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def reversed_postfix(self) -> tuple:
+        return (self.operator, self.right, self.left)
+
+
+def parse_tree(tokens: list[Token]) -> Node | None:
+    """Validate the expression tokens and build their tree in a single pass.
+
+    A binding power (Pratt) parser, with an explicit stack of the pending
+    operators and parentheses instead of recursion, so that nesting is not
+    limited. Raises the errors of parse with the same messages: each check
+    keeps its first error and the one of the check parse runs first is
+    raised once all tokens are consumed.
+
+    Returns None when the tokens pass the checks but do not form an
+    expression (e.g. ``x +``); to_postfix converts such tokens so that they
+    fail in the interpreter with its error messages.
+    """
+    parenthesis_error = variable_error = operator_error = None
+    depth = 0
+    last_variable = None
+    previous = None
+    # (left operand, operator, binding power) of the pending operators, and
+    # (None, "(", 0) for open parentheses
+    pending = []
+    node = None  # the operand before the current token, if any
+    pre_operator = None
+    malformed = False
+    for token in tokens:
+        value = token.value
+        token_type = token.token_type
+        if token_type is VARIABLE:
+            if last_variable == value and variable_error is None:
+                variable_error = (
+                    f"Multiple unary operators applied to the same variable: {value}"
+                )
+            last_variable = value
+        elif token_type is OPERATOR:
+            if (
+                previous is not None
+                and previous.token_type is OPERATOR
+                and previous.value == value
+                and operator_error is None
+            ):
+                operator_error = f"Invalid consecutive operators: {value} and {value}"
+        elif value == "(":
+            depth += 1
+        elif value == ")":
+            if depth:
+                depth -= 1
+            elif parenthesis_error is None:
+                parenthesis_error = INVALID_PARENTHESIS_ERROR
+        previous = token
+        if malformed:
+            continue
+
+        if node is None:  # an operand is expected
+            if pre_operator is not None:
+                if token_type is VARIABLE:
+                    node = PreIncrement(pre_operator, token)
+                    pre_operator = None
+                else:
+                    malformed = True
+            elif token_type is NUMBER or token_type is VARIABLE:
+                node = Operand(token)
+            elif value == "(":
+                pending.append((None, token, 0))
+            elif value == "++pre" or value == "--pre":
+                pre_operator = token
+            else:
+                malformed = True
+        elif value == "++post" or value == "--post":
+            if isinstance(node, PreIncrement) or (
+                isinstance(node, Operand) and node.token.token_type is VARIABLE
+            ):
+                node = PostIncrement(node, token)
+            else:
+                malformed = True
+        elif value == ")":
+            while pending and pending[-1][0] is not None:
+                left, operator, _ = pending.pop()
+                node = BinaryOperation(operator, left, node)
+            if pending:
+                pending.pop()
+            else:
+                malformed = True
+        elif value in BINARY_POWER:
+            power = BINARY_POWER[value]
+            # Operators of the same power are left-associative
+            while pending and pending[-1][2] >= power:
+                left, operator, _ = pending.pop()
+                node = BinaryOperation(operator, left, node)
+            pending.append((node, token, power))
+            node = None
+        else:  # e.g. an assignment inside the expression
+            malformed = True
+
+    if depth and parenthesis_error is None:
+        parenthesis_error = INVALID_PARENTHESIS_ERROR
+    for error in (parenthesis_error, variable_error, operator_error):
+        if error is not None:
+            raise ValueError(error)
+    if malformed or node is None:
+        return None
+    while pending:
+        left, operator, _ = pending.pop()
+        if left is None:
+            return None  # unclosed parenthesis
+        node = BinaryOperation(operator, left, node)
+    return node
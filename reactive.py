@@ -0,0 +1,151 @@
+"""Formulas: variables that keep their expression and follow their inputs.
+
+``total := price * qty`` binds ``total`` to its expression. Whenever a
+statement writes to ``price`` or ``qty``, ``total`` is recomputed before the
+statement commits, together with every formula that depends on it, in
+topological order. Only the transitive dependents of the written variables
+are recomputed.
+"""
+
+from typing import Callable, Iterable, NamedTuple
+
+from models.token import TokenType
+
+
+class FormulaStats(NamedTuple):
+    formulas: int  # number of formulas defined
+    updates: int  # statements that caused at least one recompute
+    last_recomputed: int  # formulas recomputed by the last update
+    recomputed: int  # formulas recomputed by all updates
+
+
+class Formula(NamedTuple):
+    compiled: "CompiledExpression"  # noqa: F821
+    reads: frozenset[str]
+    statement: str  # ``name = expression``, as defined
+
+
+def formula_reads(compiled) -> frozenset[str]:
+    """Variables read by the compiled expression."""
+    return frozenset(
+        token.value
+        for token in compiled.postfix
+        if token.token_type == TokenType.variable
+    )
+
+
+class FormulaGraph:
+    """Formulas of one context and the dependency graph between variables."""
+
+    def __init__(self):
+        # Variable name -> its formula, in definition order
+        self.formulas: dict[str, Formula] = {}
+        # Variable name -> formulas that read it
+        self.readers: dict[str, set[str]] = {}
+        self._updates = 0
+        self._last_recomputed = 0
+        self._recomputed = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.formulas
+
+    def __len__(self) -> int:
+        return len(self.formulas)
+
+    def check_cycle(self, name: str, reads: Iterable[str]):
+        """Raise ValueError if ``name`` reading ``reads`` would close a cycle."""
+        # Depth first search from the inputs back to name, through formulas
+        parents: dict[str, str] = {read: name for read in reads}
+        stack = list(parents)
+        while stack:
+            current = stack.pop()
+            if current == name:
+                path = [name]
+                while True:
+                    current = parents[current]
+                    path.append(current)
+                    if current == name:
+                        break
+                raise ValueError("Circular formula: " + " -> ".join(reversed(path)))
+            formula = self.formulas.get(current)
+            if formula is None:
+                continue
+            for read in formula.reads:
+                if read not in parents:
+                    parents[read] = current
+                    stack.append(read)
+
+    def add(self, name: str, formula: Formula):
+        self.check_cycle(name, formula.reads)
+        self.remove(name)
+        self.formulas[name] = formula
+        for read in formula.reads:
+            self.readers.setdefault(read, set()).add(name)
+
+    def remove(self, name: str) -> Formula | None:
+        formula = self.formulas.pop(name, None)
+        if formula is not None:
+            for read in formula.reads:
+                self.readers[read].discard(name)
+        return formula
+
+    def dependents(self, changed: Iterable[str]) -> list[str]:
+        """Formulas depending on the changed variables, in topological order."""
+        affected: set[str] = set()
+        stack = list(changed)
+        while stack:
+            for reader in self.readers.get(stack.pop(), ()):
+                if reader not in affected:
+                    affected.add(reader)
+                    stack.append(reader)
+        if not affected:
+            return []
+
+        # Kahn's algorithm restricted to the affected formulas
+        pending = {
+            name: len(self.formulas[name].reads & affected)
+            for name in self.formulas
+            if name in affected
+        }
+        order = [name for name, count in pending.items() if count == 0]
+        for name in order:
+            for reader in self.readers.get(name, ()):
+                if reader in pending:
+                    pending[reader] -= 1
+                    if pending[reader] == 0:
+                        order.append(reader)
+        return order
+
+    def update(
+        self,
+        changed: Iterable[str],
+        recompute: Callable[[str, Formula], None],
+    ) -> int:
+        """Recompute the dependents of the changed variables.
+
+        Formula variables written directly (not by their formula) keep the
+        written value and stop being formulas. Returns the number of formulas
+        recomputed. If a recompute raises, the detached formulas are restored
+        and the error is propagated so that the statement is rolled back.
+        """
+        changed = list(changed)
+        detached = {name: self.remove(name) for name in changed if name in self}
+        try:
+            order = self.dependents(changed)
+            for name in order:
+                recompute(name, self.formulas[name])
+        except Exception:
+            for name, formula in detached.items():
+                self.add(name, formula)
+            raise
+
+        if order:
+            self._updates += 1
+            self._recomputed += len(order)
+        self._last_recomputed = len(order)
+        return len(order)
+
+    def info(self) -> FormulaStats:
+        return FormulaStats(
+            len(self.formulas), self._updates, self._last_recomputed, self._recomputed
+        )
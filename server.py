@@ -0,0 +1,171 @@
+"""Calculator server: one session per connection over a TCP or Unix socket.
+
+The protocol is line based. Every non-blank line a client sends is a
+statement or a command, and gets exactly one reply line, in order:
+
+* the result of a statement, e.g. ``6``, or ``Error: <message>``;
+* ``show``: the session's variables, e.g. ``(i=37,j=1,x=6,y=35)``, with the
+  filters and pages of show.py; the line is streamed in chunks;
+* ``clear``: ``OK`` after removing every variable;
+* ``begin``, ``commit``, ``abort``: ``OK``, see ExecutionContext.begin for
+  transaction blocks;
+* ``help``: the list of commands;
+* ``exit``: ``Goodbye!``, then the server closes the connection.
+
+Clients may pipeline: send any number of lines without waiting for replies.
+Lines are read in chunks and all the replies to a chunk are written at once.
+
+Run with ``python server.py --port 7000`` or ``python server.py --unix PATH``.
+"""
+
+import argparse
+import asyncio
+from typing import Callable, Iterator
+
+from calculator import (
+    ExecutionContext,
+    execute_expression,
+    execute_transaction_command,
+)
+from consts import GOODBYE_MESSAGE, TRANSACTION_COMMANDS
+from settings import logger
+from show import is_show, parse_show, show
+
+READ_SIZE = 64 * 1024
+# Longest statement accepted; longer lines end the session
+MAX_LINE_LENGTH = 1024 * 1024
+# Pending connections the listener queues, sized for bursts of new sessions
+BACKLOG = 1024
+HELP_MESSAGE = "Commands: show, clear, begin, commit, abort, exit, help, <expression>"
+
+
+class Session:
+    """State of one connection."""
+
+    __slots__ = ("context", "closed")
+
+    def __init__(self, context: ExecutionContext):
+        self.context = context
+        self.closed = False
+
+    def handle(self, line: str) -> str | Iterator[str]:
+        """Execute one statement or command and return the reply line.
+
+        The reply to ``show`` is an iterator of the chunks of the line.
+        """
+        if line == "exit":
+            self.closed = True
+            return GOODBYE_MESSAGE
+        elif line == "help":
+            return HELP_MESSAGE
+        try:
+            if is_show(line):
+                return show(self.context, parse_show(line))
+            elif line == "clear":
+                self.context.clear()
+            elif line in TRANSACTION_COMMANDS:
+                execute_transaction_command(line, self.context)
+            else:
+                return execute_expression(line, self.context)
+        except Exception as e:
+            return f"Error: {e}"
+        return "OK"
+
+
+class CalculatorServer:
+    """Serve calculator sessions, see the module docstring for the protocol."""
+
+    def __init__(self, context_factory: Callable[[], ExecutionContext] | None = None):
+        self.context_factory = context_factory or (lambda: ExecutionContext({}))
+        self.sessions = 0
+        self.statements = 0
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        session = Session(self.context_factory())
+        self.sessions += 1
+        pending = b""
+        try:
+            while not session.closed:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                *lines, pending = (pending + data).split(b"\n")
+                if len(pending) > MAX_LINE_LENGTH:
+                    writer.write(b"Error: Line too long\n")
+                    break
+
+                replies = []
+                for raw in lines:
+                    line = raw.decode("utf-8", "replace").strip()
+                    if not line:
+                        continue
+                    self.statements += 1
+                    reply = session.handle(line)
+                    if isinstance(reply, str):
+                        replies.append(reply)
+                    else:
+                        # Stream the chunks after the replies before them
+                        replies.append("")
+                        writer.write("\n".join(replies).encode())
+                        replies = []
+                        for chunk in reply:
+                            writer.write(chunk.encode())
+                            await writer.drain()
+                        writer.write(b"\n")
+                    if session.closed:
+                        break
+                if replies:
+                    writer.write(("\n".join(replies) + "\n").encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception("Session failed")
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(
+        self, host: str | None = None, port: int | None = None, path: str | None = None
+    ) -> asyncio.Server:
+        """Listen on the Unix socket ``path``, or on ``host``:``port``."""
+        if path is not None:
+            return await asyncio.start_unix_server(
+                self.handle_connection, path, backlog=BACKLOG
+            )
+        return await asyncio.start_server(
+            self.handle_connection, host, port, backlog=BACKLOG
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Calculator server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7000)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace):
+    server = await CalculatorServer().start(args.host, args.port, args.unix)
+    address = args.unix or f"{args.host}:{args.port}"
+    print(f"Listening on {address}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None):
+    try:
+        asyncio.run(serve(parse_args(argv)))
+    except KeyboardInterrupt:
+        print(GOODBYE_MESSAGE)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,111 @@
 import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
-# Set the logging level to DEBUG
-LEVEL = logging.DEBUG
-# log to the console and file
-logging.basicConfig(
-    level=LEVEL,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    filename="calculator.log",
-)
+# Log level (DEBUG, INFO, WARNING, ...) and destination: a file path, "-" for
+# stderr, or empty to disable logging
+LOG_LEVEL = os.environ.get("CALCULATOR_LOG_LEVEL", "WARNING").upper()
+LOG_FILE = os.environ.get("CALCULATOR_LOG_FILE", "calculator.log")
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
 logger = logging.getLogger(__name__)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue records for a listener thread that formats and writes them.
+
+    The thread is started with the first record, so nothing runs and no file
+    is opened until something is logged.
+    """
+
+    def __init__(self, handler: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, handler)
+        self.started = False
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave the formatting to the listener thread; tracebacks cannot wait
+        if record.exc_info:
+            return super().prepare(record)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if not self.started:
+            with self._start_lock:
+                if not self.started:
+                    self.listener.start()
+                    self.started = True
+        super().enqueue(record)
+
+    def close(self):
+        # Called by logging.shutdown at exit: write out the queued records
+        with self._start_lock:
+            if self.started:
+                self.listener.stop()
+                self.started = False
+        super().close()
+
+
+log_handler: logging.Handler | None = None
+
+
+def configure_logging(level: str | int = LOG_LEVEL, destination: str = LOG_FILE):
+    """Send the calculator's log records at ``level`` or above to ``destination``."""
+    global log_handler
+    if log_handler is not None:
+        logger.removeHandler(log_handler)
+        log_handler.close()
+
+    logger.setLevel(level)
+    if not destination:
+        log_handler = logging.NullHandler()
+    else:
+        if destination == "-":
+            target = logging.StreamHandler(sys.stderr)
+        else:
+            target = logging.FileHandler(destination, delay=True)
+        target.setFormatter(logging.Formatter(LOG_FORMAT))
+        log_handler = LazyQueueHandler(target)
+    logger.addHandler(log_handler)
+
+
+configure_logging()
+
+# Number of compiled expressions kept by calculator.execute_expression (0 disables)
+EXPRESSION_CACHE_SIZE = int(os.environ.get("CALCULATOR_CACHE_SIZE", "1024"))
+# Expressions longer than this many characters are interpreted while they are
+# tokenized instead of being compiled and cached
+STREAM_THRESHOLD = int(os.environ.get("CALCULATOR_STREAM_THRESHOLD", "100000"))
+
+# Validate every token the tokenizer emits, not only numbers and variable names
+STRICT_TOKENS = os.environ.get("CALCULATOR_STRICT_TOKENS", "") == "1"
+
+# Tokenizer backend: "regex" (single-pass master regex) or "legacy" (char by char)
+TOKENIZER_BACKEND = os.environ.get("CALCULATOR_TOKENIZER", "regex")
+
+# Numeric backend of new execution contexts: "decimal", "float" or "fraction"
+NUMERIC_BACKEND = os.environ.get("CALCULATOR_NUMERIC", "decimal")
+
+# Precision and rounding (e.g. ROUND_HALF_EVEN) of the decimal backend, unset
+# to use the current decimal context
+DECIMAL_PRECISION = (
+    int(os.environ["CALCULATOR_DECIMAL_PRECISION"])
+    if os.environ.get("CALCULATOR_DECIMAL_PRECISION")
+    else None
+)
+DECIMAL_ROUNDING = os.environ.get("CALCULATOR_DECIMAL_ROUNDING") or None
+
+# Durability of the write-ahead log (see wal.py): "commit" fsyncs every
+# committed statement, "interval" fsyncs every CALCULATOR_WAL_INTERVAL_MS and
+# "off" leaves flushing to the operating system
+WAL_DURABILITY = os.environ.get("CALCULATOR_WAL_DURABILITY", "commit")
+WAL_INTERVAL_MS = int(os.environ.get("CALCULATOR_WAL_INTERVAL_MS", "50"))
+# Committed statements logged between two checkpoints of the write-ahead log
+WAL_CHECKPOINT_RECORDS = int(os.environ.get("CALCULATOR_WAL_CHECKPOINT", "100000"))
+
+# Record per-phase timings of statement execution, see metrics.py
+METRICS_ENABLED = os.environ.get("CALCULATOR_METRICS", "") == "1"
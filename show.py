@@ -0,0 +1,130 @@
+"""The show command: variables filtered, sorted and paginated, formatted lazily.
+
+    show [PATTERN] [count] [sort=name|-name|value|-value] [limit=N] [page=N]
+
+PATTERN is a glob (``tax*``, ``v?_[0-9]``) or, without wildcards, a prefix
+of the variable names. ``count`` prints the number of matching variables
+instead of their values. ``limit`` variables are shown per page, ``page``
+(from 1) picks one. Variables are in definition order unless sorted.
+
+The output is produced in chunks of SHOW_CHUNK_SIZE variables by a
+generator, so large contexts are never formatted into one string.
+"""
+
+import heapq
+import re
+from fnmatch import translate
+from itertools import islice
+from operator import itemgetter
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, NamedTuple
+
+from consts import VARIABLE_VALID_CHARS
+from numeric import Number
+
+if TYPE_CHECKING:
+    from calculator import ExecutionContext
+
+# Variables formatted per chunk of output
+SHOW_CHUNK_SIZE = 1000
+SORT_ORDERS = ("name", "-name", "value", "-value")
+SHOW_USAGE = "show [PATTERN] [count] [sort=name|-name|value|-value] [limit=N] [page=N]"
+GLOB_CHARS = set("*?[]!")
+
+
+class ShowQuery(NamedTuple):
+    pattern: str | None = None
+    count: bool = False
+    sort: str | None = None
+    limit: int | None = None
+    page: int = 1
+
+
+def is_show(line: str) -> bool:
+    """Whether the line is a show command, not e.g. ``show = 1``."""
+    words = line.split(maxsplit=2)
+    return (
+        bool(words)
+        and words[0] == "show"
+        and (len(words) == 1 or words[1][0] not in "=+-*/%")
+    )
+
+
+def parse_show(line: str) -> ShowQuery:
+    """Parse the options of a show command, see the module docstring."""
+    query = ShowQuery()
+    for word in line.split()[1:]:
+        key, equals, value = word.partition("=")
+        if word == "count":
+            query = query._replace(count=True)
+        elif key in ("limit", "page") and equals and value.isdigit() and int(value):
+            query = query._replace(**{key: int(value)})
+        elif key == "sort" and value in SORT_ORDERS:
+            query = query._replace(sort=value)
+        elif (
+            not equals
+            and query.pattern is None
+            and not set(word) - VARIABLE_VALID_CHARS - GLOB_CHARS
+        ):
+            query = query._replace(pattern=word)
+        else:
+            raise ValueError(f"Invalid show option: {word}, usage: {SHOW_USAGE}")
+    if query.page > 1 and query.limit is None:
+        raise ValueError("page requires limit")
+    return query
+
+
+def matcher(pattern: str) -> Callable[[str], bool]:
+    if GLOB_CHARS & set(pattern):
+        return re.compile(translate(pattern)).match
+    return lambda name: name.startswith(pattern)
+
+
+def select(
+    variables: Iterable[tuple[str, Number]], query: ShowQuery
+) -> Iterator[tuple[str, Number]]:
+    """The variables of the query's page, filtered and sorted, as (name, value)."""
+    items = iter(variables)
+    if query.pattern is not None:
+        match = matcher(query.pattern)
+        items = (item for item in items if match(item[0]))
+    if query.sort is not None:
+        key = itemgetter(0) if query.sort.endswith("name") else itemgetter(1)
+        descending = query.sort.startswith("-")
+        if query.limit is None:
+            items = iter(sorted(items, key=key, reverse=descending))
+        else:
+            # Only the variables up to the end of the page are sorted
+            first = heapq.nlargest if descending else heapq.nsmallest
+            items = iter(first(query.page * query.limit, items, key=key))
+    if query.limit is not None:
+        start = (query.page - 1) * query.limit
+        items = islice(items, start, start + query.limit)
+    return items
+
+
+def format_variables(
+    variables: Iterable[tuple[str, Number]],
+    format_value: Callable[[Number], str],
+    separator: str = ",",
+    size: int = SHOW_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Yield ``(name=value,...)`` in chunks of ``size`` variables."""
+    items = iter(variables)
+    opening = "("
+    while chunk := list(islice(items, size)):
+        yield opening + separator.join(
+            f"{name}={format_value(value)}" for name, value in chunk
+        )
+        opening = separator
+    yield "()" if opening == "(" else ")"
+
+
+def show(
+    context: "ExecutionContext", query: ShowQuery = ShowQuery(), separator: str = ","
+) -> Iterator[str]:
+    """Output of the show command in chunks, see format_variables."""
+    items = select(context.variables.items(), query)
+    if query.count:
+        yield str(sum(1 for _ in items))
+    else:
+        yield from format_variables(items, context.backend.format, separator)
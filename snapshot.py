@@ -0,0 +1,340 @@
+"""Binary snapshots of the variables of an ExecutionContext.
+
+A snapshot is written once and memory-mapped when loaded, so restoring a
+session with millions of variables only reads the header: names are found
+through a hash table in the file and values are decoded the first time they
+are read. Layout, after the magic and a JSON header::
+
+    name offsets    (count + 1) x uint64, into the string table
+    value offsets   (count + 1) x uint64, into the value table
+    hash table      buckets x uint32, variable position + 1, 0 for empty
+    string table    UTF-8 names, back to back
+    value table     packed values, back to back
+
+Arrays use the byte order of the machine that wrote them, recorded in the
+header. A Decimal is packed as a tag byte, an int32 exponent and the
+coefficient as big-endian bytes. Formulas are not saved.
+"""
+
+import decimal
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from collections.abc import ItemsView, MutableMapping
+from decimal import Decimal
+from fractions import Fraction
+from itertools import accumulate
+from typing import Any, Iterable, Iterator
+
+from consts import MISSING
+from numeric import Number, NumericBackend, numeric_backend
+
+MAGIC = b"CALCSNAP"
+VERSION = 1
+# Magic, then the version and the length of the JSON header
+PREFIX = struct.Struct("<8sII")
+EXPONENT = struct.Struct("<i")
+DOUBLE = struct.Struct("<d")
+# Shifts Decimal exponents without rounding
+EXACT = decimal.Context(
+    prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN
+)
+
+# Value tags
+DECIMAL_POSITIVE = 0
+DECIMAL_NEGATIVE = 1
+DECIMAL_SPECIAL = 2
+FLOAT = 3
+FRACTION = 4
+
+
+def encode_value(value: Number) -> bytes:
+    if isinstance(value, Decimal):
+        if not value.is_finite():
+            return bytes([DECIMAL_SPECIAL]) + str(value).encode()
+        exponent = value.as_tuple().exponent
+        coefficient = abs(int(value.scaleb(-exponent, EXACT)))
+        tag = DECIMAL_NEGATIVE if value.is_signed() else DECIMAL_POSITIVE
+        return (
+            bytes([tag])
+            + EXPONENT.pack(exponent)
+            + coefficient.to_bytes((coefficient.bit_length() + 7) // 8, "big")
+        )
+    elif isinstance(value, float):
+        return bytes([FLOAT]) + DOUBLE.pack(value)
+    elif isinstance(value, Fraction):
+        return bytes([FRACTION]) + str(value).encode()
+    raise ValueError(f"Cannot save value of type {type(value).__name__}")
+
+
+def decode_value(data: bytes | memoryview) -> Number:
+    tag = data[0]
+    if tag == DECIMAL_POSITIVE or tag == DECIMAL_NEGATIVE:
+        (exponent,) = EXPONENT.unpack_from(data, 1)
+        coefficient = int.from_bytes(data[5:], "big")
+        if tag == DECIMAL_NEGATIVE:
+            return Decimal(f"-{coefficient}E{exponent}")
+        return Decimal(coefficient).scaleb(exponent, EXACT)
+    elif tag == DECIMAL_SPECIAL:
+        return Decimal(bytes(data[1:]).decode())
+    elif tag == FLOAT:
+        return DOUBLE.unpack_from(data, 1)[0]
+    elif tag == FRACTION:
+        return Fraction(bytes(data[1:]).decode())
+    raise ValueError(f"Invalid snapshot value tag: {tag}")
+
+
+def name_hash(name: bytes) -> int:
+    return zlib.crc32(name)
+
+
+def backend_options(backend: NumericBackend) -> dict[str, Any]:
+    options = {}
+    for option in ("precision", "rounding"):
+        value = getattr(backend, option, None)
+        if value is not None:
+            options[option] = value
+    return options
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % 8)
+
+
+def write_snapshot(
+    path: str | os.PathLike,
+    variables: Iterable[tuple[str, Number]],
+    backend: NumericBackend,
+    sync: bool = False,
+):
+    """Write the variables to ``path``, replacing it atomically.
+
+    With ``sync``, the file and its directory entry are flushed to disk
+    before returning.
+    """
+    items = list(variables)
+    names = [name.encode() for name, _ in items]
+    values = [encode_value(value) for _, value in items]
+    name_offsets = [0, *accumulate(map(len, names))]
+    value_offsets = [0, *accumulate(map(len, values))]
+
+    count = len(names)
+    buckets = 1
+    while buckets < 2 * count:
+        buckets *= 2
+    table = [0] * buckets
+    mask = buckets - 1
+    for position, name in enumerate(names):
+        bucket = name_hash(name) & mask
+        while table[bucket]:
+            bucket = (bucket + 1) & mask
+        table[bucket] = position + 1
+
+    header = json.dumps(
+        {
+            "count": count,
+            "buckets": buckets,
+            "byteorder": sys.byteorder,
+            "backend": backend.name,
+            "options": backend_options(backend),
+        }
+    ).encode()
+    prefix = PREFIX.pack(MAGIC, VERSION, len(header)) + header
+    temporary = f"{os.fspath(path)}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(prefix + _padding(len(prefix)))
+        file.write(struct.pack(f"={count + 1}Q", *name_offsets))
+        file.write(struct.pack(f"={count + 1}Q", *value_offsets))
+        file.write(struct.pack(f"={buckets}I", *table))
+        file.write(b"".join(names))
+        file.write(b"".join(values))
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temporary, path)
+    if sync:
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._map)
+        if len(data) < PREFIX.size:
+            raise ValueError("Not a calculator snapshot")
+        magic, version, header_size = PREFIX.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a calculator snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+        header = json.loads(bytes(data[PREFIX.size : PREFIX.size + header_size]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("Snapshot byte order does not match this machine")
+
+        self.count: int = header["count"]
+        self.backend_name: str = header["backend"]
+        self.backend_options: dict[str, Any] = header["options"]
+        start = PREFIX.size + header_size
+        start += -start % 8
+        offsets_size = (self.count + 1) * 8
+        self._name_offsets = data[start : start + offsets_size].cast("Q")
+        start += offsets_size
+        self._value_offsets = data[start : start + offsets_size].cast("Q")
+        start += offsets_size
+        self._table = data[start : start + header["buckets"] * 4].cast("I")
+        self._mask = header["buckets"] - 1
+        self._names = start + header["buckets"] * 4
+        self._values = self._names + self._name_offsets[self.count]
+        self._data = data
+
+    def backend(self) -> NumericBackend:
+        """The backend of the saved context."""
+        return numeric_backend(self.backend_name, **self.backend_options)
+
+    def name(self, position: int) -> str:
+        start = self._names + self._name_offsets[position]
+        end = self._names + self._name_offsets[position + 1]
+        return bytes(self._data[start:end]).decode()
+
+    def value(self, position: int) -> Number:
+        start = self._values + self._value_offsets[position]
+        end = self._values + self._value_offsets[position + 1]
+        return decode_value(self._data[start:end])
+
+    def position(self, name: str) -> int | None:
+        """Position of the variable in the snapshot, None if it is not there."""
+        encoded = name.encode()
+        size = len(encoded)
+        bucket = name_hash(encoded) & self._mask
+        while entry := self._table[bucket]:
+            position = entry - 1
+            start = self._names + self._name_offsets[position]
+            if (
+                self._name_offsets[position + 1] - self._name_offsets[position] == size
+                and self._data[start : start + size] == encoded
+            ):
+                return position
+            bucket = (bucket + 1) & self._mask
+        return None
+
+    def names(self) -> Iterator[str]:
+        return (self.name(position) for position in range(self.count))
+
+
+class SnapshotVariables(MutableMapping):
+    """Variables backed by a snapshot, decoded as they are read.
+
+    Values that are read or written are kept in ``_values``; variables that
+    are not in the snapshot, or were deleted from it and defined again, are
+    kept in ``_added``. Iteration follows the dict order the variables would
+    have had if they had been loaded eagerly.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot: Snapshot | None = snapshot
+        # Snapshot variable name -> value, for the ones read or written
+        self._values: dict[str, Number] = {}
+        self._deleted: set[str] = set()
+        self._added: dict[str, Number] = {}
+
+    def _position(self, name: str) -> int | None:
+        if self._snapshot is None or name in self._deleted:
+            return None
+        return self._snapshot.position(name)
+
+    def __getitem__(self, name: str) -> Number:
+        value = self._values.get(name, MISSING)
+        if value is not MISSING:
+            return value
+        value = self._added.get(name, MISSING)
+        if value is not MISSING:
+            return value
+        position = self._position(name)
+        if position is None:
+            raise KeyError(name)
+        value = self._values[name] = self._snapshot.value(position)
+        return value
+
+    def __setitem__(self, name: str, value: Number):
+        if name in self._values or (
+            name not in self._added and self._position(name) is not None
+        ):
+            self._values[name] = value
+        else:
+            self._added[name] = value
+
+    def __delitem__(self, name: str):
+        if name in self._added:
+            del self._added[name]
+        elif self._position(name) is not None:
+            self._values.pop(name, None)
+            self._deleted.add(name)
+        else:
+            raise KeyError(name)
+
+    def __contains__(self, name: object) -> bool:
+        return (
+            name in self._values
+            or name in self._added
+            or (isinstance(name, str) and self._position(name) is not None)
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        if self._snapshot is not None:
+            for name in self._snapshot.names():
+                if name not in self._deleted:
+                    yield name
+        yield from self._added
+
+    def __len__(self) -> int:
+        count = 0 if self._snapshot is None else self._snapshot.count
+        return count - len(self._deleted) + len(self._added)
+
+    def items(self) -> "SnapshotItems":
+        return SnapshotItems(self)
+
+    def clear(self):
+        self._snapshot = None
+        self._values.clear()
+        self._deleted.clear()
+        self._added.clear()
+
+    def copy(self) -> dict[str, Number]:
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class SnapshotItems(ItemsView):
+    """Items of SnapshotVariables, read in snapshot order without lookups.
+
+    Values that were never read are decoded but not kept, so saving or
+    showing a large session does not load it into memory.
+    """
+
+    _mapping: SnapshotVariables
+
+    def __iter__(self) -> Iterator[tuple[str, Number]]:
+        variables = self._mapping
+        snapshot = variables._snapshot
+        if snapshot is not None:
+            for position in range(snapshot.count):
+                name = snapshot.name(position)
+                if name in variables._deleted:
+                    continue
+                value = variables._values.get(name, MISSING)
+                if value is MISSING:
+                    value = snapshot.value(position)
+                yield name, value
+        yield from variables._added.items()
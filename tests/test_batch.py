@@ -0,0 +1,170 @@
+import io
+import json
+
+import pytest
+
+from batch import format_context, read_statements, run_script, run_statements
+from calculator import ExecutionContext
+from ui import main
+
+SPEC_SCRIPT = """i = 0
+j = ++i
+x = i++ + 5
+y = 5 + 3 * 10
+i += y
+"""
+
+
+def test_spec_example():
+    output, errors = io.StringIO(), io.StringIO()
+    code = run_script(io.StringIO(SPEC_SCRIPT), output, errors)
+
+    assert code == 0
+    assert output.getvalue() == "(i=37,j=1,x=6,y=35)\n"
+    assert errors.getvalue() == ""
+
+
+def test_read_statements_is_lazy_and_skips_blank_lines():
+    consumed = []
+
+    def lines():
+        for line in ["x = 1\n", "   \n", "  y = 2  \n"]:
+            consumed.append(line)
+            yield line
+
+    statements = read_statements(lines())
+    assert next(statements) == (1, "x = 1")
+    assert len(consumed) == 1
+    assert list(statements) == [(3, "y = 2")]
+
+
+def test_errors_are_reported_and_execution_continues():
+    output, errors = io.StringIO(), io.StringIO()
+    code = run_script(io.StringIO("x = 1\ny = x / 0\nz = x + 1\n"), output, errors)
+
+    assert code == 1
+    assert output.getvalue() == "(x=1,z=2)\n"
+    assert errors.getvalue() == "line 2: Error: Division by zero\n"
+
+
+def test_jsonl_results():
+    output, errors, jsonl = io.StringIO(), io.StringIO(), io.StringIO()
+    run_script(io.StringIO("x = 1\n\nx += a\n"), output, errors, jsonl)
+
+    results = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+    assert results == [
+        {"line": 1, "statement": "x = 1", "result": "1", "error": None},
+        {
+            "line": 3,
+            "statement": "x += a",
+            "result": None,
+            "error": "Undefined variable: a",
+        },
+    ]
+
+
+def test_commands():
+    context = ExecutionContext({})
+    statements = read_statements(["x = 1", "show", "clear", "y = 2", "exit", "z = 3"])
+    results = [result.result for result in run_statements(statements, context)]
+
+    assert results == ["1", "(x=1)", None, "2"]
+    assert context.variables == {"y": 2}
+
+
+def test_show_output_is_streamed():
+    context = ExecutionContext({f"v{n}": n for n in range(2500)})
+    chunks = []
+    results = list(run_statements([(1, "show")], context, chunks.extend))
+
+    assert [result.result for result in results] == [None]
+    # Three chunks of up to SHOW_CHUNK_SIZE variables, then the ")"
+    assert len(chunks) == 4
+    assert "".join(chunks) == format_context(context)
+
+
+def test_main_runs_a_script_file(tmp_path, capsys):
+    script = tmp_path / "script.calc"
+    script.write_text(SPEC_SCRIPT)
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--script", str(script)])
+
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out == "(i=37,j=1,x=6,y=35)\n"
+
+
+def test_main_executes_statements(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-e", "x = 1 + 2", "--execute", "y = x++", "-e", "z = 1 / 0"])
+
+    assert exit_info.value.code == 1
+    output = capsys.readouterr()
+    assert output.out == "(x=4,y=3)\n"
+    assert output.err == "line 3: Error: Division by zero\n"
+
+
+def test_main_keeps_variables_in_a_snapshot(tmp_path, capsys):
+    snapshot = str(tmp_path / "session.snap")
+    for lines in ("x = 2\ny = x * 3\n", "x += y\n"):
+        script = tmp_path / "script.calc"
+        script.write_text(lines)
+        with pytest.raises(SystemExit):
+            main(["--script", str(script), "--snapshot", snapshot])
+
+    assert capsys.readouterr().out == "(x=2,y=6)\n(x=8,y=6)\n"
+
+
+def test_formulas_in_scripts():
+    output, errors = io.StringIO(), io.StringIO()
+    script = "price = 2\nqty = 3\ntotal := price * qty\nqty = 5\nclear\nqty = 1\n"
+    run_script(io.StringIO(script), output, errors)
+
+    assert output.getvalue() == "(qty=1)\n"
+    output = io.StringIO()
+    run_script(io.StringIO(script.replace("clear\n", "")), output, errors)
+    assert output.getvalue() == "(price=2,qty=1,total=2)\n"
+
+
+def test_transaction_blocks():
+    output, errors = io.StringIO(), io.StringIO()
+    script = "x = 1\nbegin\nx = 2\ny = x * 10\ncommit\n"
+    script += "begin\nx = 3\ny = x / 0\nz = 1\ncommit\n"
+    script += "begin\nx = 4\nabort\ncommit\n"
+    code = run_script(io.StringIO(script), output, errors)
+
+    assert code == 1
+    assert output.getvalue() == "(x=2,y=20)\n"
+    assert errors.getvalue().splitlines() == [
+        "line 8: Error: Division by zero",
+        "line 9: Error: Transaction failed, statements are ignored until commit "
+        "or abort",
+        "line 10: Error: Transaction rolled back: Division by zero",
+        "line 14: Error: No transaction in progress",
+    ]
+
+
+def test_uncommitted_transaction_is_rolled_back(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["-e", "x = 1", "-e", "begin", "-e", "x = 2"])
+
+    assert exit_info.value.code == 1
+    captured = capsys.readouterr()
+    assert captured.out == "(x=1)\n"
+    assert captured.err == "Error: Transaction not committed, rolled back\n"
+
+
+def test_show_options():
+    output, errors = io.StringIO(), io.StringIO()
+    script = "show = 1\ntax = 3\ntotal = 30\nshow t* sort=-value\nshow count\n"
+    script += "show t limit=1 page=2\nshow limit=x\n"
+    code = run_script(io.StringIO(script), output, errors)
+
+    assert code == 1
+    assert output.getvalue().splitlines() == [
+        "(total=30,tax=3)",
+        "3",
+        "(total=30)",
+        "(show=1,tax=3,total=30)",
+    ]
+    assert errors.getvalue().startswith("line 7: Error: Invalid show option: limit=x")
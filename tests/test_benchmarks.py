@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from benchmarks import suite
+
+
+def test_every_workload_runs():
+    results = suite.run(quick=True, repeat=1, min_time=0)
+
+    assert len(results["results"]) == len(suite.WORKLOADS) * 6
+    assert all(result["ns"] > 0 for result in results["results"].values())
+    json.dumps(results)
+
+
+def test_only():
+    results = suite.run(quick=True, only=["nested/10/to_"], repeat=1, min_time=0)
+    assert list(results["results"]) == ["nested/10/to_postfix"]
+
+
+def results(**timings):
+    return {"results": {key: {"ns": ns} for key, ns in timings.items()}}
+
+
+def test_compare():
+    baseline = results(a=100, b=100, c=100, gone=1)
+    current = results(a=105, b=150, c=50, new=1)
+
+    assert [
+        (c.key, round(c.ratio, 2), c.status)
+        for c in suite.compare(baseline, current, 0.1)
+    ] == [("a", 1.05, "ok"), ("b", 1.5, "regression"), ("c", 0.5, "improvement")]
+
+
+def test_compare_exits_on_regression(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results(**{"flat_sum/10/tokenize": 1.0})))
+
+    with pytest.raises(SystemExit) as exit_info:
+        suite.main(
+            [
+                "--quick",
+                "--only",
+                "flat_sum/10/tokenize",
+                "--repeat",
+                "1",
+                "--compare",
+                str(baseline),
+            ]
+        )
+
+    assert exit_info.value.code == 1
+    assert "1 regression(s) above 10%" in capsys.readouterr().out
+
+
+def test_execute_postfix_stage_repeats_the_same_work():
+    workload = suite.increments(10)
+    stage = suite.stages(workload)["execute_postfix"]
+
+    assert stage() == stage() == stage()
@@ -0,0 +1,117 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from cache import ExpressionCache, normalize_expression
+from calculator import ExecutionContext, compile_expression, execute_expression
+from tokenizer import tokenize
+
+
+@pytest.fixture
+def cache():
+    return ExpressionCache(maxsize=2)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("x+1", "x + 1"),
+        ("x = y++ + ++z", "x=y++ + ++z"),
+        ("x = ( y * 2 )", "x=(y*2)"),
+        ("\tx\t+=\n5", "x+=5"),
+        ("x = -5 + 4", "x=-5+4"),
+    ],
+)
+def test_equivalent_spellings_share_a_key(first, second):
+    assert normalize_expression(first) == normalize_expression(second)
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("x ++", "x++"),
+        ("++ x", "++x"),
+        ("5 - 4", "5 -4"),
+        ("x + = 1", "x += 1"),
+        ("x + + y", "x ++ y"),
+        ("a b", "ab"),
+    ],
+)
+def test_significant_whitespace_is_kept(first, second):
+    assert normalize_expression(first) != normalize_expression(second)
+
+
+def test_normalization_preserves_tokens():
+    def tokens(expression):
+        try:
+            return [token.value for token in tokenize(expression)]
+        except ValueError as e:
+            return str(e)
+
+    rnd = random.Random(0)
+    alphabet = list("xy1.2+-*/%=() ") + ["\t", "++", "--", "ab", "10"]
+    for _ in range(5000):
+        expression = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 10)))
+        assert tokens(expression) == tokens(normalize_expression(expression))
+
+
+def test_hits_misses_and_evictions(cache):
+    cache.get("x + 1", compile_expression)
+    cache.get("x+1", compile_expression)
+    cache.get("y = 2", compile_expression)
+    cache.get("z = 3", compile_expression)
+
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions) == (1, 3, 1)
+    assert info.currsize == 2
+    assert "x + 1" not in cache
+    assert "z=3" in cache
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.get("x = 1", compile_expression)
+    cache.get("y = 2", compile_expression)
+    cache.get("x = 1", compile_expression)
+    cache.get("z = 3", compile_expression)
+
+    assert "x = 1" in cache
+    assert "y = 2" not in cache
+
+
+def test_resize(cache):
+    cache.get("x = 1", compile_expression)
+    cache.get("y = 2", compile_expression)
+    cache.resize(1)
+
+    assert len(cache) == 1
+    assert cache.info().evictions == 1
+
+
+def test_zero_size_disables_caching():
+    cache = ExpressionCache(maxsize=0)
+    cache.get("x = 1", compile_expression)
+    cache.get("x = 1", compile_expression)
+
+    assert len(cache) == 0
+    assert cache.info().misses == 2
+
+
+def test_errors_are_not_cached(cache):
+    with pytest.raises(ValueError):
+        cache.get("x = (1", compile_expression)
+    assert len(cache) == 0
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError, match="Invalid cache size"):
+        ExpressionCache(maxsize=-1)
+
+
+def test_cached_expression_runs_against_each_context(cache):
+    first = ExecutionContext({"x": Decimal(1)})
+    second = ExecutionContext({"x": Decimal(10)})
+
+    assert execute_expression("y = x * 2", first, cache) == "2"
+    assert execute_expression("y=x*2", second, cache) == "20"
+    assert cache.info().hits == 1
@@ -0,0 +1,199 @@
+from decimal import Decimal
+
+import pytest
+
+from calculator import (
+    CompiledExpression,
+    ExecutionContext,
+    ExpressionExecutor,
+    SlotExecutionContext,
+    compile_expression,
+)
+from compiler import MAX_PROGRAM_DEPTH, compile_postfix
+from models.expression import Expression
+from models.token import Token, TokenType
+
+EXPRESSIONS = [
+    "x = 5 + 4",
+    "z = 5 / 2",
+    "z = 5 % 2",
+    "x = 5 * 4 + (5 / 2)",
+    "x = (5 + 4) * (2 + 3)",
+    "x = y + 5 - 4 * 2 / 2",
+    "x = 7 / 3",
+    "x = -5 + 4",
+    "x = 5 + -4",
+    "x = 0.10 + 0.20",
+    "x++",
+    "--x",
+    "x = y++",
+    "x = --y",
+    "x += y++",
+    "x -= --y",
+    "x /= y--",
+    "x %= 1",
+    "a = y++ * --z",
+    "x-- + z++ - y",
+    "x * y-- + z++ / 4",
+    "++x++",
+]
+
+INVALID_EXPRESSIONS = [
+    "x / 0",
+    "a",
+    "y++ + a",
+    "x y z +",
+    "x +",
+    "(x + y) +",
+    "x /= 0",
+]
+
+
+VARIABLES = {"x": Decimal(1), "y": Decimal(2), "z": Decimal(3)}
+
+
+def run(
+    expression: str,
+    compiled: bool,
+    context: ExecutionContext | None = None,
+    streamed: bool = False,
+):
+    if context is None:
+        context = ExecutionContext(VARIABLES)
+    executor = ExpressionExecutor(context)
+    try:
+        if streamed:
+            result = executor.execute_stream(expression)
+        elif compiled:
+            result = executor.execute_compiled(compile_expression(expression))
+        else:
+            result = executor.execute_expression(Expression.from_expression(expression))
+    except (ValueError, ArithmeticError) as e:
+        result = str(e)
+    return result, dict(context.variables)
+
+
+@pytest.mark.parametrize("context_type", [ExecutionContext, SlotExecutionContext])
+@pytest.mark.parametrize("expression", EXPRESSIONS + INVALID_EXPRESSIONS)
+def test_compiled_matches_interpreter(expression, context_type):
+    assert run(expression, True, context_type(VARIABLES)) == run(expression, False)
+
+
+@pytest.mark.parametrize("context_type", [ExecutionContext, SlotExecutionContext])
+@pytest.mark.parametrize("expression", EXPRESSIONS + INVALID_EXPRESSIONS)
+def test_streamed_matches_interpreter(expression, context_type):
+    context = context_type(VARIABLES)
+    assert run(expression, False, context, streamed=True) == run(expression, False)
+
+
+@pytest.mark.parametrize(
+    "expression", ["y++", "x = y-- * z++", "++y++", "x = --z + y++"]
+)
+def test_increments_with_equal_values(expression):
+    results = []
+    for streamed, compiled in (False, False), (False, True), (True, False):
+        context = ExecutionContext({name: Decimal(2) for name in "wxyz"})
+        executor = ExpressionExecutor(context)
+        if streamed:
+            result = executor.execute_stream(expression)
+        elif compiled:
+            result = executor.execute_compiled(compile_expression(expression))
+        else:
+            result = executor.execute_expression(Expression.from_expression(expression))
+        results.append((result, context.variables))
+    assert results[0] == results[1] == results[2]
+    assert results[0][1]["w"] == 2
+
+
+def test_deep_expressions_are_left_to_the_interpreter():
+    expression = "x = " + " + ".join(["y", "z"] * MAX_PROGRAM_DEPTH)
+    compiled = compile_expression(expression)
+    assert compiled.program is None
+
+    context = ExecutionContext({"y": Decimal(2), "z": Decimal(3)})
+    assert ExpressionExecutor(context).execute_compiled(compiled) == str(
+        5 * MAX_PROGRAM_DEPTH
+    )
+
+
+def test_literals_are_parsed_once():
+    compiled = compile_expression("x = 1.50 * 2")
+    assert compiled.program is not None
+    assert compiled.program(ExecutionContext({})) == Decimal("3.00")
+
+
+@pytest.mark.parametrize("expression", ["x y z +", "x +", "++x++"])
+def test_malformed_postfix_is_left_to_the_interpreter(expression):
+    assert compile_expression(expression).program is None
+
+
+def test_program_is_reusable_across_contexts():
+    compiled = compile_expression("y = x++ * 2")
+    first = ExecutionContext({"x": Decimal(1)})
+    second = ExecutionContext({"x": Decimal(5)})
+
+    assert ExpressionExecutor(first).execute_compiled(compiled) == "2"
+    assert ExpressionExecutor(second).execute_compiled(compiled) == "10"
+    assert first.variables == {"x": 2, "y": 2}
+    assert second.variables == {"x": 6, "y": 10}
+
+
+def test_post_increment_writes_to_its_operand():
+    context = ExecutionContext({"a": Decimal(1), "b": Decimal(1)})
+    ExpressionExecutor(context).execute_compiled(compile_expression("b++"))
+    assert context.variables == {"a": 1, "b": 2}
+
+
+def test_pre_increment_requires_a_variable():
+    postfix = [
+        Token(value="++pre", token_type=TokenType.operator),
+        Token(value="5", token_type=TokenType.number),
+    ]
+    assert compile_postfix(postfix) is None
+
+
+def test_compiled_expression_repr():
+    assert repr(compile_expression("x = y + 1")) == "CompiledExpression(x = y 1 +)"
+    assert isinstance(compile_expression("1"), CompiledExpression)
+
+
+def test_slot_context_binds_each_program_once():
+    context = SlotExecutionContext({"x": Decimal(1)})
+    executor = ExpressionExecutor(context)
+    compiled = compile_expression("x = x + 1")
+
+    assert context.bind(compiled) is context.bind(compiled)
+    for _ in range(3):
+        executor.execute_compiled(compiled)
+    assert context.variables == {"x": 4}
+    assert context.symbols == {"x": 0}
+
+
+def test_slot_context_variables_view():
+    context = SlotExecutionContext({"x": Decimal(1), "y": Decimal(2)})
+    executor = ExpressionExecutor(context)
+    compiled = compile_expression("a = b + 1")
+
+    with pytest.raises(ValueError, match="Undefined variable: b"):
+        executor.execute_compiled(compiled)
+    executor.execute_compiled(compile_expression("b = 5"))
+    executor.execute_compiled(compiled)
+
+    assert list(context.variables) == ["x", "y", "b", "a"]
+    assert repr(context) == "(x=1, y=2, b=5, a=6)"
+    assert "a" in context.variables and "c" not in context.variables
+
+    context.variables.clear()
+    assert repr(context) == "()"
+    with pytest.raises(ValueError, match="Undefined variable: b"):
+        executor.execute_compiled(compiled)
+
+
+def test_slot_context_rollback_of_created_variable():
+    context = SlotExecutionContext({})
+    context.get_or_create_variable("a")
+    context.set_variable("a", Decimal(1))
+    context.rollback()
+    assert context.get_variable("a").is_nan()
+    context.rollback()
+    assert context.variables == {}
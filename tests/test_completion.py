@@ -0,0 +1,80 @@
+import pytest
+from prompt_toolkit.completion import CompleteEvent
+from prompt_toolkit.document import Document
+
+from calculator import ExecutionContext, SlotExecutionContext, execute_expression
+from completion import NameIndex, ShellCompleter
+from consts import COMMANDS
+
+
+def completions(completer: ShellCompleter, text: str) -> list[str]:
+    return [
+        completion.text
+        for completion in completer.get_completions(Document(text), CompleteEvent())
+    ]
+
+
+def test_name_index():
+    index = NameIndex(["total", "tax", "qty", "tax"])
+    index.add("t")
+    index.add("qty")
+    index.discard("missing")
+    index.discard("tax")
+
+    assert len(index) == 3
+    assert "qty" in index and "tax" not in index
+    assert index.matches("t") == ["t", "total"]
+    assert index.matches("") == ["qty", "t", "total"]
+    assert index.matches("x") == []
+    index.update(["tax", "t", "u"])
+    assert index.matches("") == ["qty", "t", "tax", "total", "u"]
+    index.load(["b", "a"])
+    assert index.matches("") == ["a", "b"]
+    index.clear()
+    assert index.matches("") == []
+
+
+def test_matches_are_limited():
+    index = NameIndex(f"v{n}" for n in range(100_000))
+
+    assert index.matches("v9999", 5) == [
+        "v9999",
+        "v99990",
+        "v99991",
+        "v99992",
+        "v99993",
+    ]
+    assert len(index.matches("v", 10)) == 10
+
+
+def test_completer_offers_commands_then_variables():
+    completer = ShellCompleter(COMMANDS, NameIndex(["sx", "show_total", "y"]), 3)
+
+    assert completions(completer, "s") == ["show", "stats", "show_total"]
+    assert completions(completer, "x = sh") == ["show", "show_total"]
+    assert completions(completer, "x = ++s") == ["show", "stats", "show_total"]
+    assert completions(completer, "x = (") == []
+    completion = next(completer.get_completions(Document("z = y"), CompleteEvent()))
+    assert completion.start_position == -1
+
+
+@pytest.mark.parametrize("context_type", [ExecutionContext, SlotExecutionContext])
+def test_context_updates_the_index(context_type):
+    context = context_type({"a": 1})
+    index = NameIndex(["stale"])
+    context.bind_name_index(index)
+    assert index.matches("") == ["a"]
+
+    execute_expression("b = a + 1", context)
+    with pytest.raises(ValueError):
+        execute_expression("c = a / 0", context)
+    assert index.matches("") == ["a", "b"]
+
+    context.begin()
+    execute_expression("d = 1", context)
+    assert "d" in index
+    context.abort()
+    assert index.matches("") == ["a", "b"]
+
+    context.clear()
+    assert len(index) == 0
@@ -1,14 +1,20 @@
+import tracemalloc
+
 import pytest
 from decimal import Decimal
-from calculator import ExpressionExecutor, ExecutionContext
+
+import calculator
+from cache import ExpressionCache
+from calculator import ExpressionExecutor, ExecutionContext, SlotExecutionContext
 from models.expression import Expression
+from models.token import Token, TokenType
 
 
-@pytest.fixture
-def initial_context():
-    """Fixture to provide a fresh execution context."""
+@pytest.fixture(params=[ExecutionContext, SlotExecutionContext])
+def initial_context(request):
+    """Fixture to provide a fresh execution context of each storage mode."""
     variables = {"x": Decimal(1), "y": Decimal(2), "z": Decimal(3)}
-    return ExecutionContext(variables)
+    return request.param(variables)
 
 
 @pytest.fixture
@@ -40,6 +46,43 @@ def test_commit(initial_context):
     assert initial_context.variables["x"] == 10
 
 
+def test_rollback_undoes_one_write_at_a_time(initial_context):
+    initial_context.set_variable("x", Decimal(10))
+    initial_context.set_variable("y", Decimal(20))
+    initial_context.rollback()
+    assert initial_context.variables == {"x": 10, "y": 2, "z": 3}
+    initial_context.rollback()
+    assert initial_context.variables == {"x": 1, "y": 2, "z": 3}
+    initial_context.rollback()
+    assert initial_context.variables == {"x": 1, "y": 2, "z": 3}
+
+
+def test_rollback_to_savepoint(initial_context):
+    variables = initial_context.variables
+    initial_context.set_variable("x", Decimal(10))
+    initial_context.savepoint("before_y")
+    initial_context.set_variable("y", Decimal(20))
+    initial_context.get_or_create_variable("a")
+    initial_context.savepoint("after_a")
+    initial_context.set_variable("a", Decimal(5))
+
+    initial_context.rollback("before_y")
+    assert initial_context.variables == {"x": 10, "y": 2, "z": 3}
+    assert initial_context.variables is variables
+    with pytest.raises(ValueError, match="Unknown savepoint: after_a"):
+        initial_context.rollback("after_a")
+
+
+def test_commit_clears_savepoints(initial_context):
+    initial_context.savepoint("start")
+    initial_context.set_variable("x", Decimal(10))
+    initial_context.commit()
+    initial_context.rollback()
+    assert initial_context.get_variable("x") == 10
+    with pytest.raises(ValueError, match="Unknown savepoint: start"):
+        initial_context.rollback("start")
+
+
 def test_undefined_variable_access(initial_context):
     with pytest.raises(ValueError, match="Undefined variable: a"):
         initial_context.get_variable("a")
@@ -197,3 +240,131 @@ def test_execute_postfix_errors(executor, expression):
 
     # Ensure the context is rolled back correctly after an error
     assert executor.context.variables == {"x": 1, "y": 2, "z": 3}
+
+
+@pytest.mark.parametrize("expression", ["x = y++ + z++ + a", "a += 1", "y = --y / 0"])
+def test_failed_statement_rolls_back_every_write(executor, expression):
+    with pytest.raises(ValueError):
+        executor.execute_expression(Expression.from_expression(expression))
+    assert executor.context.variables == {"x": 1, "y": 2, "z": 3}
+
+
+@pytest.mark.parametrize(
+    "raw_expression, expected",
+    [
+        ("v7++", {"v7": 2}),
+        ("v3--", {"v3": 0}),
+        ("x = v5++ + v9--", {"x": 2, "v5": 2, "v9": 0}),
+        ("x = ++v2 * v8++", {"x": 2, "v2": 2, "v8": 2}),
+        ("++v4++", {"v4": 3}),
+    ],
+)
+def test_post_increment_updates_its_operand_among_equal_values(
+    raw_expression, expected
+):
+    """Only the incremented variable changes, not the first one with its value."""
+    variables = {f"v{n}": Decimal(1) for n in range(10)}
+    for context_type in ExecutionContext, SlotExecutionContext:
+        executor = ExpressionExecutor(context_type(dict(variables)))
+        executor.execute_expression(Expression.from_expression(raw_expression))
+        assert executor.context.variables == {**variables, **expected}
+
+
+def test_post_increment_requires_a_variable(executor):
+    with pytest.raises(ValueError, match="Invalid use of"):
+        executor.execute_postfix(
+            [Token("5", TokenType.number), Token("++post", TokenType.operator)]
+        )
+
+
+def stream_peak_memory(expression: str) -> int:
+    context = ExecutionContext({"y": Decimal(2), "z": Decimal(3)})
+    tracemalloc.start()
+    try:
+        ExpressionExecutor(context).execute_stream(expression)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_stream_memory_does_not_grow_with_length():
+    short = "x = " + " + ".join(["y * 2", "(3 - z)", "1.5"] * 100)
+    long = "x = " + " + ".join(["y * 2", "(3 - z)", "1.5"] * 3000)
+    assert stream_peak_memory(long) < stream_peak_memory(short) * 2
+
+
+def test_stream_memory_grows_with_depth():
+    shallow = stream_peak_memory("(" * 10 + "1" + " + 1)" * 10)
+    deep = stream_peak_memory("(" * 2000 + "1" + " + 1)" * 2000)
+    assert deep > shallow * 2
+
+
+def test_long_expressions_are_streamed(monkeypatch):
+    monkeypatch.setattr(calculator, "STREAM_THRESHOLD", 10)
+    context = ExecutionContext({"y": Decimal(2), "z": Decimal(4)})
+    cache = ExpressionCache(16)
+
+    assert calculator.execute_expression("x = 1", context, cache) == "1"
+    assert calculator.execute_expression("x = y++ + z + 0", context, cache) == "6"
+    assert len(cache) == 1
+    assert context.variables == {"x": 6, "y": 3, "z": 4}
+
+
+def test_transaction_commits_statements_together(initial_context):
+    initial_context.begin()
+    calculator.execute_expression("x = 10", initial_context)
+    calculator.execute_expression("w = x + y", initial_context)
+    assert initial_context.in_transaction
+
+    initial_context.commit()
+    initial_context.rollback()
+    assert not initial_context.in_transaction
+    assert initial_context.variables == {"x": 10, "y": 2, "z": 3, "w": 12}
+
+
+def test_abort_undoes_the_transaction(initial_context):
+    initial_context.begin()
+    calculator.execute_expression("x = 10", initial_context)
+    calculator.execute_expression("w = x++ + y", initial_context)
+
+    initial_context.abort()
+    assert not initial_context.in_transaction
+    assert initial_context.variables == {"x": 1, "y": 2, "z": 3}
+
+
+def test_failed_statement_rolls_back_the_transaction(initial_context):
+    initial_context.begin()
+    calculator.execute_expression("x = 10", initial_context)
+    with pytest.raises(ValueError, match="Division by zero"):
+        calculator.execute_expression("y = x / 0", initial_context)
+    assert initial_context.variables == {"x": 1, "y": 2, "z": 3}
+
+    with pytest.raises(ValueError, match="statements are ignored until commit"):
+        calculator.execute_expression("z = 1", initial_context)
+    with pytest.raises(ValueError, match="Transaction rolled back: Division by zero"):
+        initial_context.commit()
+    assert calculator.execute_expression("z = 1", initial_context) == "1"
+
+
+def test_transaction_block(initial_context):
+    with initial_context.transaction():
+        calculator.execute_expression("x = 10", initial_context)
+    with pytest.raises(ValueError, match="Undefined variable: a"):
+        with initial_context.transaction():
+            calculator.execute_expression("y = 20", initial_context)
+            calculator.execute_expression("z = a", initial_context)
+
+    assert not initial_context.in_transaction
+    assert initial_context.variables == {"x": 10, "y": 2, "z": 3}
+
+
+def test_transaction_errors(initial_context):
+    with pytest.raises(ValueError, match="No transaction in progress"):
+        initial_context.abort()
+    with pytest.raises(ValueError, match="No transaction in progress"):
+        calculator.execute_transaction_command("commit", initial_context)
+    initial_context.begin()
+    with pytest.raises(ValueError, match="already in progress"):
+        initial_context.begin()
+    with pytest.raises(ValueError, match="Cannot clear"):
+        initial_context.clear()
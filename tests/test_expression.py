@@ -1,5 +1,10 @@
+import random
+
 import pytest
+
+import parser
 from models.expression import Expression
+from tokenizer import tokenize
 
 POSTFIX_FIXTURES = [
     # Simple arithmetic
@@ -119,6 +124,40 @@ def test_invalid_expression(expression):
         Expression.from_expression(expression)  # This should raise a validation error
 
 
+@pytest.mark.parametrize("expression, expected", VALID_EXPRESSIONS)
+def test_stream_matches_expression(expression, expected):
+    expr = Expression.from_expression(expression)
+    stream = Expression.stream(expression)
+
+    assert stream.variable_name == expr.variable_name
+    assert stream.assignment == expr.assignment
+    assert list(stream.postfix()) == expr.to_postfix()
+
+
+def error_of(parse, expression):
+    try:
+        parse(expression)
+    except ValueError as e:
+        return str(e)
+
+
+@pytest.mark.parametrize("expression", [e for (e,) in INVALID_EXPRESSIONS])
+def test_stream_invalid_expression(expression):
+    """Errors are raised while the tokens are consumed, with the same messages."""
+    error = error_of(Expression.from_expression, expression)
+    stream_error = error_of(lambda e: list(Expression.stream(e).postfix()), expression)
+    if error is None:
+        assert stream_error is None
+    else:
+        assert stream_error in error
+
+
+def test_stream_reports_the_first_error():
+    # from_expression checks the parentheses of the whole expression first
+    with pytest.raises(ValueError, match="Invalid consecutive operators"):
+        list(Expression.stream("x * * (y").tokens)
+
+
 OPERATOR_PRECEDENCE_FIXTURES = [
     # Test cases with expected postfix results (using correct operator prefixes)
     ("x++ + y++", ["x", "++post", "y", "++post", "+"]),
@@ -153,3 +192,78 @@ def test_operator_precedence_and_associativity(expression, expected):
     postfix = expr.to_postfix()
     postfix = [token.value for token in postfix]
     assert postfix == expected
+
+
+def multi_pass(tokens):
+    """The checks and shunting-yard conversion replaced by parser.parse_tree."""
+    parser.check_balanced_parentheses(tokens)
+    parser.check_consecutive_operators(tokens)
+    return parser.to_postfix(tokens)
+
+
+def single_pass(tokens):
+    return parser.Statement(None, None, tokens, parser.parse_tree(tokens)).to_postfix()
+
+
+@pytest.mark.parametrize("expression, expected", OPERATOR_PRECEDENCE_FIXTURES)
+def test_tree_postfix_matches_shunting_yard(expression, expected):
+    expr = Expression.from_expression(expression)
+
+    assert expr.tree is not None
+    assert expr.tree.postfix() == parser.to_postfix(expr.tokens)
+
+
+@pytest.mark.parametrize("expression", [e for (e,) in INVALID_EXPRESSIONS])
+def test_tree_errors_match_multi_pass(expression):
+    def tokens_of(expression):
+        return parser.split_assignment(tokenize(expression)).tokens
+
+    assert error_of(lambda e: single_pass(tokens_of(e)), expression) == error_of(
+        lambda e: multi_pass(tokens_of(e)), expression
+    )
+
+
+def test_tree_matches_multi_pass_on_random_tokens():
+    choices = ["x", "y", "1", "2.5", "+", "-", "*", "/", "%", "(", ")"]
+    choices += ["x++", "--y", "++z", "=", "+="]
+    rng = random.Random(22)
+    for _ in range(2000):
+        expression = " ".join(rng.choices(choices, k=rng.randint(1, 9)))
+        try:
+            tokens = parser.split_assignment(tokenize(expression)).tokens
+        except ValueError:
+            continue
+        assert error_of(single_pass, tokens) == error_of(multi_pass, tokens)
+        if error_of(multi_pass, tokens) is None:
+            assert single_pass(tokens) == multi_pass(tokens), expression
+
+
+@pytest.mark.parametrize(
+    "expression", ["x = y +", "x = (y) z", "x = y-- z", "x = 2 * ++3"]
+)
+def test_malformed_tokens_have_no_tree(expression):
+    expr = Expression.from_expression(expression)
+
+    assert expr.tree is None
+    assert expr.to_postfix() == parser.to_postfix(expr.tokens)
+
+
+def test_tree_of_deep_expressions():
+    depth = 5000
+    expression = "x = " + "(" * depth + "y" + " + 1)" * depth
+    tokens = parser.split_assignment(tokenize(expression)).tokens
+
+    tree = parser.parse_tree(tokens)
+    assert isinstance(tree, parser.BinaryOperation)
+    assert tree.postfix() == parser.to_postfix(tokens)
+
+
+def test_tree_nodes_have_slots():
+    tree = Expression.from_expression("x = ++y + z++ * 2").tree
+    for node in (tree, tree.left, tree.right, tree.right.left, tree.right.right):
+        assert not hasattr(node, "__dict__")
+
+
+def test_node_is_abstract():
+    with pytest.raises(TypeError, match="reversed_postfix"):
+        parser.Node()
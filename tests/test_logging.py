@@ -0,0 +1,90 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+import settings
+from calculator import (
+    ExecutionContext,
+    ExpressionExecutor,
+    compile_expression,
+    execute_expression,
+)
+from settings import LazyQueueHandler, configure_logging, logger
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    configure_logging()
+
+
+def test_no_records_when_debug_is_off(monkeypatch):
+    configure_logging("WARNING")
+
+    def make_record(*args, **kwargs):
+        raise AssertionError("a record was created")
+
+    monkeypatch.setattr(logger, "makeRecord", make_record)
+    context = ExecutionContext({"y": 2})
+    execute_expression("x = y * 3", context)
+    ExpressionExecutor(context).execute_postfix(compile_expression("x + 1").postfix)
+
+    assert not settings.log_handler.started
+
+
+def test_debug_records_are_written_by_the_listener(tmp_path):
+    path = tmp_path / "calculator.log"
+    configure_logging("DEBUG", str(path))
+    handler = settings.log_handler
+    assert isinstance(handler, LazyQueueHandler) and not path.exists()
+
+    context = ExecutionContext({"y": 2})
+    execute_expression("x = y * 3", context)
+    ExpressionExecutor(context).execute_postfix(compile_expression("x + 1").postfix)
+    assert handler.started
+    # Closing the handler writes out the queue
+    configure_logging()
+
+    lines = path.read_text().splitlines()
+    assert [line.split(" - ")[-1] for line in lines] == [
+        "Postfix: y 3 *",
+        "Result: 6",
+        "Variable assignment: x = 6",
+        "Variable x assigned to 6",
+        "Postfix: x 1 +",
+        "Result: 7",
+    ]
+    assert " - settings - DEBUG - " in lines[0]
+
+
+def test_disabled_destination():
+    configure_logging("DEBUG", "")
+    assert isinstance(settings.log_handler, logging.NullHandler)
+    execute_expression("x = 1", ExecutionContext({}))
+
+
+def test_environment(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(
+        os.environ,
+        CALCULATOR_LOG_LEVEL="debug",
+        CALCULATOR_LOG_FILE="-",
+        PYTHONPATH=root,
+    )
+    script = (
+        "from calculator import ExecutionContext, execute_expression\n"
+        "execute_expression('x = 2 * 3', ExecutionContext({}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env=environment,
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+
+    assert "DEBUG - Variable x assigned to 6" in result.stderr
+    assert not (tmp_path / "calculator.log").exists()
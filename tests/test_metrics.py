@@ -0,0 +1,101 @@
+import io
+import random
+
+import pytest
+
+from batch import run_script
+from cache import ExpressionCache
+from calculator import ExecutionContext, execute_expression
+from metrics import Histogram, Metrics, bucket_of, bucket_value, metrics
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+@pytest.mark.parametrize("value", [0, 1, 7, 8, 15, 16, 17, 1000, 123_456, 10**12])
+def test_bucket_error_is_bounded(value):
+    assert abs(bucket_value(bucket_of(value)) - value) <= value / 16
+
+
+def test_histogram_quantiles():
+    rng = random.Random(0)
+    values = sorted(rng.randrange(1, 10**6) for _ in range(10_000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (0.5, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert abs(histogram.quantile(q) - exact) <= exact / 8
+    assert histogram.max == values[-1]
+    assert histogram.stats().count == 10_000
+
+
+def test_phases_are_recorded(enabled):
+    cache = ExpressionCache(16)
+    context = ExecutionContext({})
+    for statement in ["x = 1", "y = x + 2", "y = x + 2", "z = y / 0"]:
+        try:
+            execute_expression(statement, context, cache)
+        except ValueError:
+            pass
+
+    stats = enabled.stats()
+    assert list(stats) == [
+        "tokenize",
+        "validate",
+        "postfix",
+        "compile",
+        "evaluate",
+        "commit",
+        "rollback",
+        "statement",
+    ]
+    # "y = x + 2" is compiled once
+    assert stats["tokenize"].count == stats["compile"].count == 3
+    assert stats["evaluate"].count == 4 and stats["evaluate"].errors == 1
+    assert stats["commit"].count == 3 and stats["rollback"].count == 1
+    assert stats["statement"].count == 4 and stats["statement"].errors == 1
+    assert 0 < stats["statement"].p50_ns <= stats["statement"].p99_ns
+
+
+def test_tokenize_errors_are_counted(enabled):
+    with pytest.raises(ValueError):
+        execute_expression("x = 1 $ 2", ExecutionContext({}), ExpressionCache(16))
+    assert enabled.stats()["tokenize"].errors == 1
+    assert "validate" not in enabled.stats()
+
+
+def test_nothing_is_recorded_when_disabled():
+    assert not metrics.enabled
+    execute_expression("x = 1 + 2", ExecutionContext({}), ExpressionCache(16))
+    assert metrics.stats() == {}
+    assert Metrics().format().startswith("Metrics are disabled")
+
+
+def test_stats_command(enabled):
+    output = io.StringIO()
+    run_script(io.StringIO("x = 1\nstats\n"), output, io.StringIO())
+
+    table = output.getvalue().splitlines()
+    assert table[0].split() == [
+        "phase",
+        "count",
+        "errors",
+        "p50",
+        "µs",
+        "p99",
+        "µs",
+        "max",
+        "µs",
+        "total",
+        "ms",
+    ]
+    assert table[-2].split()[:3] == ["statement", "1", "0"]
+    assert table[-1] == "(x=1)"
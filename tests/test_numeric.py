@@ -0,0 +1,106 @@
+from decimal import ROUND_DOWN, Decimal
+from fractions import Fraction
+
+import pytest
+
+from batch import format_context
+from calculator import ExecutionContext, SlotExecutionContext, execute_expression
+from numeric import (
+    DecimalBackend,
+    FloatBackend,
+    FractionBackend,
+    NumericBackend,
+    default_backend,
+    numeric_backend,
+)
+from tests.test_compiler import EXPRESSIONS, INVALID_EXPRESSIONS, run
+
+BACKENDS = [DecimalBackend(), DecimalBackend(6), FloatBackend(), FractionBackend()]
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=repr)
+@pytest.mark.parametrize("context_type", [ExecutionContext, SlotExecutionContext])
+@pytest.mark.parametrize("expression", EXPRESSIONS + INVALID_EXPRESSIONS)
+def test_compiled_matches_interpreter(expression, context_type, backend):
+    variables = {"x": 1, "y": 2, "z": 3}
+    assert run(expression, True, context_type(variables, backend)) == run(
+        expression, False, ExecutionContext(variables, backend)
+    )
+
+
+@pytest.mark.parametrize(
+    "backend, expected",
+    [
+        (DecimalBackend(), "0.6666666666666666666666666667"),
+        (DecimalBackend(4, ROUND_DOWN), "0.6666"),
+        (FloatBackend(), "0.6666666666666666"),
+        (FractionBackend(), "2/3"),
+    ],
+    ids=repr,
+)
+def test_division(backend, expected):
+    context = ExecutionContext({}, backend)
+    assert execute_expression("x = 2 / 3", context) == expected
+    assert repr(context) == f"(x={expected})"
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=repr)
+def test_modulo_follows_the_dividend(backend):
+    context = ExecutionContext({"x": -7}, backend)
+    assert execute_expression("x % 2", context) == "-1"
+    assert execute_expression("x %= -2", context) == "-1"
+
+
+@pytest.mark.parametrize("backend", [FloatBackend(), FractionBackend()], ids=repr)
+def test_modulo_by_zero(backend):
+    context = ExecutionContext({"x": 1}, backend)
+    with pytest.raises(ValueError, match="Division by zero"):
+        execute_expression("x % 0", context)
+    with pytest.raises(ValueError, match="Division by zero"):
+        execute_expression("x %= 0", context)
+
+
+def test_variables_are_converted_to_the_backend_type():
+    assert ExecutionContext({"x": Decimal("0.5")}, FractionBackend()).variables == {
+        "x": Fraction(1, 2)
+    }
+    assert SlotExecutionContext({"x": 1}, FloatBackend()).variables == {"x": 1.0}
+    assert ExecutionContext({"x": 1}).variables["x"].__class__ is Decimal
+
+
+def test_precision_does_not_leak_into_other_contexts():
+    rounded = ExecutionContext({}, DecimalBackend(3))
+    assert execute_expression("x = 1 / 3", rounded) == "0.333"
+    assert execute_expression("x = 1 / 3", ExecutionContext({})) == (
+        "0.3333333333333333333333333333"
+    )
+
+
+def test_float_formatting():
+    context = ExecutionContext({}, FloatBackend())
+    assert execute_expression("x = 1.5 * 2", context) == "3"
+    assert execute_expression("y = 0.1 + 0.2", context) == "0.30000000000000004"
+    assert format_context(context) == "(x=3,y=0.30000000000000004)"
+
+
+def test_numeric_backend_by_name():
+    backend = numeric_backend("decimal", precision=10)
+    assert isinstance(backend, DecimalBackend) and backend.context.prec == 10
+    assert isinstance(numeric_backend("fraction"), FractionBackend)
+    with pytest.raises(ValueError, match="Unknown numeric backend: int"):
+        numeric_backend("int")
+
+
+def test_backends_implement_number_and_convert():
+    class Incomplete(NumericBackend):
+        def number(self, text: str):
+            return int(text)
+
+    with pytest.raises(TypeError, match="convert"):
+        Incomplete()
+
+
+def test_default_backend(monkeypatch):
+    assert isinstance(default_backend(), DecimalBackend)
+    monkeypatch.setattr("numeric.NUMERIC_BACKEND", "float")
+    assert isinstance(ExecutionContext({}).backend, FloatBackend)
@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+import calculator
+from calculator import (
+    ExecutionContext,
+    ExpressionExecutor,
+    compile_expression,
+    execute_expression,
+    explain,
+)
+from numeric import DecimalBackend, FloatBackend, FractionBackend
+from models.token import Token, TokenType
+from optimizer import Optimized, Rewrite, optimize_postfix
+
+BACKENDS = [DecimalBackend(), DecimalBackend(5), FloatBackend(), FractionBackend()]
+
+
+def optimized(expression: str, backend=DecimalBackend()) -> str:
+    postfix = compile_expression(expression).postfix
+    return " ".join(token.value for token in optimize_postfix(postfix, backend).postfix)
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("x = y * (60 * 60 * 24)", "y 86400 *"),
+        ("x = 0.5 + 0.25", "0.75"),
+        ("x = 2 * (y + 1) * 1", "2 y 1 + *"),
+        ("x = (y + 1) / 1", "y 1 +"),
+        ("x = 1 * (y - 1)", "y 1 -"),
+        # Variables may have more digits than the precision, x * 1 rounds them
+        ("x = y * 1", "y 1 *"),
+        # 1.0 changes the exponent and + 0 the sign of -0
+        ("x = (y + 1) * 1.0", "y 1 + 1.0 *"),
+        ("x = (y + 1) + 0", "y 1 + 0 +"),
+        # Not reassociated
+        ("x = y * 60 * 60", "y 60 * 60 *"),
+    ],
+)
+def test_decimal(expression, expected):
+    assert optimized(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("x = y * 1 + 0", "y"),
+        ("x = 0 + y - 0", "y"),
+        ("x = y / (3 - 2)", "y"),
+        ("x = 1 / 3", "1/3"),
+        ("x = y % 1", "y 1 %"),
+    ],
+)
+def test_fraction(expression, expected):
+    assert optimized(expression, FractionBackend()) == expected
+
+
+def test_float_keeps_negative_zero():
+    assert optimized("x = y + 0", FloatBackend()) == "y 0 +"
+    assert optimized("x = y - 0", FloatBackend()) == "y"
+
+
+def test_folding_uses_the_backend_precision():
+    assert optimized("x = 2 / 3", DecimalBackend(3)) == "0.667"
+    context = ExecutionContext({}, DecimalBackend(3))
+    assert execute_expression("x = 1 / 3 * 3", context) == "0.999"
+
+
+@pytest.mark.parametrize(
+    "expression, decimal, fraction",
+    [
+        ("x = y++ * (2 - 1)", "y ++post 1 *", "y ++post"),
+        ("x = --y * 1", "--pre y 1 *", "--pre y"),
+    ],
+)
+def test_increments_are_kept(expression, decimal, fraction):
+    assert optimized(expression) == decimal
+    assert optimized(expression, FractionBackend()) == fraction
+
+    context = ExecutionContext({"y": 2}, FractionBackend())
+    execute_expression(expression, context)
+    assert context.variables["y"] != 2
+
+
+@pytest.mark.parametrize("expression", ["x = y++ + 1 / 0", "x = --y + 5 % 0"])
+def test_literal_errors_are_kept(expression):
+    assert optimized(expression) == " ".join(
+        token.value for token in compile_expression(expression).postfix
+    )
+    context = ExecutionContext({"y": 1})
+    with pytest.raises(ArithmeticError if "%" in expression else ValueError):
+        execute_expression(expression, context)
+    assert context.variables == {"y": 1}
+
+
+def test_malformed_postfix_is_unchanged():
+    postfix = compile_expression("x y z +").postfix
+    assert optimize_postfix(postfix) == Optimized(postfix, [])
+
+
+def test_dump():
+    assert explain("x = y * (60 * 60 * 24)") == (
+        "postfix:   x = y 60 60 * 24 * *\n"
+        "optimized: x = y 86400 *\n"
+        "  60 60 * 24 * => 86400"
+    )
+    assert explain("x = y * (2 - 1)", ExecutionContext({}, FractionBackend())) == (
+        "postfix:   x = y 2 1 - *\n"
+        "optimized: x = y\n"
+        "  2 1 - => 1\n"
+        "  y 2 1 - * => y"
+    )
+    assert explain("x = (y + 2 * 3) * 1", ExecutionContext({}, FractionBackend())) == (
+        "postfix:   x = y 2 3 * + 1 *\n"
+        "optimized: x = y 6 +\n"
+        "  2 3 * => 6\n"
+        "  y 2 3 * + 1 * => y 6 +"
+    )
+
+
+def test_rewrites_are_offsets():
+    postfix = compile_expression("y * (2 - 1) + 1 + 2").postfix
+    optimized = optimize_postfix(postfix, FractionBackend())
+    assert optimized.rewrites == [
+        Rewrite(1, 4, Token("1", TokenType.number)),
+        Rewrite(0, 5, None, 0, 1),
+    ]
+
+
+def random_expression(rng: random.Random, depth: int = 0) -> str:
+    terms = ["x", "y", "z", "x++", "--y", "0", "1", "1.0", "2", "0.5", "-3", "7"]
+    if depth < 3 and rng.random() < 0.3:
+        term = f"({random_expression(rng, depth + 1)})"
+    else:
+        term = rng.choice(terms)
+    if depth < 4 and rng.random() < 0.7:
+        operator = rng.choice("+-*/%")
+        return f"{term} {operator} {random_expression(rng, depth + 1)}"
+    return term
+
+
+def run(expression: str, backend, optimize: bool, monkeypatch):
+    if not optimize:
+        monkeypatch.setattr(
+            calculator, "optimize_postfix", lambda postfix, *_: Optimized(postfix, [])
+        )
+    context = ExecutionContext({"x": 1, "y": 2, "z": -3}, backend)
+    try:
+        compiled = compile_expression(expression)
+        result = ExpressionExecutor(context).execute_compiled(compiled)
+    except (ValueError, ArithmeticError) as e:
+        result = type(e).__name__ + str(e)
+    finally:
+        monkeypatch.undo()
+    return result, context.variables
+
+
+@pytest.mark.parametrize("backend", BACKENDS, ids=repr)
+def test_optimized_programs_match_unoptimized(backend, monkeypatch):
+    rng = random.Random(10)
+    for _ in range(300):
+        expression = "r = " + random_expression(rng)
+        assert run(expression, backend, True, monkeypatch) == run(
+            expression, backend, False, monkeypatch
+        ), expression
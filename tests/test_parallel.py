@@ -0,0 +1,118 @@
+import io
+import random
+from decimal import Decimal
+
+import pytest
+
+from batch import read_statements, run_script, run_statements
+from calculator import ExecutionContext, SlotExecutionContext
+from completion import NameIndex
+from parallel import Access, branches, run_statements_parallel, statement_access
+
+
+@pytest.fixture(autouse=True)
+def small_groups(monkeypatch):
+    # Run even short scripts on the pool
+    monkeypatch.setattr("parallel.MIN_PARALLEL_STATEMENTS", 1)
+
+
+@pytest.mark.parametrize(
+    "statement, reads, writes",
+    [
+        ("x = y + z", {"x", "y", "z"}, {"x"}),
+        ("x += 1", {"x"}, {"x"}),
+        ("a = b++ * --c", {"a", "b", "c"}, {"a", "b", "c"}),
+        ("y-- + 1", {"y"}, {"y"}),
+        ("x + 1", {"x"}, set()),
+        ("x = $", set(), set()),
+    ],
+)
+def test_statement_access(statement, reads, writes):
+    assert statement_access(statement) == Access(frozenset(reads), frozenset(writes))
+
+
+def test_branches_share_only_read_only_variables():
+    statements = ["a = rate", "b = rate", "a++", "c = a", "b = 1", "d = 2"]
+    groups = branches([statement_access(statement) for statement in statements])
+    assert sorted(groups) == [[0, 2, 3], [1, 4], [5]]
+
+
+def random_script(seed: int, size: int = 600) -> list[str]:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(size):
+        chain = rng.randrange(40)
+        a, b = (f"c{chain}_{rng.randrange(3)}" for _ in range(2))
+        lines.append(
+            rng.choice(
+                [
+                    f"{a} = {b} + 1",
+                    f"{a} = {b}++ * rate",
+                    f"{a} += --{b}",
+                    f"{a} = {i}",
+                    f"{a} = {b} / 0",
+                    f"{a} %= 7",
+                ]
+            )
+        )
+    return lines
+
+
+def run(runner, lines, context_type=ExecutionContext, **options):
+    context = context_type({"rate": Decimal("1.5"), "c1_0": Decimal(4)})
+    results = list(runner(read_statements(lines), context, **options))
+    return results, list(context.variables.items())
+
+
+@pytest.mark.parametrize("context_type", [ExecutionContext, SlotExecutionContext])
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_serial_execution(seed, context_type):
+    lines = random_script(seed)
+    assert run(run_statements_parallel, lines, context_type, jobs=4, pool="thread") == (
+        run(run_statements, lines, context_type)
+    )
+
+
+def test_process_pool():
+    lines = random_script(10, 300)
+    assert run(run_statements_parallel, lines, jobs=2) == run(run_statements, lines)
+
+
+def test_commands_and_formulas_are_barriers():
+    lines = ["a = 1", "b = 2", "show", "total := a + b", "a = 5", "clear", "c = 3"]
+    lines += ["d = c", "exit", "e = 1"]
+    assert run(run_statements_parallel, lines, jobs=2, pool="thread") == run(
+        run_statements, lines
+    )
+
+
+def test_transaction_blocks_run_serially():
+    lines = ["a = 1", "b = 2", "begin", "a = 5", "b = a / 0", "c = 3", "commit"]
+    lines += ["begin", "c = a + b", "d = c", "commit", "e = 1", "begin", "e = 2"]
+    assert run(run_statements_parallel, lines, jobs=2, pool="thread") == run(
+        run_statements, lines
+    )
+
+
+def test_new_variables_are_indexed():
+    context = ExecutionContext({"a": 1})
+    context.bind_name_index(NameIndex())
+    lines = ["b = a + 1", "c = 2", "d = b"]
+    list(run_statements_parallel(read_statements(lines), context, 2, "thread"))
+
+    assert context.name_index.matches("") == ["a", "b", "c", "d"]
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError, match="Unknown pool: fiber"):
+        list(run_statements_parallel([], ExecutionContext({}), pool="fiber"))
+
+
+def test_run_script_with_jobs():
+    script = "\n".join(random_script(4, 200)) + "\n"
+    serial, parallel, errors = io.StringIO(), io.StringIO(), io.StringIO()
+
+    assert run_script(io.StringIO(script), serial, errors) == run_script(
+        io.StringIO(script), parallel, errors, jobs=2
+    )
+    assert parallel.getvalue() == serial.getvalue()
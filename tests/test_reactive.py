@@ -0,0 +1,154 @@
+from decimal import Decimal
+
+import pytest
+
+from calculator import (
+    ExecutionContext,
+    SlotExecutionContext,
+    define_formula,
+    execute_expression,
+)
+from reactive import FormulaStats
+
+
+@pytest.fixture(params=[ExecutionContext, SlotExecutionContext])
+def context(request):
+    context = request.param({"price": Decimal(2), "qty": Decimal(3)})
+    execute_expression("total := price * qty", context)
+    execute_expression("tax := total / 10", context)
+    execute_expression("gross := total + tax", context)
+    execute_expression("unrelated := qty + 1", context)
+    return context
+
+
+def test_formula_is_evaluated_when_defined(context):
+    assert context.variables["gross"] == Decimal("6.6")
+    assert context.formulas.info() == FormulaStats(4, 0, 0, 0)
+
+
+def test_dependents_are_recomputed(context):
+    assert execute_expression("price = 10", context) == "10"
+
+    assert repr(context) == "(price=10, qty=3, total=30, tax=3, gross=33, unrelated=4)"
+    # unrelated does not read price
+    assert context.formulas.info() == FormulaStats(4, 1, 3, 3)
+
+
+def test_every_write_of_a_statement_is_propagated(context):
+    execute_expression("x = price++ * qty--", context)
+
+    assert repr(context) == (
+        "(price=3, qty=2, total=6, tax=0.6, gross=6.6, unrelated=3, x=6)"
+    )
+    assert context.formulas.info().last_recomputed == 4
+
+
+def test_statement_without_dependents(context):
+    execute_expression("y = 1", context)
+    assert context.formulas.info() == FormulaStats(4, 0, 0, 0)
+
+
+def test_topological_order(context):
+    # gross reads total and tax, it must see both new values
+    order = context.formulas.dependents(["price"])
+    assert order.index("total") < order.index("tax") < order.index("gross")
+
+
+def test_assigning_a_formula_variable_detaches_it(context):
+    execute_expression("total = 100", context)
+    execute_expression("price = 5", context)
+
+    assert context.variables["total"] == 100
+    assert context.variables["gross"] == 110
+    assert "total" not in context.formulas
+
+
+def test_redefining_a_formula(context):
+    execute_expression("total := price + qty", context)
+    assert context.variables["gross"] == Decimal("5.5")
+    execute_expression("qty = 5", context)
+    assert context.variables["gross"] == Decimal("7.7")
+
+
+def test_failed_recompute_rolls_back_the_statement(context):
+    execute_expression("ratio := 1 / qty", context)
+    with pytest.raises(ValueError, match="Division by zero"):
+        execute_expression("qty = 0", context)
+
+    assert context.variables["qty"] == 3
+    assert context.variables["total"] == 6
+    # the statement did not detach anything
+    execute_expression("qty = 4", context)
+    assert context.variables["ratio"] == Decimal("0.25")
+
+
+def test_failed_recompute_keeps_detached_formula(context):
+    execute_expression("ratio := 1 / (total - 7)", context)
+    with pytest.raises(ValueError, match="Division by zero"):
+        execute_expression("total = 7", context)
+
+    assert "total" in context.formulas
+    execute_expression("price = 4", context)
+    assert context.variables["total"] == 12
+
+
+@pytest.mark.parametrize(
+    "statement, message",
+    [
+        ("price := total + 1", "Circular formula: price -> total -> price"),
+        ("qty := gross * 2", "Circular formula: qty -> gross -> total -> qty"),
+        ("price := price + 1", "Circular formula: price -> price"),
+    ],
+)
+def test_cycles_are_rejected(context, statement, message):
+    before = dict(context.variables)
+    with pytest.raises(ValueError, match=message):
+        execute_expression(statement, context)
+    assert dict(context.variables) == before
+
+
+@pytest.mark.parametrize(
+    "statement, message",
+    [
+        ("total += 1", "A formula must assign a variable"),
+        ("price * 2", "A formula must assign a variable"),
+        ("x = price++", "A formula cannot use"),
+    ],
+)
+def test_invalid_formulas(context, statement, message):
+    with pytest.raises(ValueError, match=message):
+        define_formula(statement, context)
+
+
+def test_clear_removes_formulas(context):
+    context.clear()
+    execute_expression("price = 1", context)
+    assert repr(context) == "(price=1)"
+    assert context.formulas is None
+
+
+def test_transaction_propagates_every_statement(context):
+    with context.transaction():
+        execute_expression("price = 10", context)
+        execute_expression("qty = 5", context)
+        assert context.variables["gross"] == Decimal(55)
+
+    assert repr(context) == "(price=10, qty=5, total=50, tax=5, gross=55, unrelated=6)"
+    assert len(context.formulas) == 4
+
+
+def test_abort_restores_detached_formulas(context):
+    context.begin()
+    execute_expression("total = 1", context)
+    assert "total" not in context.formulas
+    context.abort()
+
+    assert "total" in context.formulas
+    execute_expression("qty = 5", context)
+    assert context.variables["total"] == Decimal(10)
+
+
+def test_formulas_are_not_defined_in_a_transaction(context):
+    context.begin()
+    with pytest.raises(ValueError, match="cannot be defined in a transaction"):
+        define_formula("net = total - tax", context)
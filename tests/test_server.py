@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from calculator import SlotExecutionContext
+from server import MAX_LINE_LENGTH, CalculatorServer
+
+
+async def exchange(server: CalculatorServer, data: bytes, path: str) -> list[str]:
+    """Send everything at once and read replies until the server closes."""
+    listener = await server.start(path=path)
+    async with listener:
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(data)
+        await writer.drain()
+        writer.write_eof()
+        replies = (await reader.read()).decode().splitlines()
+        writer.close()
+        await writer.wait_closed()
+    return replies
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "calculator.sock")
+
+
+def test_pipelined_session(path):
+    script = b"i = 0\nj = ++i\n\nx = i++ + 5\ny = 5 + 3 * 10\nz = 1 / 0\nshow\n"
+    script += b"clear\nshow\nhelp\nexit\nx = 1\n"
+    replies = asyncio.run(exchange(CalculatorServer(), script, path))
+
+    assert replies == [
+        "0",
+        "1",
+        "6",
+        "35",
+        "Error: Division by zero",
+        "(i=2,j=1,x=6,y=35)",
+        "OK",
+        "()",
+        "Commands: show, clear, begin, commit, abort, exit, help, <expression>",
+        "Goodbye!",
+    ]
+
+
+def test_transaction_block(path):
+    script = b"x = 1\nbegin\nx = 2\ny = 1 / 0\ncommit\nshow\nabort\n"
+    replies = asyncio.run(exchange(CalculatorServer(), script, path))
+
+    assert replies == [
+        "1",
+        "OK",
+        "2",
+        "Error: Division by zero",
+        "Error: Transaction rolled back: Division by zero",
+        "(x=1)",
+        "Error: No transaction in progress",
+    ]
+
+
+def test_show_options(path):
+    script = b"a1 = 1\nb = 2\na2 = 3\nshow a* sort=-value\nshow count\nshow page=2\n"
+    replies = asyncio.run(exchange(CalculatorServer(), script, path))
+
+    assert replies == ["1", "2", "3", "(a2=3,a1=1)", "3", "Error: page requires limit"]
+
+
+def test_lines_split_across_reads(path):
+    async def run():
+        server = CalculatorServer()
+        async with await server.start(path=path):
+            reader, writer = await asyncio.open_unix_connection(path)
+            for chunk in (b"x = 1", b"2\nx", b" + 1\n"):
+                writer.write(chunk)
+                await writer.drain()
+                await asyncio.sleep(0.01)
+            replies = [await reader.readline(), await reader.readline()]
+            writer.close()
+            await writer.wait_closed()
+        return replies
+
+    assert asyncio.run(run()) == [b"12\n", b"13\n"]
+
+
+def test_sessions_are_isolated(path):
+    async def run():
+        server = CalculatorServer(lambda: SlotExecutionContext({}))
+        async with await server.start(path=path):
+            connections = [await asyncio.open_unix_connection(path) for _ in range(50)]
+            for number, (_, writer) in enumerate(connections):
+                writer.write(f"x = {number}\n".encode())
+            await asyncio.gather(*(reader.readline() for reader, _ in connections))
+            assert server.sessions == 50
+
+            for _, writer in connections:
+                writer.write(b"x++\nshow\n")
+            replies = [
+                (await reader.readline(), await reader.readline())
+                for reader, _ in connections
+            ]
+            for reader, writer in connections:
+                writer.write_eof()
+                await reader.read()
+                writer.close()
+        return replies
+
+    replies = asyncio.run(run())
+    assert replies == [
+        (f"{number}\n".encode(), f"(x={number + 1})\n".encode()) for number in range(50)
+    ]
+
+
+def test_line_too_long(path):
+    replies = asyncio.run(
+        exchange(CalculatorServer(), b"x = 1\n" + b"1" * (MAX_LINE_LENGTH + 1), path)
+    )
+    assert replies == ["1", "Error: Line too long"]
+
+
+def test_tcp():
+    async def run():
+        server = CalculatorServer()
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"2 * 21\nexit\n")
+            replies = await reader.read()
+            writer.close()
+        return replies
+
+    assert asyncio.run(run()) == b"42\nGoodbye!\n"
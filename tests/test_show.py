@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+import pytest
+
+from calculator import ExecutionContext, SlotExecutionContext
+from show import ShowQuery, format_variables, is_show, parse_show, select, show
+
+
+@pytest.fixture(params=[ExecutionContext, SlotExecutionContext])
+def context(request):
+    values = {"tax": 3, "total": 30, "qty": 3, "t1": -1, "price": 10}
+    return request.param({name: Decimal(value) for name, value in values.items()})
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("show", True),
+        ("show t*", True),
+        ("show count", True),
+        ("show = 1", False),
+        ("show += 1", False),
+        ("show * 2", False),
+        ("shows", False),
+        ("x = show", False),
+    ],
+)
+def test_is_show(line, expected):
+    assert is_show(line) == expected
+
+
+def test_parse_show():
+    assert parse_show("show") == ShowQuery()
+    assert parse_show("show t?x sort=-value limit=10 page=3 count") == ShowQuery(
+        "t?x", True, "-value", 10, 3
+    )
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("show sort=size", "Invalid show option: sort=size"),
+        ("show limit=0", "Invalid show option: limit=0"),
+        ("show a b", "Invalid show option: b"),
+        ("show a.b", "Invalid show option: a.b"),
+        ("show page=2", "page requires limit"),
+    ],
+)
+def test_invalid_show(line, message):
+    with pytest.raises(ValueError, match=message):
+        parse_show(line)
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("show", ["tax", "total", "qty", "t1", "price"]),
+        ("show t", ["tax", "total", "t1"]),
+        ("show t?", ["t1"]),
+        ("show *a*", ["tax", "total"]),
+        ("show [pq]*", ["qty", "price"]),
+        ("show sort=name", ["price", "qty", "t1", "tax", "total"]),
+        ("show t sort=-name", ["total", "tax", "t1"]),
+        ("show limit=2", ["tax", "total"]),
+        ("show limit=2 page=3", ["price"]),
+        ("show limit=2 page=4", []),
+        ("show sort=value limit=2", ["t1", "tax"]),
+        ("show sort=-value limit=2 page=2", ["tax", "qty"]),
+    ],
+)
+def test_select(context, line, expected):
+    selected = select(context.variables.items(), parse_show(line))
+    assert [name for name, _ in selected] == expected
+
+
+def test_show(context):
+    assert "".join(show(context)) == "(tax=3,total=30,qty=3,t1=-1,price=10)"
+    assert "".join(show(context, parse_show("show t*"), ", ")) == (
+        "(tax=3, total=30, t1=-1)"
+    )
+    assert list(show(context, parse_show("show t count"))) == ["3"]
+    assert list(show(context, parse_show("show x"))) == ["()"]
+
+
+def test_output_is_chunked():
+    variables = [(f"v{n}", n) for n in range(5)]
+    chunks = list(format_variables(variables, str, ",", size=2))
+
+    assert chunks == ["(v0=0,v1=1", ",v2=2,v3=3", ",v4=4", ")"]
+    assert list(format_variables(iter(variables[:2]), str, size=2)) == [
+        "(v0=0,v1=1",
+        ")",
+    ]
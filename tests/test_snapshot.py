@@ -0,0 +1,126 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from calculator import ExecutionContext, SlotExecutionContext, execute_expression
+from numeric import DecimalBackend, FloatBackend, FractionBackend
+from snapshot import Snapshot, SnapshotVariables, decode_value, encode_value
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        Decimal(0),
+        Decimal("-0"),
+        Decimal("0.000"),
+        Decimal("1E+5"),
+        Decimal("-123.456"),
+        Decimal("3.14159265358979323846264338327950288"),
+        Decimal("nan"),
+        Decimal("-Infinity"),
+        1.5,
+        float("-inf"),
+        Fraction(-2, 3),
+    ],
+)
+def test_value_round_trip(value):
+    decoded = decode_value(encode_value(value))
+    assert type(decoded) is type(value)
+    assert str(decoded) == str(value)
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "session.snap"
+    context = ExecutionContext({})
+    for statement in ["i = 0", "j = ++i", "x = i++ + 5", "y = 5 + 3 * 10", "z = 1/3"]:
+        execute_expression(statement, context)
+    context.save(path)
+
+    loaded = ExecutionContext.load(path)
+    assert isinstance(loaded.variables, SnapshotVariables)
+    assert repr(loaded) == repr(context)
+    assert dict(loaded.variables) == dict(context.variables)
+
+
+def test_values_are_read_lazily(tmp_path):
+    path = tmp_path / "session.snap"
+    ExecutionContext({f"v{n}": Decimal(n) for n in range(1000)}).save(path)
+
+    loaded = ExecutionContext.load(path)
+    assert execute_expression("v7 * 2", loaded) == "14"
+    assert loaded.variables._values == {"v7": Decimal(7)}
+    assert "v999" in loaded.variables and "v1000" not in loaded.variables
+    assert len(loaded.variables) == 1000
+    # Iterating decodes values without keeping them
+    assert sum(value for _, value in loaded.variables.items()) == 499500
+    assert len(loaded.variables._values) == 1
+
+
+def test_loaded_context_is_writable(tmp_path):
+    path = tmp_path / "session.snap"
+    ExecutionContext({"a": Decimal(1), "b": Decimal(2), "c": Decimal(3)}).save(path)
+    loaded = ExecutionContext.load(path)
+    expected = ExecutionContext({"a": Decimal(1), "b": Decimal(2), "c": Decimal(3)})
+
+    for context in (loaded, expected):
+        execute_expression("b += 10", context)
+        execute_expression("d = a + b", context)
+        del context.variables["a"]
+        execute_expression("a = 5", context)
+        with pytest.raises(ValueError):
+            execute_expression("e = c / 0", context)
+    assert repr(loaded) == repr(expected) == "(b=12, c=3, d=13, a=5)"
+
+    loaded.save(path)
+    assert repr(ExecutionContext.load(path)) == repr(expected)
+
+    loaded.clear()
+    assert repr(loaded) == "()" and "b" not in loaded.variables
+
+
+def test_rollback_of_created_variable(tmp_path):
+    path = tmp_path / "session.snap"
+    ExecutionContext({"x": Decimal(1)}).save(path)
+    loaded = ExecutionContext.load(path)
+
+    with pytest.raises(ValueError, match="Division by zero"):
+        execute_expression("y = x++ / 0", loaded)
+    assert repr(loaded) == "(x=1)"
+
+
+@pytest.mark.parametrize(
+    "backend", [DecimalBackend(precision=5), FloatBackend(), FractionBackend()]
+)
+def test_backend_is_restored(tmp_path, backend):
+    path = tmp_path / "session.snap"
+    context = ExecutionContext({"x": 1, "y": 3}, backend)
+    execute_expression("z = x / y", context)
+    context.save(path)
+
+    loaded = ExecutionContext.load(path)
+    assert repr(loaded.backend) == repr(backend)
+    assert repr(loaded) == repr(context)
+
+
+def test_slot_context_loads_eagerly(tmp_path):
+    path = tmp_path / "session.snap"
+    ExecutionContext({"x": Decimal(2), "y": Decimal(3)}).save(path)
+
+    loaded = SlotExecutionContext.load(path)
+    assert execute_expression("x * y", loaded) == "6"
+    assert repr(loaded) == "(x=2, y=3)"
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / "session.snap"
+    ExecutionContext({}).save(path)
+    snapshot = Snapshot(path)
+    assert snapshot.count == 0 and snapshot.position("x") is None
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / "session.snap"
+    path.write_bytes(b"x = 1\n" * 10)
+    with pytest.raises(ValueError, match="Not a calculator snapshot"):
+        ExecutionContext.load(path)
@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from benchmarks.bench_startup import (
+    HEAVY_MODULES,
+    IMPORT_BUDGET_MS,
+    import_time_ms,
+    imported_modules,
+)
+
+
+@pytest.mark.parametrize("module", ["ui", "batch", "server", "wal"])
+def test_one_shot_path_avoids_heavy_imports(module):
+    assert imported_modules(module).isdisjoint(HEAVY_MODULES)
+
+
+# Wall-clock budgets fail on loaded machines, so they are checked on request
+@pytest.mark.skipif(
+    not os.environ.get("CALCULATOR_TIMING_TESTS"),
+    reason="set CALCULATOR_TIMING_TESTS=1 to check the import time budget",
+)
+def test_ui_import_time_is_within_budget():
+    # Best of three, the budget is about the imports and not scheduling noise
+    assert min(import_time_ms("ui") for _ in range(3)) < IMPORT_BUDGET_MS
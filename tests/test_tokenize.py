@@ -1,7 +1,9 @@
-import pytest
+import random
 
-from tokenizer import tokenize
+import pytest
 
+from models.token import Token, TokenType
+from tokenizer import TOKENIZER_BACKENDS, iter_tokens, tokenize
 
 TOKENIZE_FIXTURES = [
     # Simple arithmetic
@@ -63,9 +65,10 @@ TOKENIZE_FIXTURES = [
 ]
 
 
+@pytest.mark.parametrize("backend", TOKENIZER_BACKENDS)
 @pytest.mark.parametrize("expression, expected", TOKENIZE_FIXTURES)
-def test_tokenize(expression, expected):
-    result = tokenize(expression)
+def test_tokenize(expression, expected, backend):
+    result = tokenize(expression, backend=backend)
     result = [token.value for token in result]
     assert result == expected
 
@@ -78,9 +81,91 @@ TOO_MANY_OPERATORS_FIXTURES = [
 ]  # tokenizing doesn't validate everything, only the structure of the expression
 
 
+@pytest.mark.parametrize("backend", TOKENIZER_BACKENDS)
 @pytest.mark.parametrize(
     "expression", INVALID_EQUALITY_FIXTURES + TOO_MANY_OPERATORS_FIXTURES
 )
-def test_invalid_tokenize(expression):
+def test_invalid_tokenize(expression, backend):
     with pytest.raises(ValueError):
+        tokenize(expression, backend=backend)
+
+
+def test_operator_and_parenthesis_tokens_are_shared():
+    first, second = tokenize("(x + y) + (z++)"), tokenize("(a + 1)")
+    assert first[0] is second[0]
+    assert first[2] is first[5] is second[2]
+    assert first[-2] is Token.operator("++post")
+
+
+@pytest.mark.parametrize(
+    "expression, error",
+    [("x = 5.", "Invalid number: 5."), ("x = é", "Invalid variable name: é")],
+)
+def test_tokenize_validates_numbers_and_names(expression, error):
+    with pytest.raises(ValueError, match=error):
         tokenize(expression)
+
+
+@pytest.mark.parametrize(
+    "value, token_type",
+    [
+        ("1.2.3", TokenType.number),
+        ("x$", TokenType.variable),
+        ("**", TokenType.operator),
+    ],
+)
+def test_strict_token_validation(value, token_type):
+    token = Token(value=value, token_type=token_type)
+    with pytest.raises(ValueError):
+        token.validate()
+    with pytest.raises(ValueError):
+        Token.validated(value, token_type)
+
+
+def test_strict_tokenize():
+    assert tokenize("x = y++ + 1.5", strict=True) == tokenize("x = y++ + 1.5")
+
+
+def test_backends_produce_the_same_tokens_and_errors():
+    def run(expression, backend):
+        try:
+            return tokenize(expression, backend=backend)
+        except ValueError as e:
+            return str(e)
+
+    rnd = random.Random(0)
+    alphabet = list("xy1.2+-*/%=() _é") + ["\t", "++", "--", "ab", "-.", "5.", "+="]
+    for _ in range(5000):
+        expression = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 12)))
+        assert run(expression, "regex") == run(expression, "legacy")
+
+
+@pytest.mark.parametrize("backend", TOKENIZER_BACKENDS)
+def test_iter_tokens_matches_tokenize(backend):
+    def run(tokenizer, expression):
+        try:
+            return list(tokenizer(expression, backend=backend))
+        except ValueError as e:
+            return str(e)
+
+    rnd = random.Random(1)
+    alphabet = list("xy1.2+-*/%=() _é") + ["\t", "++", "--", "ab", "-.", "5.", "+="]
+    for _ in range(2000):
+        expression = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 12)))
+        assert run(iter_tokens, expression) == run(tokenize, expression)
+
+
+def test_iter_tokens_is_lazy():
+    tokens = iter_tokens("1 + 2 $")
+    assert [next(tokens).value, next(tokens).value, next(tokens).value] == [
+        "1",
+        "+",
+        "2",
+    ]
+    with pytest.raises(ValueError, match=r"Unexpected character: \$"):
+        next(tokens)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown tokenizer backend: fast"):
+        tokenize("x", backend="fast")
@@ -0,0 +1,101 @@
+from decimal import Decimal
+
+import pytest
+
+from calculator import ExecutionContext, execute_expression
+from tests.test_compiler import EXPRESSIONS, INVALID_EXPRESSIONS
+from vectorized import evaluate_many
+
+COLUMNS = {
+    "x": [Decimal(value) for value in (1, -2, 3, 0, 2, 5)],
+    "y": [Decimal(value) for value in (2, 0, -1, 3, 2, 0)],
+    "z": [Decimal(value) for value in (3, 1, 0, -3, 0, 2)],
+}
+
+
+def run_row(expression: str, row: int):
+    context = ExecutionContext({name: column[row] for name, column in COLUMNS.items()})
+    try:
+        return Decimal(execute_expression(expression, context)), None, context.variables
+    except Exception as e:
+        return None, str(e), context.variables
+
+
+@pytest.mark.parametrize(
+    "expression",
+    EXPRESSIONS + INVALID_EXPRESSIONS + ["x = y / z", "x %= z", "w = x / (y - z)"],
+)
+def test_matches_execute_expression_row_by_row(expression):
+    result = evaluate_many(expression, COLUMNS)
+
+    for row in range(len(COLUMNS["x"])):
+        value, error, variables = run_row(expression, row)
+        assert result.values[row] == value
+        assert result.errors.get(row) == error
+        assert {
+            name: column[row]
+            for name, column in result.columns.items()
+            if column[row] is not None
+        } == variables
+
+
+def test_errors_are_per_row():
+    result = evaluate_many("w = x / y", {"x": [1, 2, 3], "y": [1, 0, 2]})
+
+    assert result.values == [1, None, Decimal("1.5")]
+    assert result.errors == {1: "Division by zero"}
+    assert result.columns["w"] == [1, None, Decimal("1.5")]
+
+
+def test_failed_rows_are_rolled_back():
+    result = evaluate_many("x = y++ / z", {"y": [1, 2], "z": [0, 1]})
+
+    assert result.errors == {0: "Division by zero"}
+    assert result.columns == {"y": [1, 3], "z": [0, 1], "x": [None, 2]}
+
+
+def test_input_columns_are_not_modified():
+    x = [Decimal(1), Decimal(2)]
+    result = evaluate_many("x++", {"x": x})
+
+    assert result.columns["x"] == [2, 3]
+    assert x == [1, 2]
+
+
+def test_constant_expression():
+    assert evaluate_many("x = 1 + 2", {}, rows=3).columns == {"x": [3, 3, 3]}
+    assert evaluate_many("1 / 0", {}, rows=2).errors == {
+        0: "Division by zero",
+        1: "Division by zero",
+    }
+
+
+def test_columns_must_have_the_same_length():
+    with pytest.raises(ValueError, match="Columns must have the same length"):
+        evaluate_many("x + y", {"x": [1, 2], "y": [1]})
+
+
+def test_float_backend():
+    np = pytest.importorskip("numpy")
+    result = evaluate_many(
+        "w = x % y - 0.5", {"x": np.array([7, -7, 1]), "y": [2, 2, 0]}, exact=False
+    )
+
+    assert result.values[:2].tolist() == [0.5, -1.5]
+    assert np.isnan(result.values[2])
+    assert result.errors == {2: "Division by zero"}
+    assert np.isnan(result.columns["w"][2])
+
+
+def test_float_backend_matches_exact_backend():
+    np = pytest.importorskip("numpy")
+    for expression in EXPRESSIONS + INVALID_EXPRESSIONS:
+        exact = evaluate_many(expression, COLUMNS)
+        fast = evaluate_many(expression, COLUMNS, exact=False)
+
+        assert fast.errors == exact.errors
+        assert np.allclose(
+            fast.values,
+            [float("nan") if value is None else float(value) for value in exact.values],
+            equal_nan=True,
+        )
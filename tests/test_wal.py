@@ -0,0 +1,186 @@
+import os
+import time
+
+import pytest
+
+from calculator import execute_expression
+from numeric import FractionBackend
+from ui import main
+from wal import WriteAheadLog
+
+STATEMENTS = ["i = 0", "j = ++i", "x = i++ + 5", "y = 5 + 3 * 10", "z = y / 0"]
+
+
+def run(context, statements):
+    for statement in statements:
+        if statement == "clear":
+            context.clear()
+            continue
+        try:
+            execute_expression(statement, context)
+        except ValueError:
+            pass
+
+
+def recovered(path, **options) -> str:
+    with WriteAheadLog(path, **options) as wal:
+        return repr(wal.recover())
+
+
+@pytest.mark.parametrize("durability", ["commit", "interval", "off"])
+def test_recover_committed_statements(tmp_path, durability):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path, durability) as wal:
+        context = wal.recover()
+        run(context, STATEMENTS)
+        assert wal.records == 4
+
+    assert recovered(path) == repr(context) == "(i=2, j=1, x=6, y=35)"
+
+
+def test_transaction_is_one_record(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        with context.transaction():
+            run(context, STATEMENTS[:4])
+        context.begin()
+        run(context, ["i = 100"])
+        context.abort()
+        assert wal.records == 1
+
+    assert recovered(path) == "(i=2, j=1, x=6, y=35)"
+
+
+def test_recovery_continues_the_log(tmp_path):
+    path = tmp_path / "session.wal"
+    for statements in (STATEMENTS, ["i += 10", "clear", "k = 1", "k++"]):
+        with WriteAheadLog(path) as wal:
+            run(wal.recover(), statements)
+
+    assert recovered(path) == "(k=2)"
+
+
+def test_checkpoint_truncates_the_log(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path, checkpoint_records=3) as wal:
+        context = wal.recover()
+        run(context, STATEMENTS)
+        # The fourth commit triggered no checkpoint yet
+        assert wal.records == 1
+    assert os.path.getsize(path) < 32
+
+    assert recovered(path) == repr(context)
+
+
+def test_replaying_a_checkpointed_log(tmp_path):
+    # A crash after the checkpoint is written but before the log is emptied
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        run(context, STATEMENTS + ["clear", "a = 1", "i = 7"])
+        log = path.read_bytes()
+        wal.checkpoint(context)
+    path.write_bytes(log)
+
+    assert recovered(path) == repr(context) == "(a=1, i=7)"
+
+
+@pytest.mark.parametrize("checkpoint_records", [1000, 2])
+def test_recover_formulas(tmp_path, checkpoint_records):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path, checkpoint_records=checkpoint_records) as wal:
+        run(
+            wal.recover(),
+            [
+                "price = 2",
+                "qty = 3",
+                "total := price * qty",
+                "tax := total / 2",
+                "price = 4",
+                "tax = 1",
+            ],
+        )
+
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        assert repr(context) == "(price=4, qty=3, total=12, tax=1)"
+        # tax was detached from its formula by the direct write
+        run(context, ["qty = 5"])
+        assert repr(context) == "(price=4, qty=5, total=20, tax=1)"
+
+
+def test_formula_is_logged_with_its_value(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        run(context, ["price = 2", "total := price * 3", "bad := price / 0"])
+        assert wal.records == 2
+        run(context, ["other = 1"])
+
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        # The failed definition was not logged with the next commit
+        run(context, ["price = 5"])
+        assert repr(context) == "(price=5, total=15, other=1)"
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        run(wal.recover(), STATEMENTS)
+    size = os.path.getsize(path)
+    with open(path, "ab") as file:
+        file.write(b"\x20\x00\x00\x00garbage")
+
+    assert recovered(path) == "(i=2, j=1, x=6, y=35)"
+    assert os.path.getsize(path) == size
+
+
+def test_corrupt_record_ends_the_log(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        run(wal.recover(), ["a = 1", "b = 2"])
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(data)
+
+    assert recovered(path) == "(a=1)"
+
+
+def test_interval_syncs_without_close(tmp_path):
+    path = tmp_path / "session.wal"
+    wal = WriteAheadLog(path, "interval", interval_ms=5)
+    run(wal.recover(), ["a = 1"])
+    deadline = time.monotonic() + 5
+    while os.path.getsize(path) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert os.path.getsize(path) > 0
+    wal.close()
+
+
+def test_backend_is_kept(tmp_path):
+    path = tmp_path / "session.wal"
+    with WriteAheadLog(path) as wal:
+        run(wal.recover(FractionBackend()), ["x = 1 / 3"])
+
+    with WriteAheadLog(path) as wal:
+        context = wal.recover()
+        assert context.backend.name == "fraction"
+        assert execute_expression("x * 3", context) == "1"
+
+
+def test_unknown_durability(tmp_path):
+    with pytest.raises(ValueError, match="Unknown durability: always"):
+        WriteAheadLog(tmp_path / "session.wal", "always")
+
+
+def test_main_recovers_from_the_log(tmp_path, capsys):
+    path = str(tmp_path / "session.wal")
+    for lines in ("x = 2\ny = x * 3\n", "x += y\n"):
+        script = tmp_path / "script.calc"
+        script.write_text(lines)
+        with pytest.raises(SystemExit):
+            main(["--script", str(script), "--wal", path, "--durability", "off"])
+
+    assert capsys.readouterr().out == "(x=2,y=6)\n(x=8,y=6)\n"
@@ -1,7 +1,33 @@
-from typing import Literal
+import re
+from itertools import islice
+from typing import Callable, Iterator, Literal
 
 from consts import TOO_MANY_OPERATORS_ERROR, VARIABLE_VALID_CHARS
-from models.token import Token, TokenType
+from models.token import (
+    NUMBER_REGEX,
+    OPERATOR_TOKENS,
+    PARENTHESIS_TOKENS,
+    Token,
+    TokenType,
+)
+from settings import STRICT_TOKENS, TOKENIZER_BACKEND
+
+# One alternative per token kind, each preceded by optional whitespace. They
+# are tried in the order tokenize_legacy checks them, and lookaheads reject
+# input the legacy scanner treats differently (e.g. "1.2.3", "+++", "-.5"),
+# which then falls back to it.
+WHITESPACE_CHARS = "[ \t\n\r\x0b\x0c\x1c-\x1f]"
+SCANNER_PATTERN = re.compile(
+    WHITESPACE_CHARS + r"""*(?:
+    (?P<number>-?[0-9]+(?:\.[0-9]+)?)(?![.0-9])
+    | (?P<variable>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<parenthesis>[()])
+    | (?P<assignment>[-+*/%]?=)
+    | (?P<unary>\+\+(?!\+)|--(?!-))
+    | (?P<operator>\+(?!\+)|-(?![-.0-9])|[*/%])
+    )""",
+    re.VERBOSE,
+)
 
 
 def is_number(expression: str, i: int, char: str) -> bool:
@@ -14,9 +40,51 @@ def is_number(expression: str, i: int, char: str) -> bool:
     )
 
 
-def tokenize(expression: str) -> list[Token]:
-    """Tokenize the expression into numbers, variables, operators, and parentheses."""
-    tokens: list[Token] = []
+def tokenize(
+    expression: str, strict: bool = STRICT_TOKENS, backend: str = TOKENIZER_BACKEND
+) -> list[Token]:
+    """Tokenize the expression into numbers, variables, operators, and parentheses.
+
+    ``backend`` selects the scanner, see TOKENIZER_BACKENDS. Tokens are built
+    without per-token validation beyond the checks the scanner needs;
+    ``strict`` additionally runs Token.validate on each one.
+    """
+    if backend not in TOKENIZER_BACKENDS:
+        raise ValueError(f"Unknown tokenizer backend: {backend}")
+    tokens = TOKENIZER_BACKENDS[backend](expression)
+    if strict:
+        for token in tokens:
+            token.validate()
+    return tokens
+
+
+def iter_tokens(
+    expression: str, strict: bool = STRICT_TOKENS, backend: str = TOKENIZER_BACKEND
+) -> Iterator[Token]:
+    """Generate the tokens of the expression one at a time.
+
+    Same tokens and errors as tokenize, but only the current token is held in
+    memory. Errors are raised when the scan reaches them, after the tokens
+    before them were generated.
+    """
+    if backend not in TOKENIZER_BACKENDS:
+        raise ValueError(f"Unknown tokenizer backend: {backend}")
+    if backend == "regex" and isinstance(expression, str) and expression.isascii():
+        tokens = _iter_scan(expression)
+    else:
+        tokens = _iter_legacy(expression)
+    if not strict:
+        return tokens
+    return (token.validate() for token in tokens)
+
+
+def tokenize_legacy(expression: str) -> list[Token]:
+    """Scan the expression character by character."""
+    return list(_iter_legacy(expression))
+
+
+def _iter_legacy(expression: str) -> Iterator[Token]:
+    previous: Token | None = None
     i: int = 0
     n: int = len(expression)
 
@@ -28,24 +96,113 @@ def tokenize(expression: str) -> list[Token]:
 
         if char.isspace():
             i += 1
+            continue
         elif is_number(expression, i, char):
             i, new_tokens = _tokenize_number(expression, i)
-            tokens.extend(new_tokens)
         elif char.isalpha() or char == "_":
             i, new_tokens = _tokenize_variable(expression, i)
-            tokens.extend(new_tokens)
         elif char in "()":
-            tokens.append(Token(value=char, token_type=TokenType.parentheses))
+            new_tokens = [Token.parenthesis(char)]
             i += 1
         elif char in "*/%=+-":
-            i, new_tokens = _tokenize_operator(
-                expression, i, previous_token=tokens[-1] if tokens else None
-            )
-            tokens.extend(new_tokens)
+            i, new_tokens = _tokenize_operator(expression, i, previous_token=previous)
         else:
             raise ValueError(f"Unexpected character: {char}")
 
-    return tokens
+        yield from new_tokens
+        previous = new_tokens[-1]
+
+
+def tokenize_regex(expression: str) -> list[Token]:
+    """Scan the expression in a single pass with SCANNER_PATTERN.
+
+    Only valid ASCII expressions are handled here. Anything else (non-ASCII
+    input, or anything the legacy scanner would reject) is handed to
+    tokenize_legacy, which produces the same tokens or error messages.
+    """
+    if isinstance(expression, str) and expression.isascii():
+        tokens = _scan(expression)
+        if tokens is not None:
+            return tokens
+    return tokenize_legacy(expression)
+
+
+class _ScanError(Exception):
+    """Raised by _scan_tokens where the legacy scanner must take over."""
+
+
+def _scan(expression: str) -> list[Token] | None:
+    try:
+        return list(_scan_tokens(expression))
+    except _ScanError:
+        return None
+
+
+def _iter_scan(expression: str) -> Iterator[Token]:
+    """Generator version of _scan.
+
+    Where the scan gives up, the legacy scanner takes over from the same
+    token, re-scanning the prefix without keeping its tokens.
+    """
+    count = 0
+    try:
+        for token in _scan_tokens(expression):
+            yield token
+            count += 1
+    except _ScanError:
+        yield from islice(_iter_legacy(expression), count, None)
+
+
+def _scan_tokens(expression: str) -> Iterator[Token]:
+    # Local aliases, this loop runs once per token
+    make = Token._make
+    variable, number = TokenType.variable, TokenType.number
+    previous = None
+    position = 0
+    assignments = 0
+
+    for match in SCANNER_PATTERN.finditer(expression):
+        if match.start() != position:
+            raise _ScanError  # Unexpected character
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+
+        if kind == "variable":
+            token = make((value, variable))
+        elif kind == "number":
+            token = make((value, number))
+        elif kind == "operator":
+            token = OPERATOR_TOKENS[value]
+        elif kind == "parenthesis":
+            token = PARENTHESIS_TOKENS[value]
+        elif kind == "assignment":
+            assignments += 1
+            if assignments == 2:
+                raise _ScanError  # Too many operators
+            token = OPERATOR_TOKENS[value]
+        else:
+            # Same pre/post rules as check_if_unary_is_pre
+            start = match.start(kind)
+            if (
+                previous
+                and previous.token_type == variable
+                and expression[start - 1] in VARIABLE_VALID_CHARS
+            ):
+                token = OPERATOR_TOKENS[value + "post"]
+            elif (
+                position < len(expression)
+                and expression[position] in VARIABLE_VALID_CHARS
+            ):
+                token = OPERATOR_TOKENS[value + "pre"]
+            else:
+                raise _ScanError  # Invalid unary operator
+
+        yield token
+        previous = token
+
+    if position != len(expression) and not expression[position:].isspace():
+        raise _ScanError  # Unexpected character
 
 
 def _check_too_many_operators(expression: str) -> bool:
@@ -74,14 +231,21 @@ def _tokenize_number(expression: str, i: int) -> tuple[int, list[Token]]:
         i += 1
 
     # Return the number token
-    return i, [Token(value=expression[start:i], token_type=TokenType.number)]
+    value = expression[start:i]
+    if not NUMBER_REGEX.match(value):
+        raise ValueError(f"Invalid number: {value}")
+    return i, [Token(value, TokenType.number)]
 
 
 def _tokenize_variable(expression: str, i: int) -> tuple[int, list[Token]]:
     start: int = i
     while i < len(expression) and (expression[i].isalnum() or expression[i] == "_"):
         i += 1
-    return i, [Token(value=expression[start:i], token_type=TokenType.variable)]
+    value = expression[start:i]
+    # Only ASCII letters and digits are allowed (see VARIABLE_VALID_CHARS)
+    if not value.isascii() and value[0].isalpha():
+        raise ValueError(f"Invalid variable name: {value}")
+    return i, [Token(value, TokenType.variable)]
 
 
 def _tokenize_operator(
@@ -92,11 +256,11 @@ def _tokenize_operator(
 
     # Handle operators followed by '=' (e.g., +=, -=, *=, /=)
     if i + 1 < n and expression[i] in "+-*/%" and expression[i + 1] == "=":
-        tokens.append(Token(value=expression[i : i + 2], token_type=TokenType.operator))
+        tokens.append(Token.operator(expression[i : i + 2]))
         i += 2  # Skip the operator and '='
     # Handle single "=" operator
     elif expression[i] == "=":
-        tokens.append(Token(value=expression[i : i + 1], token_type=TokenType.operator))
+        tokens.append(Token.operator(expression[i]))
         i += 1  # Skip the '='
     elif expression[i] in "+-":
         # Handle consecutive '+' and '-' operators and other single operators
@@ -105,7 +269,7 @@ def _tokenize_operator(
         )
         tokens.append(new_token)
     else:
-        tokens.append(Token(value=expression[i], token_type=TokenType.operator))
+        tokens.append(Token.operator(expression[i]))
         i += 1
 
     return i, tokens
@@ -154,9 +318,15 @@ def _handle_consecutive_plus_minus(
         # Determine if it's pre or post increment/decrement
         is_pre = check_if_unary_is_pre(expression, i, i + 2, previous_token)
         value = expression[i : i + 2] + is_pre
-        token = Token(value=value, token_type=TokenType.operator)
+        token = Token.operator(value)
         i += count  # Skip the consecutive operators
     elif count == 1:
-        token = Token(value=expression[i], token_type=TokenType.operator)
+        token = Token.operator(expression[i])
         i += 1
     return i, token
+
+
+TOKENIZER_BACKENDS: dict[str, Callable[[str], list[Token]]] = {
+    "legacy": tokenize_legacy,
+    "regex": tokenize_regex,
+}
@@ -1,14 +1,140 @@
-from prompt_toolkit import PromptSession, HTML, print_formatted_text
-from prompt_toolkit.completion import WordCompleter
+import argparse
+import os
+import sys
 
-from calculator import ExecutionContext, execute_expression
-from consts import GOODBYE_MESSAGE, COMMANDS
+from batch import run_script
+from calculator import (
+    ExecutionContext,
+    execute_expression,
+    execute_transaction_command,
+)
+from consts import GOODBYE_MESSAGE, COMMANDS, TRANSACTION_COMMANDS
+from metrics import metrics
+from show import SHOW_USAGE, is_show, parse_show, show
+from settings import WAL_DURABILITY
+from wal import DURABILITY, WriteAheadLog
 
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Text based calculator")
+    parser.add_argument(
+        "-e",
+        "--execute",
+        action="append",
+        metavar="STATEMENT",
+        help="run STATEMENT instead of starting the shell, like a one-line "
+        "script (can be repeated)",
+    )
+    parser.add_argument(
+        "--script",
+        metavar="FILE",
+        help="run the statements in FILE instead of starting the shell "
+        "(statements are read from stdin when it is not a terminal)",
+    )
+    parser.add_argument(
+        "--jsonl",
+        metavar="FILE",
+        help="in batch mode, also write one JSON result per statement to FILE "
+        "('-' for stdout)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="in batch mode, run independent statements on N processes "
+        "(0 for one per CPU)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="restore the variables from FILE when it exists and save them "
+        "back to it on exit",
+    )
+    parser.add_argument(
+        "--wal",
+        metavar="FILE",
+        help="log every committed statement to FILE and recover the variables "
+        "from it on start",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY,
+        default=WAL_DURABILITY,
+        help="when the write-ahead log is synced to disk: after every commit, "
+        "every CALCULATOR_WAL_INTERVAL_MS, or never",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="record per-phase timings, shown by the stats command",
+    )
+    return parser.parse_args(argv)
+
+
+def load_context(args: argparse.Namespace) -> ExecutionContext:
+    if args.wal is not None:
+        return WriteAheadLog(args.wal, args.durability).recover()
+    if args.snapshot is not None and os.path.exists(args.snapshot):
+        return ExecutionContext.load(args.snapshot)
+    return ExecutionContext({})
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    context = load_context(args)
+    try:
+        code = run(args, context)
+    finally:
+        if context.wal is not None:
+            context.wal.close()
+    if args.snapshot is not None:
+        context.save(args.snapshot)
+    if code is not None:
+        sys.exit(code)
+
+
+def run(args: argparse.Namespace, context: ExecutionContext) -> int | None:
+    """Run the shell or the script, return the exit code of a script."""
+    if args.execute is None and args.script is None and sys.stdin.isatty():
+        shell(context)
+        return None
+
+    jsonl = None
+    try:
+        if args.jsonl == "-":
+            jsonl = sys.stdout
+        elif args.jsonl is not None:
+            jsonl = open(args.jsonl, "w")
+        if args.execute is not None:
+            return run_script(
+                args.execute, sys.stdout, sys.stderr, jsonl, context, args.jobs
+            )
+        if args.script is None:
+            return run_script(
+                sys.stdin, sys.stdout, sys.stderr, jsonl, context, args.jobs
+            )
+        with open(args.script) as script:
+            return run_script(script, sys.stdout, sys.stderr, jsonl, context, args.jobs)
+    finally:
+        if jsonl is not None and jsonl is not sys.stdout:
+            jsonl.close()
+
+
+def shell(context: ExecutionContext | None = None):
+    # Imported here, one-shot and batch runs do not need the interactive stack
+    from prompt_toolkit import PromptSession, HTML, print_formatted_text
+    from completion import NameIndex, ShellCompleter
+
     # Initialize the calculator and session
-    context = ExecutionContext({})
+    if context is None:
+        context = ExecutionContext({})
     session = PromptSession()
+    # Kept up to date by the context as variables are created and cleared
+    context.bind_name_index(NameIndex())
+    complete = ShellCompleter(COMMANDS, context.name_index)
 
     # Define auto-completion commands
     print_formatted_text(
@@ -27,22 +153,36 @@ def main():
 
     while True:
         try:
-            complete = WordCompleter(COMMANDS + list(context.variables.keys()))
-            # Prompt user input with auto-completion
-            line = session.prompt(HTML("<ansiblue>>> </ansiblue>"), completer=complete)
+            # Prompt user input with auto-completion, marked in a transaction
+            prompt = "*> " if context.in_transaction else ">> "
+            line = session.prompt(
+                HTML(f"<ansiblue>{prompt}</ansiblue>"), completer=complete
+            )
             if line.strip() == "exit":
                 # Exit the shell
                 print(GOODBYE_MESSAGE)
                 break
-            elif line.strip() == "show":
-                # Show the current variables
-                print(context)
+            elif is_show(line):
+                # Show the current variables, printed as they are formatted
+                for chunk in show(context, parse_show(line), ", "):
+                    sys.stdout.write(chunk)
+                print()
             elif line.strip() == "clear":
                 # Clear the current variables
-                context.variables.clear()
+                context.clear()
+            elif line.strip() == "stats":
+                # Show the per-phase timings
+                print(metrics.format())
+            elif line.strip() in TRANSACTION_COMMANDS:
+                # Start, commit or abort a transaction block
+                execute_transaction_command(line.strip(), context)
             elif line.strip() == "" or line.strip() == "help":
                 # show command list
-                print("Commands: show, clear, exit, help, <expression>")
+                print(
+                    "Commands: show, clear, stats, begin, commit, abort, exit, "
+                    "help, <expression>"
+                )
+                print(f"Usage: {SHOW_USAGE}")
             else:
                 print(execute_expression(line, context))
 
@@ -55,6 +195,11 @@ def main():
         except Exception as e:
             print(f"Error: {e}")
 
+    if context.in_transaction:
+        # Writes of a block that was not committed are discarded
+        context.abort()
+        print("Transaction not committed, rolled back")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,298 @@
+"""Evaluate one expression over columns of variable bindings.
+
+``evaluate_many("total = price * qty - discount", columns)`` runs the
+statement once per row, as if each row were its own ExecutionContext, but
+walks the compiled postfix program only once: every operator is applied to
+whole columns at a time.
+
+Two column backends are available. The exact backend keeps lists of
+``Decimal`` and matches ``execute_expression`` row by row. The float backend
+(``exact=False``) uses NumPy float64 arrays and is much faster for large
+inputs; it requires NumPy to be installed.
+"""
+
+from decimal import Decimal
+from itertools import repeat
+from typing import Any, Callable, Mapping, NamedTuple, Sequence
+
+from calculator import (
+    CompiledExpression,
+    ExecutionContext,
+    ExpressionExecutor,
+    compile_expression,
+    expression_cache,
+)
+from compiler import INCREMENTS
+from models.token import TokenType
+from numeric import DecimalBackend, FloatBackend
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+# Placeholder for values of rows that already failed; arithmetic on it never raises
+NAN = Decimal("nan")
+
+
+class BatchResult(NamedTuple):
+    values: Any  # list[Decimal | None] or float64 ndarray (nan for failed rows)
+    errors: dict[int, str]  # row -> first error raised for that row
+    columns: dict[str, Any]  # every variable after the statement ran
+
+
+def _divide(a: Decimal, b: Decimal) -> Decimal:
+    if b == 0:
+        raise ValueError("Division by zero")
+    return a / b
+
+
+class DecimalColumns:
+    """Columns as lists of Decimal, evaluated with the executor's semantics."""
+
+    OPERATORS: dict[str, Callable[[Decimal, Decimal], Decimal]] = {
+        "+": Decimal.__add__,
+        "-": Decimal.__sub__,
+        "*": Decimal.__mul__,
+        "/": _divide,
+        "%": Decimal.__mod__,
+    }
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.errors: dict[int, str] = {}
+
+    def column(self, values: Sequence) -> list[Decimal]:
+        return [
+            value if isinstance(value, Decimal) else Decimal(str(value))
+            for value in values
+        ]
+
+    def constant(self, text: str) -> Decimal:
+        return Decimal(text)
+
+    def fail(self, rows: Sequence[int], error: Exception):
+        for row in rows:
+            self.errors.setdefault(row, str(error))
+
+    def apply(self, operator: str, a, b):
+        function = self.OPERATORS[operator]
+        if not isinstance(a, list) and not isinstance(b, list):
+            try:
+                return function(a, b)
+            except Exception as e:
+                self.fail(range(self.rows), e)
+                return NAN
+
+        left = a if isinstance(a, list) else repeat(a, self.rows)
+        right = b if isinstance(b, list) else repeat(b, self.rows)
+        try:
+            return [function(x, y) for x, y in zip(left, right)]
+        except Exception:
+            pass
+
+        # Some rows raised, evaluate them one by one to record which
+        left = a if isinstance(a, list) else repeat(a, self.rows)
+        right = b if isinstance(b, list) else repeat(b, self.rows)
+        result = []
+        for row, (x, y) in enumerate(zip(left, right)):
+            try:
+                result.append(function(x, y))
+            except Exception as e:
+                self.fail((row,), e)
+                result.append(NAN)
+        return result
+
+    def increment(self, column: list[Decimal], delta: int) -> list[Decimal]:
+        return [value + delta for value in column]
+
+    def broadcast(self, value) -> list[Decimal]:
+        return list(value) if isinstance(value, list) else [value] * self.rows
+
+    def finish(self, value, columns: dict[str, list], originals: dict[str, list]):
+        """Return the result column and roll back the failed rows."""
+        values = self.broadcast(value)
+        if not self.errors:
+            return values
+        for name, original in originals.items():
+            columns[name] = column = list(columns[name])
+            for row in self.errors:
+                column[row] = None if original is None else original[row]
+        for row in self.errors:
+            values[row] = None
+        return values
+
+
+class FloatColumns:
+    """Columns as NumPy float64 arrays."""
+
+    def __init__(self, rows: int):
+        if np is None:
+            raise ImportError("NumPy is required for evaluate_many(exact=False)")
+        self.rows = rows
+        self.errors: dict[int, str] = {}
+        self.failed = np.zeros(rows, dtype=bool)
+
+    def column(self, values: Sequence):
+        return np.array(values, dtype=np.float64)
+
+    def constant(self, text: str):
+        return np.float64(text)
+
+    def fail(self, mask, message: str):
+        new = mask & ~self.failed
+        for row in np.flatnonzero(new):
+            self.errors[int(row)] = message
+        self.failed |= new
+
+    def apply(self, operator: str, a, b):
+        if operator == "+":
+            return a + b
+        elif operator == "-":
+            return a - b
+        elif operator == "*":
+            return a * b
+
+        zero = np.broadcast_to(b == 0, (self.rows,))
+        if zero.any():
+            self.fail(zero, "Division by zero")
+            b = np.where(zero, 1.0, b)
+        with np.errstate(all="ignore"):
+            result = a / b if operator == "/" else np.fmod(a, b)
+        return np.where(zero, np.nan, result)
+
+    def increment(self, column, delta: int):
+        return column + delta
+
+    def broadcast(self, value):
+        return np.array(np.broadcast_to(value, (self.rows,)), dtype=np.float64)
+
+    def finish(self, value, columns: dict[str, Any], originals: dict[str, Any]):
+        """Return the result column and roll back the failed rows."""
+        values = self.broadcast(value)
+        if not self.errors:
+            return values
+        for name, original in originals.items():
+            restored = np.nan if original is None else original
+            columns[name] = np.where(self.failed, restored, columns[name])
+        values[self.failed] = np.nan
+        return values
+
+
+def _fail_missing(backend, name: str, message: str | None = None):
+    error = ValueError(message or f"Undefined variable: {name}")
+    if isinstance(backend, FloatColumns):
+        backend.fail(np.ones(backend.rows, dtype=bool), str(error))
+    else:
+        backend.fail(range(backend.rows), error)
+
+
+def evaluate_many(
+    expression: str,
+    columns: Mapping[str, Sequence],
+    exact: bool = True,
+    rows: int | None = None,
+) -> BatchResult:
+    """Evaluate the expression once for every row of the given columns.
+
+    ``columns`` maps variable names to equal-length sequences; ``rows`` is
+    only needed when the expression reads no columns. Errors are reported
+    per row: a failed row gets a None (exact) or nan (float) value and its
+    variables keep their input values, as a failed statement is rolled back.
+    """
+    compiled = expression_cache.get(expression, compile_expression)
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("Columns must have the same length")
+    if rows is None:
+        rows = lengths.pop() if lengths else 1
+
+    if compiled.program is None:
+        # Malformed postfix, let the interpreter produce its own errors per row
+        return _evaluate_rows(compiled, columns, rows, exact)
+
+    backend = DecimalColumns(rows) if exact else FloatColumns(rows)
+    working = {name: backend.column(values) for name, values in columns.items()}
+    originals: dict[str, Any] = {}
+
+    def load(name: str):
+        if name not in working:
+            _fail_missing(backend, name)
+            return NAN if exact else np.float64("nan")
+        return working[name]
+
+    def store(name: str, column):
+        originals.setdefault(name, working.get(name))
+        working[name] = column
+
+    stack = []
+    postfix = compiled.postfix
+    loaded = None
+    i = 0
+    while i < len(postfix):
+        token = postfix[i]
+        if token.token_type == TokenType.variable:
+            stack.append(load(token.value))
+            loaded = token.value
+            i += 1
+            continue
+        if token.token_type == TokenType.number:
+            stack.append(backend.constant(token.value))
+        elif token.value in {"++pre", "--pre"}:
+            i += 1
+            name = postfix[i].value
+            column = backend.increment(load(name), INCREMENTS[token.value])
+            if name in working:
+                store(name, column)
+            stack.append(column)
+        elif token.value in {"++post", "--post"}:
+            if loaded in working:
+                store(loaded, backend.increment(stack[-1], INCREMENTS[token.value]))
+        else:
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(backend.apply(token.value, left, right))
+        loaded = None
+        i += 1
+    value = stack.pop()
+
+    if compiled.variable_name is not None:
+        target = compiled.variable_name
+        if compiled.assignment != "=":
+            if target not in working:
+                message = (
+                    f"Undefined variable: {target} cannot be assigned "
+                    f"with {compiled.assignment}"
+                )
+                _fail_missing(backend, target, message)
+            else:
+                value = backend.apply(compiled.assignment[0], working[target], value)
+        store(target, backend.broadcast(value))
+
+    values = backend.finish(value, working, originals)
+    return BatchResult(values, backend.errors, working)
+
+
+def _evaluate_rows(
+    compiled: CompiledExpression, columns: Mapping[str, Sequence], rows: int, exact
+) -> BatchResult:
+    """Run the statement row by row through the interpreter."""
+    to_value = Decimal if exact else float
+    backend = DecimalBackend() if exact else FloatBackend()
+    values, errors = [], {}
+    names = list(columns)
+    result_columns: dict[str, list] = {name: [] for name in names}
+    for row in range(rows):
+        context = ExecutionContext(
+            {name: columns[name][row] for name in names}, backend
+        )
+        try:
+            result = ExpressionExecutor(context).execute_compiled(compiled)
+        except Exception as e:
+            errors[row] = str(e)
+            values.append(None if exact else float("nan"))
+        else:
+            values.append(to_value(result))
+        for name, value in context.variables.items():
+            result_columns.setdefault(name, [None] * row).append(to_value(value))
+    return BatchResult(values, errors, result_columns)
@@ -0,0 +1,271 @@
+"""Write-ahead log of the statements committed to an ExecutionContext.
+
+Every commit appends one record with the new value of each variable the
+statement wrote, followed by the formulas it defined; ``clear`` appends a
+record of its own. A record is a uint32 payload length, the CRC32 of the
+payload and the payload::
+
+    set       0, uint16 name length, uint32 value length, name, packed value
+    clear     1
+    formula   2, uint16 name length, uint32 statement length, name, statement
+    computed  3, as set, for a value recomputed by the variable's formula
+
+A set entry detaches the variable from its formula when replayed, as a
+direct write does. Values are packed as in snapshot.py. Every
+``checkpoint_records`` commits the variables are written to a snapshot next
+to the log (``<path>.checkpoint``), the log is truncated and the formulas
+are logged again. Recovery loads the checkpoint and replays the log;
+a record torn by a crash ends the log. Records hold absolute values, so
+replaying a log that was already included in the checkpoint, after a crash
+between the two steps, gives the same variables.
+
+Durability: "commit" fsyncs every record before the statement returns,
+"interval" fsyncs at most every ``interval_ms`` from a background thread,
+and "off" writes in large chunks and never fsyncs.
+"""
+
+import os
+import struct
+import threading
+import zlib
+from typing import Iterable
+
+from calculator import ExecutionContext, compile_expression
+from consts import MISSING
+from numeric import NumericBackend
+from reactive import Formula, FormulaGraph, formula_reads
+from settings import WAL_CHECKPOINT_RECORDS, WAL_DURABILITY, WAL_INTERVAL_MS
+from snapshot import decode_value, encode_value, write_snapshot
+
+DURABILITY = ("commit", "interval", "off")
+# Payload length and CRC32 of a record
+RECORD = struct.Struct("<II")
+# Operation, name length and value length of a set, computed or formula entry
+ENTRY = struct.Struct("<BHI")
+SET = 0
+CLEAR = 1
+FORMULA = 2
+COMPUTED = 3
+# Buffered bytes that are written without waiting for a sync
+WRITE_SIZE = 64 * 1024
+
+
+def apply_record(payload: bytes, context: ExecutionContext):
+    position = 0
+    while position < len(payload):
+        if payload[position] == CLEAR:
+            context.clear()
+            position += 1
+            continue
+        operation, name_size, value_size = ENTRY.unpack_from(payload, position)
+        position += ENTRY.size
+        name = payload[position : position + name_size].decode()
+        position += name_size
+        value = payload[position : position + value_size]
+        position += value_size
+        if operation == FORMULA:
+            restore_formula(context, name, bytes(value).decode())
+            continue
+        context.variables[name] = decode_value(value)
+        if operation == SET and context.formulas:
+            context.formulas.remove(name)
+
+
+def restore_formula(context: ExecutionContext, name: str, statement: str):
+    """Bind the variable to its formula again, its value is logged already."""
+    compiled = compile_expression(statement)
+    if context.formulas is None:
+        context.formulas = FormulaGraph()
+    context.formulas.add(name, Formula(compiled, formula_reads(compiled), statement))
+
+
+def record(payload: bytes) -> bytes:
+    return RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def formula_entry(name: str, statement: str) -> bytes:
+    encoded_name = name.encode()
+    encoded_statement = statement.encode()
+    return (
+        ENTRY.pack(FORMULA, len(encoded_name), len(encoded_statement))
+        + encoded_name
+        + encoded_statement
+    )
+
+
+def replay(path: str, context: ExecutionContext) -> int:
+    """Apply the records of the log to the context and return their number.
+
+    A torn or corrupt record and everything after it is cut off the log.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return 0
+
+    position = 0
+    records = 0
+    while position + RECORD.size <= len(data):
+        size, checksum = RECORD.unpack_from(data, position)
+        start = position + RECORD.size
+        payload = data[start : start + size]
+        if len(payload) < size or zlib.crc32(payload) != checksum:
+            break
+        apply_record(payload, context)
+        position = start + size
+        records += 1
+    if position < len(data):
+        with open(path, "r+b") as file:
+            file.truncate(position)
+    return records
+
+
+class WriteAheadLog:
+    """Log the commits of a context to ``path``, see the module docstring.
+
+    Use recover() to get the context, and close() the log when done::
+
+        with WriteAheadLog("session.wal", durability="interval") as wal:
+            context = wal.recover()
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        durability: str = WAL_DURABILITY,
+        interval_ms: int = WAL_INTERVAL_MS,
+        checkpoint_records: int = WAL_CHECKPOINT_RECORDS,
+    ):
+        if durability not in DURABILITY:
+            raise ValueError(f"Unknown durability: {durability}")
+        self.path = os.fspath(path)
+        self.checkpoint_path = f"{self.path}.checkpoint"
+        self.durability = durability
+        self.interval = interval_ms / 1000
+        self.checkpoint_records = checkpoint_records
+        # Records logged since the last checkpoint
+        self.records = 0
+        self._file = None
+        self._buffer = bytearray()
+        # Formula entries logged with the next commit, see log_formula
+        self.pending_formulas = bytearray()
+        # Bytes written to the file but not synced yet
+        self._unsynced = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._syncer: threading.Thread | None = None
+
+    def recover(self, backend: NumericBackend | None = None) -> ExecutionContext:
+        """Restore the logged context and log its commits from now on.
+
+        ``backend`` is used when there is no checkpoint yet; otherwise the
+        context gets the backend it was checkpointed with.
+        """
+        if os.path.exists(self.checkpoint_path):
+            context = ExecutionContext.load(self.checkpoint_path)
+        else:
+            context = ExecutionContext({}, backend)
+            # Record the backend before anything is logged
+            write_snapshot(self.checkpoint_path, [], context.backend, sync=True)
+        self.records = replay(self.path, context)
+        self._file = open(self.path, "ab", buffering=0)
+        if self.durability == "interval":
+            self._syncer = threading.Thread(target=self._sync_periodically, daemon=True)
+            self._syncer.start()
+        context.wal = self
+        return context
+
+    def log_commit(self, context: ExecutionContext, names: Iterable[str]):
+        """Append the values of the variables written by a committed statement."""
+        payload = bytearray()
+        variables = context.variables
+        formulas = context.formulas or ()
+        for name in names:
+            value = variables.get(name, MISSING)
+            if value is MISSING:
+                continue
+            encoded_name = name.encode()
+            encoded_value = encode_value(value)
+            operation = COMPUTED if name in formulas else SET
+            payload += ENTRY.pack(operation, len(encoded_name), len(encoded_value))
+            payload += encoded_name
+            payload += encoded_value
+        # After the values, or replaying them would detach the new formulas
+        defines_formulas = bool(self.pending_formulas)
+        payload += self.pending_formulas
+        self.pending_formulas.clear()
+        self._append(payload)
+        # The formulas are not in the context yet, the next commit checkpoints
+        if self.records >= self.checkpoint_records and not defines_formulas:
+            self.checkpoint(context)
+
+    def log_clear(self):
+        self._append(bytes([CLEAR]))
+
+    def log_formula(self, name: str, statement: str):
+        """Log the definition of a formula in the record of the next commit.
+
+        That is the commit of the formula's value, so that a crash cannot keep
+        the value without the formula. Clear pending_formulas if the statement
+        fails instead.
+        """
+        self.pending_formulas += formula_entry(name, statement)
+
+    def _append(self, payload: bytes):
+        with self._lock:
+            self._buffer += record(payload)
+            self.records += 1
+            if self.durability == "commit":
+                self._flush(sync=True)
+            elif len(self._buffer) >= WRITE_SIZE:
+                self._flush(sync=False)
+
+    def _flush(self, sync: bool):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+            self._unsynced = True
+        if sync and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.interval):
+            with self._lock:
+                self._flush(sync=True)
+
+    def checkpoint(self, context: ExecutionContext):
+        """Write the variables to the checkpoint and empty the log.
+
+        Snapshots do not hold formulas, so they start the new log.
+        """
+        with self._lock:
+            write_snapshot(
+                self.checkpoint_path, context.variables.items(), context.backend, True
+            )
+            self._buffer.clear()
+            self._file.truncate(0)
+            self.records = 0
+            if context.formulas:
+                for name, formula in context.formulas.formulas.items():
+                    self._buffer += record(formula_entry(name, formula.statement))
+            self._unsynced = True
+            self._flush(sync=True)
+
+    def close(self):
+        """Write out the buffered records and close the log."""
+        if self._file is None or self._file.closed:
+            return
+        self._closed.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        with self._lock:
+            self._flush(sync=self.durability != "off")
+            self._file.close()
+
+    def __enter__(self) -> "WriteAheadLog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()